@@ -0,0 +1,67 @@
+"""Measure memory held by a loaded database in the plain dict and compact forms.
+
+    $ python benchmarks/bench_compact_memory.py --tools 20000
+
+The database is written to YAML and loaded back (so strings aren't shared the
+way they are in the generator) before measuring with tracemalloc.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from gx_tool_db.compact import compact_tools, to_plain
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def traced(func):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=10000)
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--servers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    spec = SyntheticDatabaseSpec(tools=args.tools, versions_per_tool=args.versions, servers=args.servers)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "tools_metadata.yml")
+        write_synthetic_database(path, spec)
+
+        def load():
+            with open(path) as f:
+                return yaml.load(f, Loader=Loader)["tools"]
+
+        plain, plain_bytes, _ = traced(load)
+        compact, compact_bytes, convert_seconds = traced(lambda: compact_tools(load()))
+        assert to_plain(compact) == plain
+    json.dump({
+        "tools": args.tools,
+        "plain_mib": round(plain_bytes / (1024 * 1024), 2),
+        "compact_mib": round(compact_bytes / (1024 * 1024), 2),
+        "ratio": round(compact_bytes / plain_bytes, 3),
+        "load_and_compact_seconds": round(convert_seconds, 3),
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare database size, load time and write time uncompressed and at several compression levels.
+
+    $ python benchmarks/bench_compression.py --tools 5000
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.io import set_compression_level
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+
+GZIP_LEVELS = [1, 6, 9]
+ZSTD_LEVELS = [1, 3, 10, 19]
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def variants():
+    yield "yml", ".yml", None
+    for level in GZIP_LEVELS:
+        yield f"gzip-{level}", ".yml.gz", level
+    if importlib.util.find_spec("zstandard") is not None:
+        for level in ZSTD_LEVELS:
+            yield f"zstd-{level}", ".yml.zst", level
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=2000)
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    spec = SyntheticDatabaseSpec(tools=args.tools, versions_per_tool=args.versions, servers=args.servers)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "source.yml")
+        write_synthetic_database(source, spec)
+        tools_metadata = ToolsMetadata(source)
+        for name, extension, level in variants():
+            path = os.path.join(tmpdir, f"tools_metadata{extension}")
+            tools_metadata._metadata_file = path
+            set_compression_level(level)
+            write_seconds = best_of(tools_metadata.write, args.repeat)
+            load_seconds = best_of(lambda: ToolsMetadata(path), args.repeat)
+            results[name] = {
+                "bytes": os.path.getsize(path),
+                "write_seconds": round(write_seconds, 4),
+                "load_seconds": round(load_seconds, 4),
+            }
+            os.remove(path)
+        set_compression_level(None)
+    plain_bytes = results["yml"]["bytes"]
+    for result in results.values():
+        result["ratio"] = round(result["bytes"] / plain_bytes, 4)
+    json.dump({"tools": args.tools, "results": results}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
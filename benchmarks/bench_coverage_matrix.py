@@ -0,0 +1,103 @@
+"""Compare the NumPy coverage matrix against the dictionary loops used by the exports.
+
+    $ python benchmarks/bench_coverage_matrix.py --tools 20000 --servers 12
+
+The loop baseline follows the per tool / per version dictionary walks done by
+``export_coverage`` (server latest version and "is latest") and
+``export_coverage_versions`` ("has version"), aggregated into the same per
+server numbers the matrix produces.
+"""
+import argparse
+import json
+import sys
+import time
+
+from gx_tool_db.coverage import CoverageMatrix
+from gx_tool_db.db import ToolsMetadata, version_sorted_iterable
+from gx_tool_db.synthetic import synthetic_database_dict, SyntheticDatabaseSpec
+
+
+def synthetic_tools_metadata(tools, versions_per_tool, servers):
+    spec = SyntheticDatabaseSpec(tools=tools, versions_per_tool=versions_per_tool, servers=servers)
+    tools_metadata = ToolsMetadata("/nonexistent/tools_metadata.yml")
+    tools_metadata.metadata = synthetic_database_dict(spec)
+    return tools_metadata, spec.server_labels
+
+
+def loop_summary(tools_metadata, servers):
+    counts = {s: {"present": 0, "latest": 0, "lagging": 0, "versions": 0} for s in servers}
+    for tool_entry in tools_metadata.entries():
+        tool_metadata = tool_entry._source_data
+        latest_version = tool_entry.latest_version
+        coverage_servers_dict = {key: "" for key in servers}
+        for server, server_dict in tool_metadata.get("servers", {}).items():
+            versions = version_sorted_iterable(server_dict.get("versions", []))
+            if versions:
+                coverage_servers_dict[server] = versions[0]
+        for server in servers:
+            if coverage_servers_dict[server]:
+                counts[server]["present"] += 1
+                if coverage_servers_dict[server] == latest_version:
+                    counts[server]["latest"] += 1
+                else:
+                    counts[server]["lagging"] += 1
+        for tool_version_metadata in tool_metadata.get("versions", {}).values():
+            known_servers_dict = {key: False for key in servers}
+            for server in tool_version_metadata.get("servers", {}).keys():
+                known_servers_dict[server] = True
+            for server in servers:
+                if known_servers_dict[server]:
+                    counts[server]["versions"] += 1
+    return counts
+
+
+def matrix_summary(matrix):
+    return {
+        s.server: {
+            "present": s.tools_present,
+            "latest": s.tools_with_latest_version,
+            "lagging": s.tools_lagging_latest_version,
+            "versions": s.tool_versions_present,
+        }
+        for s in matrix.summaries()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=10000)
+    parser.add_argument("--versions", type=int, default=4)
+    parser.add_argument("--servers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    tools_metadata, servers = synthetic_tools_metadata(args.tools, args.versions, args.servers)
+
+    start = time.perf_counter()
+    expected = loop_summary(tools_metadata, servers)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = CoverageMatrix.from_tools_metadata(tools_metadata, servers)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = matrix_summary(matrix)
+    for server in servers:
+        matrix.tools_missing_from(server)
+        matrix.tools_lagging_on(server)
+    query_seconds = time.perf_counter() - start
+
+    assert actual == expected, "coverage matrix disagrees with loop implementation"
+    json.dump({
+        "tools": args.tools,
+        "versions_per_tool": args.versions,
+        "servers": args.servers,
+        "loop_seconds": round(loop_seconds, 4),
+        "matrix_build_seconds": round(build_seconds, 4),
+        "matrix_query_seconds": round(query_seconds, 4),
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
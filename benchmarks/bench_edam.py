@@ -0,0 +1,66 @@
+"""Compare EDAM aggregate queries on an EdamIndex against walking the tools for each query.
+
+    $ python benchmarks/bench_edam.py --tools 20000 --servers 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.edam import EDAM_KINDS, EdamIndex, newest_edam_terms
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+
+
+def walk_tool_counts(tools_metadata, kind, server):
+    # what each query costs without the index
+    counts = {}
+    for _, tool_metadata in tools_metadata.walk_tools_dict():
+        on_server = server in (tool_metadata.get("servers") or {})
+        for term in newest_edam_terms(tool_metadata, kind):
+            counts[term] = counts.get(term, 0) + (1 if on_server else 0)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=20000)
+    parser.add_argument("--servers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    spec = SyntheticDatabaseSpec(tools=args.tools, servers=args.servers)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "tools_metadata.yml")
+        write_synthetic_database(path, spec)
+        tools_metadata = ToolsMetadata(path)
+        queries = [(kind, server) for kind in EDAM_KINDS for server in spec.server_labels]
+
+        start = time.perf_counter()
+        walked = {query: walk_tool_counts(tools_metadata, *query) for query in queries}
+        walk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = EdamIndex.from_tools_metadata(tools_metadata)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        indexed = {}
+        for kind, server in queries:
+            indexed[(kind, server)] = {term: counts[server] for term, counts in index.tool_counts(kind, [server]).items()}
+            index.terms_missing_on(server, kind)
+        query_seconds = time.perf_counter() - start
+        assert indexed == walked
+
+    json.dump({
+        "tools": args.tools,
+        "queries": len(queries),
+        "walk_all_queries_seconds": round(walk_seconds, 4),
+        "index_build_seconds": round(build_seconds, 4),
+        "indexed_all_queries_seconds": round(query_seconds, 4),
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compare size and load time of export-tabular output formats against TSV.
+
+    $ python benchmarks/bench_export_formats.py --rows 200000
+
+Loading uses pandas when it is installed (which is how analysts consume these
+files) and falls back to the csv/json modules and pyarrow otherwise.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+from gx_tool_db.io import tabular_writer, TabularColumn
+
+SERVERS = ["main", "eu", "test", "au"]
+LABELS = ["deprecated", "iwc_required", "awesome"]
+FORMATS = ["tsv", "jsonl", "parquet", "arrow"]
+
+
+def columns():
+    cols = [TabularColumn("Tool ID"), TabularColumn("Latest Version")]
+    for server in SERVERS:
+        cols.append(TabularColumn(f"{server} Latest Version"))
+        cols.append(TabularColumn(f"{server} Is Latest", bool))
+    cols.append(TabularColumn("anvil Test Count", int))
+    cols.append(TabularColumn("anvil Tests Passed", int))
+    cols.extend(TabularColumn(label, bool) for label in LABELS)
+    return cols
+
+
+def rows(count):
+    for i in range(count):
+        version = f"1.{i % 7}.{i % 3}"
+        row = [f"toolshed.g2.bx.psu.edu/repos/owner{i % 50}/repo{i}/tool{i}", version]
+        for j, _ in enumerate(SERVERS):
+            on_server = (i + j) % 3 != 0
+            row.append(version if on_server else None)
+            row.append(on_server)
+        row.append(i % 11)
+        row.append(i % 5)
+        row.extend((i + k) % 4 == 0 for k, _ in enumerate(LABELS))
+        yield row
+
+
+def load(path, fmt):
+    try:
+        import pandas
+    except ImportError:
+        pandas = None
+    if fmt == "tsv":
+        if pandas is not None:
+            return len(pandas.read_csv(path, sep="\t"))
+        with open(path) as f:
+            return sum(1 for _ in csv.reader(f, delimiter="\t")) - 1
+    if fmt == "jsonl":
+        if pandas is not None:
+            return len(pandas.read_json(path, lines=True))
+        with open(path) as f:
+            return sum(1 for _ in map(json.loads, f))
+    import pyarrow
+    if fmt == "parquet":
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(path).read_all()
+    return len(table.to_pandas()) if pandas is not None else table.num_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--format", dest="formats", action="append", default=None, choices=FORMATS)
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for fmt in args.formats or FORMATS:
+            path = os.path.join(tmpdir, f"export.{fmt}")
+            try:
+                start = time.perf_counter()
+                with tabular_writer(path, columns()) as writer:
+                    writer.writerows(rows(args.rows))
+                write_time = time.perf_counter() - start
+                start = time.perf_counter()
+                loaded = load(path, fmt)
+                load_time = time.perf_counter() - start
+            except Exception as e:
+                results[fmt] = {"error": str(e)}
+                continue
+            assert loaded == args.rows, (fmt, loaded)
+            results[fmt] = {
+                "bytes": os.path.getsize(path),
+                "write_seconds": round(write_time, 4),
+                "load_seconds": round(load_time, 4),
+            }
+    tsv = results.get("tsv")
+    if tsv and "bytes" in tsv:
+        for result in results.values():
+            if "bytes" in result:
+                result["size_vs_tsv"] = round(result["bytes"] / tsv["bytes"], 3)
+                result["load_vs_tsv"] = round(result["load_seconds"] / max(tsv["load_seconds"], 1e-9), 3)
+    json.dump({"rows": args.rows, "results": results}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare export-panel-views against looping export-panel-view once per view.
+
+    $ python benchmarks/bench_panel_views.py --tools 5000 --servers 4 --views-per-server 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+from gx_tool_db.main import main as gx_tool_db_main
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+
+
+def view_definitions(spec, views_per_server):
+    views = []
+    labels = spec.label_names
+    for server in spec.server_labels:
+        for v in range(views_per_server):
+            view = {"id": f"{server}_view{v}", "server": server}
+            if v % 2:
+                view["require_labels"] = [labels[v % len(labels)]]
+            else:
+                view["exclude_labels"] = [labels[v % len(labels)]]
+            views.append(view)
+    return views
+
+
+def single_view_command(database, output_directory, view):
+    command = ["--tools_metadata", database, "export-panel-view", view["id"], view["server"]]
+    command += ["--output", os.path.join(output_directory, f"{view['id']}.yml")]
+    for label in view.get("require_labels", []):
+        command += ["--require-label", label]
+    for label in view.get("exclude_labels", []):
+        command += ["--exclude-label", label]
+    return command
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=5000)
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--views-per-server", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = os.path.join(tmpdir, "tools_metadata.yml")
+        spec = SyntheticDatabaseSpec(tools=args.tools, servers=args.servers, labels=12)
+        write_synthetic_database(database, spec)
+        views = view_definitions(spec, args.views_per_server)
+        views_path = os.path.join(tmpdir, "views.yml")
+        with open(views_path, "w") as f:
+            yaml.safe_dump(views, f)
+
+        single_dir = os.path.join(tmpdir, "single")
+        os.makedirs(single_dir)
+        start = time.perf_counter()
+        for view in views:
+            gx_tool_db_main(single_view_command(database, single_dir, view))
+        single_seconds = time.perf_counter() - start
+
+        batch_dir = os.path.join(tmpdir, "batch")
+        start = time.perf_counter()
+        gx_tool_db_main(["--tools_metadata", database, "export-panel-views", views_path, "--output-directory", batch_dir])
+        batch_seconds = time.perf_counter() - start
+
+        for view in views:
+            name = f"{view['id']}.yml"
+            with open(os.path.join(single_dir, name)) as a, open(os.path.join(batch_dir, name)) as b:
+                assert yaml.safe_load(a) == yaml.safe_load(b), name
+
+    json.dump({
+        "tools": args.tools,
+        "views": len(views),
+        "single_view_loop_seconds": round(single_seconds, 4),
+        "export_panel_views_seconds": round(batch_seconds, 4),
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Time building, loading and querying the search index against scanning every tool.
+
+    $ python benchmarks/bench_search.py --tools 50000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.search import search_index_path, SearchIndex, tokenize, tool_terms
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+
+QUERIES = ["tool 4242", "synthetic thing 17", "operation_3123", "topic_0300 synthetic", "thing", "does synth"]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def scan(tools, query):
+    # what answering a query costs without an index
+    query_terms = tokenize(query)
+    hits = []
+    for tool_id, tool in tools.items():
+        terms = tool_terms(tool_id, tool)
+        if all(any(term.startswith(query_term) for term in terms) for query_term in query_terms):
+            hits.append(tool_id)
+    return hits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=50000)
+    parser.add_argument("--versions", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    spec = SyntheticDatabaseSpec(tools=args.tools, versions_per_tool=args.versions, servers=2)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "tools_metadata.yml")
+        write_synthetic_database(path, spec)
+        tools_metadata = ToolsMetadata(path)
+        tools = tools_metadata._tools_dict()
+        build_seconds, index = timed(lambda: SearchIndex.build(tools, tools_metadata.generation))
+        save_seconds, _ = timed(lambda: index.save(search_index_path(path)))
+        load_seconds, _ = timed(lambda: SearchIndex.load(search_index_path(path)))
+        tool_id = next(iter(tools))
+        update_seconds, _ = timed(lambda: index.update_tool(tool_id, tools[tool_id]))
+
+        queries = {}
+        for query in QUERIES:
+            latencies = sorted(timed(lambda: index.search(query))[0] for _ in range(args.repeat))
+            scan_seconds, _ = timed(lambda: scan(tools, query))
+            queries[query] = {
+                "hits": len(index.search(query, limit=args.tools)),
+                "median_ms": round(statistics.median(latencies) * 1000, 3),
+                "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+                "scan_ms": round(scan_seconds * 1000, 1),
+            }
+    json.dump({
+        "tools": args.tools,
+        "build_seconds": round(build_seconds, 3),
+        "save_seconds": round(save_seconds, 3),
+        "load_seconds": round(load_seconds, 3),
+        "update_tool_ms": round(update_seconds * 1000, 3),
+        "queries": queries,
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
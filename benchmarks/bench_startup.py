@@ -0,0 +1,109 @@
+"""Measure CLI import time per command with ``python -X importtime``.
+
+    $ python benchmarks/bench_startup.py
+
+Each command is run in a fresh interpreter against a small database. The script
+exits non-zero if a lightweight command pulls in one of the heavy optional
+modules (HTTP stack, Google auth, gxformat2, NumPy, Arrow).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+HEAVY_MODULES = [
+    "requests",
+    "urllib3",
+    "gspread",
+    "google",
+    "googleapiclient",
+    "pkg_resources",
+    "gxformat2",
+    "numpy",
+    "pyarrow",
+]
+
+# commands that must not load any of HEAVY_MODULES
+LIGHTWEIGHT_COMMANDS = {
+    "export-label": ["export-label", "{tmpdir}/labels.txt", "awesome"],
+    "export-tabular": ["export-tabular", "--all-coverage", "--output", "{tmpdir}/out.tsv"],
+    "export-install-yaml": ["export-install-yaml", "--output", "{tmpdir}/tools.yaml"],
+    "export-panel-view": ["export-panel-view", "v", "main", "--output", "{tmpdir}/v.yml"],
+    "import-label": ["import-label", "{tmpdir}/ids.txt", "cool"],
+    "help": ["--help"],
+}
+
+DATABASE = {
+    "version": "1.0",
+    "tools": {
+        "cat1": {
+            "servers": {"main": {"versions": ["1.0.0"], "sections": {"text": {"name": "Text"}}}},
+            "versions": {"1.0.0": {"servers": {"main": {"labels": []}}, "name": "cat1"}},
+            "external_labels": ["awesome"],
+        },
+    },
+    "integrated_panels": {"main": [{"model_class": "ToolSection", "id": "text", "name": "Text"}]},
+}
+
+
+def imported_modules(importtime_stderr):
+    """Return {top level module name: cumulative microseconds} from -X importtime output."""
+    modules = {}
+    for line in importtime_stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        top_level = name.strip().split(".")[0]
+        modules[top_level] = max(modules.get(top_level, 0), int(cumulative))
+    return modules
+
+
+def run_command(database, argv):
+    code = "import sys; from gx_tool_db.main import main; main(sys.argv[1:])"
+    command = [sys.executable, "-X", "importtime", "-c", code, "--tools_metadata", database] + argv
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise Exception(f"Command {argv} failed: {result.stderr[-2000:]}")
+    return elapsed, imported_modules(result.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = os.path.join(tmpdir, "tools_metadata.yml")
+        with open(database, "w") as f:
+            yaml.safe_dump(DATABASE, f)
+        with open(os.path.join(tmpdir, "ids.txt"), "w") as f:
+            f.write("cat1\n")
+        for name, command in LIGHTWEIGHT_COMMANDS.items():
+            command = [a.format(tmpdir=tmpdir) for a in command]
+            elapsed, modules = run_command(database, command)
+            heavy = sorted(m for m in HEAVY_MODULES if m in modules)
+            results[name] = {
+                "wall_seconds": round(elapsed, 4),
+                "gx_tool_db_import_ms": round(modules.get("gx_tool_db", 0) / 1000.0, 1),
+                "heavy_modules": heavy,
+            }
+            if heavy:
+                failures.append(f"{name} imported {', '.join(heavy)}")
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if failures:
+        sys.stderr.write("\n".join(failures) + "\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Time database load/write and every import/export command on a synthetic database.
+
+    $ python benchmarks/bench_suite.py --tools 5000 --output results/main.json
+    $ python benchmarks/bench_suite.py --tools 5000 --compare results/main.json
+
+Databases come from ``gx_tool_db.synthetic`` so runs with the same scale
+arguments (and seed) are comparable over time. Mutating commands run against a
+fresh copy of the database each repetition; copying isn't timed.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main as gx_tool_db_main
+from gx_tool_db.synthetic import (
+    synthetic_label_assignments,
+    synthetic_test_results_dict,
+    SyntheticDatabaseSpec,
+    write_synthetic_database,
+)
+
+
+def command_cases(workdir, spec):
+    """name -> (argv, mutates database)."""
+    server = spec.server_labels[0]
+    label = spec.label_names[0] if spec.labels else "label0"
+    out = os.path.join(workdir, "out")
+    label_args = [arg for name in spec.label_names[:5] for arg in ["--label", name]]
+    return {
+        "export-tabular": (["export-tabular", "--all-coverage", "--all-tests", "--output", f"{out}.tsv"] + label_args, False),
+        "export-tabular-jsonl": (["export-tabular", "--all-coverage", "--all-tests", "--output", f"{out}.jsonl"], False),
+        "export-coverage-versions": (["export-coverage-versions", "--output", f"{out}_versions.tsv"], False),
+        "export-coverage-summary": (["export-coverage-summary", "--output", f"{out}_summary.tsv"], False),
+        "export-label": (["export-label", f"{out}_label.txt", label], False),
+        "export-install-yaml": (["export-install-yaml", "--output", f"{out}_tools.yml", "--server", server], False),
+        "export-panel-view": (["export-panel-view", "view", server, "--output", f"{out}_view.yml", "--exclude-label", label], False),
+        "export-panel-views": (["export-panel-views", os.path.join(workdir, "views.yml"), "--output-directory", f"{out}_views"], False),
+        "import-label": (["import-label", os.path.join(workdir, "label_ids.txt"), "benchmarked"], True),
+        "import-labels": (["import-labels", os.path.join(workdir, "labels.csv")], True),
+        "import-tests": (["import-tests", os.path.join(workdir, "results.json"), "benchmark_target"], True),
+        "clear-tests": (["clear-tests", spec.test_target_names[0] if spec.test_targets else "target0"], True),
+    }
+
+
+def write_inputs(workdir, database, spec):
+    tool_ids = synthetic_label_assignments(database)
+    with open(os.path.join(workdir, "label_ids.txt"), "w") as f:
+        f.write("\n".join(tool_ids))
+    with open(os.path.join(workdir, "labels.csv"), "w") as f:
+        f.write("".join(f"{tool_id},label{i % 5}\n" for i, tool_id in enumerate(tool_ids)))
+    with open(os.path.join(workdir, "results.json"), "w") as f:
+        json.dump(synthetic_test_results_dict(database), f)
+    views = [
+        {"id": f"{server}_{i}", "server": server, "exclude_labels": [label]}
+        for server in spec.server_labels for i, label in enumerate(spec.label_names[:3])
+    ]
+    with open(os.path.join(workdir, "views.yml"), "w") as f:
+        yaml.safe_dump(views, f)
+
+
+def timed(func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"min_seconds": round(min(times), 4), "median_seconds": round(statistics.median(times), 4)}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_suite(spec, repeat, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        pristine = os.path.join(workdir, "pristine.yml")
+        database_path = os.path.join(workdir, "tools_metadata.yml")
+        database = write_synthetic_database(pristine, spec)
+        shutil.copy(pristine, database_path)
+        write_inputs(workdir, database, spec)
+
+        def reset():
+            shutil.copy(pristine, database_path)
+
+        def selected(name):
+            return not only or name in only
+
+        if selected("load"):
+            results["load"] = timed(lambda: ToolsMetadata(database_path), repeat)
+        if selected("write"):
+            tools_metadata = ToolsMetadata(database_path)
+            results["write"] = timed(tools_metadata.write, repeat, setup=reset)
+        for name, (argv, mutates) in command_cases(workdir, spec).items():
+            if not selected(name):
+                continue
+            full_argv = ["--tools_metadata", database_path] + argv
+            try:
+                results[name] = timed(lambda: gx_tool_db_main(full_argv), repeat, setup=reset if mutates else None)
+            except Exception as e:  # e.g. optional dependency (numpy) missing
+                results[name] = {"error": str(e)}
+        results["database_bytes"] = os.path.getsize(pristine)
+    return results
+
+
+def compare(results, baseline):
+    comparison = {}
+    for name, result in results["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if isinstance(result, dict) and isinstance(base, dict) and "median_seconds" in result and "median_seconds" in base:
+            comparison[name] = round(result["median_seconds"] / max(base["median_seconds"], 1e-9), 3)
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = SyntheticDatabaseSpec()
+    for field in SyntheticDatabaseSpec._fields:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, type=int, default=getattr(defaults, field))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", default=[], help="Only run the named benchmark(s)")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file (default: standard output)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to report median time ratios against")
+    args = parser.parse_args(argv)
+
+    spec = SyntheticDatabaseSpec(**{field: getattr(args, field) for field in SyntheticDatabaseSpec._fields})
+    results = {
+        "spec": spec._asdict(),
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": run_suite(spec, args.repeat, args.only),
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            results["ratio_to_baseline"] = compare(results, json.load(f))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
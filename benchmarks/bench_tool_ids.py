@@ -0,0 +1,79 @@
+"""Compare owner, repository and prefix selection on a ToolIdIndex against scanning the tool ids.
+
+    $ python benchmarks/bench_tool_ids.py --tools 50000
+"""
+import argparse
+import json
+import sys
+import time
+
+from gx_tool_db.synthetic import MAIN_TOOL_SHED, synthetic_database_dict, SyntheticDatabaseSpec
+from gx_tool_db.tool_ids import parse_tool_shed_id, ToolIdIndex, versionless_tool_id
+
+
+def scan(tool_ids, owner=None, repository=None, prefix=None):
+    # what each query costs without the index
+    selected = []
+    for tool_id in tool_ids:
+        parsed = parse_tool_shed_id(tool_id)
+        if owner is not None and (parsed is None or parsed.owner != owner):
+            continue
+        if repository is not None and (parsed is None or parsed.repository != repository):
+            continue
+        if prefix is not None and not tool_id.startswith(prefix):
+            continue
+        selected.append(tool_id)
+    return sorted(selected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    tools = synthetic_database_dict(SyntheticDatabaseSpec(tools=args.tools))["tools"]
+    queries = []
+    for i in range(args.queries):
+        owner = f"owner{i % 97}"
+        queries.append({"owner": owner})
+        queries.append({"owner": owner, "repository": f"repo{(i * 31) % (args.tools // 3)}"})
+        queries.append({"prefix": f"{MAIN_TOOL_SHED}/repos/{owner}/repo{i}"})
+
+    start = time.perf_counter()
+    scanned = [scan(tools, **query) for query in queries]
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = ToolIdIndex.from_tools_dict(tools)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [index.select(**query) for query in queries]
+    query_seconds = time.perf_counter() - start
+    assert indexed == scanned
+
+    versioned = [f"{tool_id}/{version}" for tool_id, tool in tools.items() for version in tool.get("versions") or {}]
+    start = time.perf_counter()
+    for tool_id in versioned:
+        versionless_tool_id(tool_id)
+    parse_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for tool_id in versioned:
+        index.resolve(tool_id)
+    resolve_seconds = time.perf_counter() - start
+
+    json.dump({
+        "tools": args.tools,
+        "queries": len(queries),
+        "scan_all_queries_seconds": round(scan_seconds, 4),
+        "index_build_seconds": round(build_seconds, 4),
+        "indexed_all_queries_seconds": round(query_seconds, 4),
+        "versioned_ids": len(versioned),
+        "parse_versionless_seconds": round(parse_seconds, 4),
+        "index_resolve_seconds": round(resolve_seconds, 4),
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compare the compiled database validator against building the pydantic models.
+
+    $ python benchmarks/bench_validation.py --tools 20000
+"""
+import argparse
+import json
+import sys
+import time
+
+from gx_tool_db.models import load_from_dict
+from gx_tool_db.synthetic import synthetic_database_dict, SyntheticDatabaseSpec
+from gx_tool_db.validation import validate_database_dict
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=10000)
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    spec = SyntheticDatabaseSpec(tools=args.tools, versions_per_tool=args.versions, servers=args.servers)
+    database = synthetic_database_dict(spec)
+    validate_database_dict(database)  # compile the validator outside of the timings
+    pydantic_seconds = best_of(lambda: load_from_dict(database), args.repeat)
+    compiled_seconds = best_of(lambda: validate_database_dict(database), args.repeat)
+    json.dump({
+        "tools": args.tools,
+        "pydantic_seconds": round(pydantic_seconds, 4),
+        "compiled_seconds": round(compiled_seconds, 4),
+        "speedup": round(pydantic_seconds / max(compiled_seconds, 1e-9), 1),
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure how sharded database validation scales with the number of processes.
+
+    $ python benchmarks/bench_validation_parallel.py --tools 50000 --jobs 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from gx_tool_db.synthetic import synthetic_database_dict, SyntheticDatabaseSpec
+from gx_tool_db.validation import validate_database_dict
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=20000)
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--strict", action="store_true", help="Validate by building the pydantic models")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    spec = SyntheticDatabaseSpec(tools=args.tools, versions_per_tool=args.versions, servers=args.servers)
+    database = synthetic_database_dict(spec)
+    validate_database_dict(database, strict=args.strict, jobs=1)  # compile the validator outside of the timings
+    seconds = {
+        jobs: best_of(lambda: validate_database_dict(database, strict=args.strict, jobs=jobs), args.repeat)
+        for jobs in args.jobs
+    }
+    baseline = seconds[min(seconds)]
+    json.dump({
+        "tools": args.tools,
+        "strict": args.strict,
+        "cpus": os.cpu_count(),
+        "results": {
+            str(jobs): {"seconds": round(value, 4), "speedup": round(baseline / max(value, 1e-9), 2)}
+            for jobs, value in seconds.items()
+        },
+    }, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
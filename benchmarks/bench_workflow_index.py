@@ -0,0 +1,67 @@
+"""Compare re-parsing a workflow corpus against incrementally updating and querying a workflow index.
+
+    $ python benchmarks/bench_workflow_index.py --copies 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+from gx_tool_db.workflow_index import WorkflowIndex
+from gx_tool_db.workflows import parse_tools
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests", "data")
+WORKFLOWS = ["pe-wgs-variation.ga", "parallel-accession-download.ga", "subworkflow.ga"]
+
+
+def write_corpus(directory, copies):
+    # distinct content for each copy so they are hashed and parsed separately
+    for workflow in WORKFLOWS:
+        with open(os.path.join(DATA_DIRECTORY, workflow)) as f:
+            content = f.read()
+        for i in range(copies):
+            with open(os.path.join(directory, f"{i}-{workflow}"), "w") as f:
+                f.write(content.replace('"name": "', f'"name": "{i} ', 1))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return round(time.perf_counter() - start, 4), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        corpus = os.path.join(tmpdir, "workflows")
+        os.makedirs(corpus)
+        write_corpus(corpus, args.copies)
+        database = os.path.join(tmpdir, "tools_metadata.yml")
+        write_synthetic_database(database, SyntheticDatabaseSpec(tools=1000))
+        tools_metadata = ToolsMetadata(database)
+        index_path = os.path.join(tmpdir, "index.json")
+
+        results = {"workflows": len(WORKFLOWS) * args.copies}
+        results["parse_all_seconds"], _ = timed(lambda: parse_tools(corpus))
+        index = WorkflowIndex()
+        results["index_build_seconds"], _ = timed(lambda: index.update([corpus]))
+        index.save(index_path)
+        results["index_load_seconds"], index = timed(lambda: WorkflowIndex.load(index_path))
+        results["index_unchanged_update_seconds"], _ = timed(lambda: index.update([corpus]))
+        with open(os.path.join(corpus, f"0-{WORKFLOWS[0]}"), "a") as f:
+            f.write("\n")
+        results["index_one_changed_update_seconds"], _ = timed(lambda: index.update([corpus]))
+        results["breakage_query_seconds"], _ = timed(lambda: index.missing_tools(tools_metadata, "main"))
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
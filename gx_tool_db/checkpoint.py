@@ -0,0 +1,99 @@
+"""Checkpoints and resume markers for long running imports.
+
+An import works through a sequence of inputs (servers, test result files,
+tutorials). With checkpoints enabled the database is written after every
+``every`` completed inputs and a marker next to the database
+(``<database>.checkpoint.json``) records the import and the inputs completed
+so far. If the import fails, re-running it with ``--resume`` skips those
+inputs. The marker is removed once the import finishes. Importing an input
+twice is harmless (e.g. if the import failed between writing the database and
+the marker), it is only slower.
+"""
+import json
+import os
+import tempfile
+from typing import Optional, Set, TYPE_CHECKING
+
+from . import instrumentation
+from .io import warn
+
+if TYPE_CHECKING:
+    from .db import ToolsMetadata
+
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+CHECKPOINT_FORMAT = 1
+
+
+def checkpoint_path(metadata_file: str) -> str:
+    return f"{metadata_file}{CHECKPOINT_SUFFIX}"
+
+
+class ImportCheckpoint:
+    """Track the completed inputs of an import, checkpointing the database every ``every`` inputs.
+
+    Without a ``metadata_file`` (e.g. against the resident database of the
+    daemon or a ``run`` pipeline, which decide themselves when to write) nothing
+    is written and nothing is resumed.
+    """
+
+    def __init__(self, tools_metadata: 'ToolsMetadata', metadata_file: Optional[str], operation: str, every: int, resume: bool = False):
+        self._tools_metadata = tools_metadata
+        self._path = checkpoint_path(metadata_file) if metadata_file is not None else None
+        self._every = every
+        self._pending = 0
+        self.operation = operation
+        # inputs completed by the interrupted run being resumed and by this run
+        self.completed: Set[str] = set()
+        self.resumed = 0
+        if resume and self._path is not None:
+            self._resume(self._path)
+
+    def _resume(self, path: str) -> None:
+        if not os.path.exists(path):
+            warn(f"No checkpoint found at {path}, starting {self.operation} from the beginning")
+            return
+        with open(path) as f:
+            marker = json.load(f)
+        if marker.get("format") != CHECKPOINT_FORMAT:
+            raise Exception(f"Unknown checkpoint format {marker.get('format')} in {path}")
+        if marker["operation"] != self.operation:
+            raise Exception(f"{path} records an interrupted [{marker['operation']}], not [{self.operation}] - resume that import or remove the file")
+        self.completed = set(marker["completed"])
+        self.resumed = len(self.completed)
+
+    def is_completed(self, input: str) -> bool:
+        return input in self.completed
+
+    def complete(self, input: str) -> None:
+        """Record ``input`` as imported, writing a checkpoint if ``every`` inputs completed since the last one."""
+        self.completed.add(input)
+        self._pending += 1
+        if self._path is not None and self._every > 0 and self._pending >= self._every:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Write the database and then the marker listing the completed inputs."""
+        if self._path is None:
+            return
+        with instrumentation.phase("checkpoint"):
+            # keeps what another process wrote meanwhile when tracking changes, raises otherwise
+            self._tools_metadata.write(check_generation=True)
+            self._save(self._path)
+        instrumentation.count("checkpoints")
+        self._pending = 0
+
+    def _save(self, path: str) -> None:
+        marker = {"format": CHECKPOINT_FORMAT, "operation": self.operation, "completed": sorted(self.completed)}
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=CHECKPOINT_SUFFIX)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(marker, f, indent=1)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        os.replace(temp_path, path)
+
+    def finish(self) -> None:
+        """The import finished and the database is written, forget the marker."""
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
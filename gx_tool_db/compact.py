@@ -0,0 +1,273 @@
+"""Compact in-memory representation of the ``tools`` section of a database.
+
+The YAML form stores every tool, version, server entry and test result as a
+dictionary repeating the same string keys. Here each of those is a
+``__slots__`` record instead, server labels, section ids, versions and labels
+are interned and test statuses are stored as small integers.
+
+Records implement the mapping protocol (``get``, ``[]``, ``in``, ``pop``,
+...) and containers convert plain dictionaries assigned into them, so
+``ToolEntry``/``ToolVersionEntry`` and the export code work on either form
+unchanged. :func:`compact_tools` and :func:`to_plain` convert losslessly
+between the two.
+"""
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Type
+
+# index is the status code stored in CompactTestResult, other statuses are kept as strings
+TEST_STATUSES = ("success", "failed", "error", "failure", "skipped")
+_TEST_STATUS_CODES = {status: code for code, status in enumerate(TEST_STATUSES)}
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<missing>"
+
+
+_MISSING: Any = _Missing()
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class InternedList(list):
+    """List interning the strings added to it (labels, versions)."""
+    __slots__ = ()
+
+    def __init__(self, values=()):
+        super().__init__(_intern(v) for v in values)
+
+    def append(self, value):
+        super().append(_intern(value))
+
+    def extend(self, values):
+        super().extend(_intern(v) for v in values)
+
+    def insert(self, index, value):
+        super().insert(index, _intern(value))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [_intern(v) for v in value]
+        else:
+            value = _intern(value)
+        super().__setitem__(index, value)
+
+
+class CompactDict(dict):
+    """Dictionary with interned keys converting values assigned to it with ``convert``."""
+    __slots__ = ("_convert",)
+
+    def __init__(self, convert: Callable[[Any], Any], values: Optional[Dict[Any, Any]] = None):
+        super().__init__()
+        self._convert = convert
+        if values:
+            for key, value in values.items():
+                dict.__setitem__(self, _intern(key), convert(value))
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, _intern(key), self._convert(value))
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwds):
+        for key, value in dict(*args, **kwds).items():
+            self[key] = value
+
+    def __reduce_ex__(self, protocol):
+        return (_rebuild_compact_dict, (self._convert, dict(self)))
+
+
+def _rebuild_compact_dict(convert, values):
+    return CompactDict(convert, values)
+
+
+class CompactRecord(MutableMapping):
+    """Mapping over a fixed set of keys stored in ``__slots__`` (absent keys aren't set)."""
+    __slots__: Tuple[str, ...] = ()
+    # key -> function converting assigned plain values
+    _converters: Dict[str, Callable[[Any], Any]] = {}
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None):
+        for key in self.__slots__:
+            object.__setattr__(self, key, _MISSING)
+        if values:
+            for key, value in values.items():
+                self[key] = value
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not _MISSING
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(f"{type(self).__name__} has no field [{key}]")
+        converter = self._converters.get(key)
+        setattr(self, key, converter(value) if converter is not None and value is not None else value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        setattr(self, key, _MISSING)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.__slots__:
+            if getattr(self, key) is not _MISSING:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactRecord):
+            return to_plain(self) == to_plain(other)
+        if isinstance(other, dict):
+            return to_plain(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({to_plain(self)!r})"
+
+    def __reduce_ex__(self, protocol):
+        return (type(self), (dict(self.items()),))
+
+
+def _record(cls: Type[CompactRecord]) -> Callable[[Any], Any]:
+
+    def convert(value):
+        return value if value is None or isinstance(value, cls) else cls(value)
+
+    return convert
+
+
+def _compact_dict(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+
+    def convert_dict(value):
+        if value is None or isinstance(value, CompactDict) and value._convert is convert:
+            return value
+        return CompactDict(convert, value)
+
+    return convert_dict
+
+
+def _interned_list(value):
+    return value if value is None or isinstance(value, InternedList) else InternedList(value)
+
+
+def _interned(value):
+    return _intern(value)
+
+
+class CompactTestResult(CompactRecord):
+    __slots__ = ("status", "job_create_time")
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        return TEST_STATUSES[value] if key == "status" and type(value) is int else value
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        return TEST_STATUSES[value] if key == "status" and type(value) is int else value
+
+    def __setitem__(self, key, value):
+        if key == "status":
+            value = _TEST_STATUS_CODES.get(value, value)
+        super().__setitem__(key, value)
+
+
+class CompactSection(CompactRecord):
+    __slots__ = ("name",)
+
+
+class CompactServerTool(CompactRecord):
+    __slots__ = ("versions", "sections")
+
+
+class CompactServerToolVersion(CompactRecord):
+    __slots__ = ("labels",)
+
+
+class CompactRepository(CompactRecord):
+    __slots__ = ("owner", "tool_shed", "name")
+    _converters = {"owner": _interned, "tool_shed": _interned}
+
+
+class CompactToolVersion(CompactRecord):
+    __slots__ = (
+        "test_results", "servers", "trainings", "name", "description",
+        "edam_operations", "edam_topics", "xrefs", "model_class",
+    )
+
+
+class CompactTool(CompactRecord):
+    __slots__ = ("servers", "versions", "external_labels", "tool_shed_repository")
+
+
+_convert_test_results = _compact_dict(_compact_dict(_record(CompactTestResult)))
+
+CompactServerTool._converters = {
+    "versions": _interned_list,
+    "sections": _compact_dict(_record(CompactSection)),
+}
+CompactServerToolVersion._converters = {"labels": _interned_list}
+CompactToolVersion._converters = {
+    "test_results": _convert_test_results,
+    "servers": _compact_dict(_record(CompactServerToolVersion)),
+    "model_class": _interned,
+    "edam_operations": _interned_list,
+    "edam_topics": _interned_list,
+}
+CompactTool._converters = {
+    "servers": _compact_dict(_record(CompactServerTool)),
+    "versions": _compact_dict(_record(CompactToolVersion)),
+    "external_labels": _interned_list,
+    "tool_shed_repository": _record(CompactRepository),
+}
+
+_convert_tools = _compact_dict(_record(CompactTool))
+
+
+def compact_tools(tools: Optional[Dict[str, Any]] = None) -> CompactDict:
+    """Convert the ``tools`` dictionary of a database into its compact form."""
+    return _convert_tools(tools or {})
+
+
+def to_plain(value: Any) -> Any:
+    """Convert compact records and containers (recursively) back to plain dicts and lists."""
+    if isinstance(value, CompactRecord):
+        return {key: to_plain(value[key]) for key in value}
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def plain_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Database dictionary with any compact ``tools`` converted back to plain dictionaries."""
+    tools = metadata.get("tools")
+    if not isinstance(tools, CompactDict):
+        return metadata
+    plain = dict(metadata)
+    plain["tools"] = to_plain(tools)
+    return plain
@@ -47,16 +47,36 @@ PUBLIC_SERVERS = [
 ]
 
 DEFAULT_PANEL_VIEW_TYPE = "generic"
+# panel views either keep the server's panel sections or group tools by EDAM topic
+PANEL_VIEW_GROUP_BY_SKELETON = "skeleton"
+PANEL_VIEW_GROUP_BY_EDAM_TOPIC = "edam_topic"
+PANEL_VIEW_GROUP_BY = [PANEL_VIEW_GROUP_BY_SKELETON, PANEL_VIEW_GROUP_BY_EDAM_TOPIC]
 
 
 class FilterArguments:
     require_labels: Optional[List[str]] = None
     exclude_labels: Optional[List[str]] = None
 
+    # tool shed id filters (see ``tool_ids.ToolIdIndex.select``)
+    tool_shed: Optional[str] = None
+    owner: Optional[str] = None
+    repository: Optional[str] = None
+    tool_id_prefix: Optional[str] = None
+
     def __init__(self, require_labels=None, exclude_labels=None):
         self.require_labels = require_labels
         self.exclude_labels = exclude_labels
 
+    @property
+    def filters_tool_ids(self) -> bool:
+        return any(value is not None for value in (self.tool_shed, self.owner, self.repository, self.tool_id_prefix))
+
+    def set_tool_id_filters(self, other: 'FilterArguments') -> None:
+        self.tool_shed = other.tool_shed
+        self.owner = other.owner
+        self.repository = other.repository
+        self.tool_id_prefix = other.tool_id_prefix
+
 
 class Server:
     url: str
@@ -78,6 +98,7 @@ class ViewDefintion(FilterArguments):
     output: Optional[str] = None
     view_type: str = DEFAULT_PANEL_VIEW_TYPE
     description: Optional[str] = None
+    group_by: str = PANEL_VIEW_GROUP_BY_SKELETON
 
     def __init__(self, id):
         self.id = id
@@ -120,6 +141,7 @@ class ExportSpreadsheetConfig(FilterArguments):
     include_tool_shed: bool = False
     include_repository_owner: bool = False
     include_repository_name: bool = False
+    sync_sheet: bool = False
 
     def __init__(self, args):
         self.output = args.output
@@ -137,6 +159,10 @@ class ExportSpreadsheetConfig(FilterArguments):
             self.labels = args.labels
         self.require_labels = args.require_labels
         self.exclude_labels = args.exclude_labels
+        self.tool_shed = args.filter_tool_shed
+        self.owner = args.filter_owner
+        self.repository = args.filter_repository
+        self.tool_id_prefix = args.filter_tool_id_prefix
         self.include_training_topics = args.training_topics
         self.include_training_tutorials = args.training_tutorials
 
@@ -146,3 +172,4 @@ class ExportSpreadsheetConfig(FilterArguments):
         self.include_tool_shed = args.tool_shed
         self.include_repository_owner = args.repository_owner
         self.include_repository_name = args.repository_name
+        self.sync_sheet = getattr(args, "sync_sheet", False)
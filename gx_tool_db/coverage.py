@@ -0,0 +1,169 @@
+"""Array based view of which tool versions are available on which servers.
+
+Tools, tool versions and servers are encoded as integer ids once so that
+cross-server questions (coverage percentages, missing tools, servers lagging
+behind the latest version) become NumPy array operations instead of walks
+over the nested database dictionaries.
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore[assignment]
+
+from .db import ToolsMetadata, version_sorted_iterable
+
+# server_latest_rank value for tools not available on a server
+NOT_ON_SERVER = -1
+
+
+class ServerCoverageSummary(NamedTuple):
+    server: str
+    tools: int
+    tools_present: int
+    coverage_percent: float
+    tools_with_latest_version: int
+    tools_lagging_latest_version: int
+    tool_versions_present: int
+
+
+class CoverageMatrix:
+    """Tool x server and tool version x server presence matrices.
+
+    ``server_latest_rank[t, s]`` is the position of the newest version of tool
+    ``t`` found on server ``s`` in the tool's version sorted list of known versions
+    (0 is the latest version) or ``NOT_ON_SERVER``. ``version_presence[v, s]`` is
+    true if version ``v`` (of tool ``version_tool[v]``) was recorded for server ``s``.
+    """
+
+    def __init__(
+        self,
+        tool_ids: List[str],
+        servers: List[str],
+        versions: List[str],
+        version_tool,
+        version_rank,
+        version_presence,
+        server_latest_rank,
+    ):
+        self.tool_ids = tool_ids
+        self.servers = servers
+        self.versions = versions
+        self.version_tool = version_tool
+        self.version_rank = version_rank
+        self.version_presence = version_presence
+        self.server_latest_rank = server_latest_rank
+        self._server_index = {s: i for i, s in enumerate(servers)}
+
+    @staticmethod
+    def from_tools_metadata(tools_metadata: ToolsMetadata, servers: Optional[List[str]] = None) -> "CoverageMatrix":
+        _require_numpy()
+        if servers is None:
+            servers = sorted(tools_metadata.known_servers())
+        server_index = {s: i for i, s in enumerate(servers)}
+
+        tool_ids: List[str] = []
+        versions: List[str] = []
+        version_tool: List[int] = []
+        version_rank: List[int] = []
+        presence_rows: List[int] = []
+        presence_cols: List[int] = []
+        latest_rank_cells: Dict[tuple, int] = {}
+
+        for tool_index, (tool_id, tool_metadata) in enumerate(tools_metadata.walk_tools_dict()):
+            tool_ids.append(tool_id)
+            versions_dict = tool_metadata.get("versions") or {}
+            ranks = {v: r for r, v in enumerate(version_sorted_iterable(versions_dict.keys()))}
+            for version, version_metadata in versions_dict.items():
+                version_index = len(versions)
+                versions.append(version)
+                version_tool.append(tool_index)
+                version_rank.append(ranks[version])
+                for server in (version_metadata or {}).get("servers") or {}:
+                    if server in server_index:
+                        presence_rows.append(version_index)
+                        presence_cols.append(server_index[server])
+
+            for server, server_dict in (tool_metadata.get("servers") or {}).items():
+                if server not in server_index:
+                    continue
+                server_ranks = [ranks[v] for v in (server_dict or {}).get("versions") or [] if v in ranks]
+                if server_ranks:
+                    latest_rank_cells[(tool_index, server_index[server])] = min(server_ranks)
+
+        version_presence = numpy.zeros((len(versions), len(servers)), dtype=bool)
+        version_presence[presence_rows, presence_cols] = True
+        server_latest_rank = numpy.full((len(tool_ids), len(servers)), NOT_ON_SERVER, dtype=numpy.int32)
+        if latest_rank_cells:
+            cells = numpy.array(list(latest_rank_cells.keys()), dtype=numpy.int64)
+            server_latest_rank[cells[:, 0], cells[:, 1]] = list(latest_rank_cells.values())
+        return CoverageMatrix(
+            tool_ids,
+            servers,
+            versions,
+            numpy.array(version_tool, dtype=numpy.int64),
+            numpy.array(version_rank, dtype=numpy.int32),
+            version_presence,
+            server_latest_rank,
+        )
+
+    @property
+    def tool_presence(self):
+        """Boolean tools x servers matrix - true if any version of the tool is on the server."""
+        return self.server_latest_rank != NOT_ON_SERVER
+
+    @property
+    def is_latest(self):
+        """Boolean tools x servers matrix - true if the server has the tool's latest version."""
+        return self.server_latest_rank == 0
+
+    @property
+    def lagging(self):
+        """Boolean tools x servers matrix - true if the server has the tool but not its latest version."""
+        return self.server_latest_rank > 0
+
+    def coverage_percentages(self) -> Dict[str, float]:
+        if not self.tool_ids:
+            return {s: 0.0 for s in self.servers}
+        percentages = self.tool_presence.mean(axis=0) * 100.0
+        return dict(zip(self.servers, percentages.tolist()))
+
+    def tools_missing_from(self, server: str) -> List[str]:
+        column = self.tool_presence[:, self._server_index[server]]
+        return self._tool_ids_where(~column)
+
+    def tools_lagging_on(self, server: str) -> List[str]:
+        return self._tool_ids_where(self.lagging[:, self._server_index[server]])
+
+    def servers_lagging_for(self, tool_id: str) -> List[str]:
+        row = self.lagging[self.tool_ids.index(tool_id)]
+        return [self.servers[i] for i in numpy.flatnonzero(row)]
+
+    def summaries(self) -> List[ServerCoverageSummary]:
+        tools = len(self.tool_ids)
+        present = self.tool_presence.sum(axis=0)
+        latest = self.is_latest.sum(axis=0)
+        lagging = self.lagging.sum(axis=0)
+        versions_present = self.version_presence.sum(axis=0)
+        percentages = self.coverage_percentages()
+        return [
+            ServerCoverageSummary(
+                server=server,
+                tools=tools,
+                tools_present=int(present[i]),
+                coverage_percent=round(percentages[server], 2),
+                tools_with_latest_version=int(latest[i]),
+                tools_lagging_latest_version=int(lagging[i]),
+                tool_versions_present=int(versions_present[i]),
+            )
+            for i, server in enumerate(self.servers)
+        ]
+
+    def _tool_ids_where(self, mask) -> List[str]:
+        return [self.tool_ids[i] for i in numpy.flatnonzero(mask)]
+
+
+def _require_numpy():
+    if numpy is None:
+        raise Exception("The coverage matrix requires numpy - install it with 'pip install numpy'")
@@ -0,0 +1,570 @@
+"""Long running ``serve`` daemon keeping the database in memory.
+
+The daemon loads ``ToolsMetadata`` once and answers JSON requests over a Unix
+socket or a localhost HTTP port:
+
+- ``GET /status`` - database path and whether unsaved changes are pending.
+- ``GET /tools/<tool_id>`` - raw database entry for a (versionless) tool id.
+- ``GET /labels`` - mapping of every external label to its number of tools.
+- ``GET /labels/<label>`` - tool ids carrying ``label``.
+- ``POST /labels/<label>`` - body ``{"tool_ids": [...], "present": true}`` to add or remove a label,
+  responds with the number of tools updated and the ``unknown`` tool ids (which are skipped).
+- ``POST /command`` - body ``{"argv": [...], "cwd": ..., "tools_metadata": ...}`` runs any
+  CLI command (this is what ``gx-tool-db --daemon`` sends), responding with what it printed
+  (``stdout`` and ``stderr``).
+- ``POST /flush`` - persist pending changes now.
+
+Commands and label changes are only accepted on the Unix socket, which is
+created readable and writable by its owner only. The HTTP port, open to any
+local user, only serves lookups and ``/flush``.
+
+Lookups and reading commands share a lock so concurrent readers don't block
+each other, writes are exclusive. A command failing halfway is rolled back by
+reloading the database and re-applying the changes not written yet. Changes are persisted in the background once no further writes
+have arrived for ``debounce`` seconds, so bursts of small writes end up as a
+single database write.
+"""
+import contextlib
+import http.client
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, cast, Dict, Iterator, List, Optional, TextIO, Tuple, TYPE_CHECKING
+
+from .compact import to_plain
+from .db import ConcurrentModificationError, MAX_WRITE_ATTEMPTS, ToolsMetadata, write_retry_pause
+from .io import warn
+
+if TYPE_CHECKING:
+    from .main import Config
+
+# persist even during a constant stream of writes at least this often
+MAX_DEBOUNCE_MULTIPLIER = 10
+
+
+class ReadWriteLock:
+    """Many concurrent readers or a single writer, waiting writers block new readers."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    def read(self):
+        return _LockContext(self.acquire_read, self.release_read)
+
+    def write(self):
+        return _LockContext(self.acquire_write, self.release_write)
+
+
+class _LockContext:
+
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+
+    def __exit__(self, *args):
+        self._release()
+
+
+class _ThreadOutput:
+    """Stand-in for ``sys.stdout``/``sys.stderr`` writing to the buffer of threads capturing their output."""
+
+    def __init__(self, stream: TextIO, name: str):
+        self._stream = stream
+        self._name = name
+
+    def _target(self) -> TextIO:
+        return getattr(_captured, self._name, None) or self._stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+
+_captured = threading.local()
+_install_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def captured_output() -> Iterator[Tuple[io.StringIO, io.StringIO]]:
+    """Collect what the current thread prints, unlike ``contextlib.redirect_stdout`` other threads are unaffected."""
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadOutput):
+            sys.stdout = cast(TextIO, _ThreadOutput(sys.stdout, "stdout"))
+        if not isinstance(sys.stderr, _ThreadOutput):
+            sys.stderr = cast(TextIO, _ThreadOutput(sys.stderr, "stderr"))
+    stdout, stderr = io.StringIO(), io.StringIO()
+    _captured.stdout, _captured.stderr = stdout, stderr
+    try:
+        yield stdout, stderr
+    finally:
+        _captured.stdout = _captured.stderr = None
+
+
+# re-applies a change made to the resident database to a freshly loaded one
+Change = Callable[[ToolsMetadata], None]
+
+
+class DebouncedWriter:
+    """Persist the database ``delay`` seconds after the last change.
+
+    Writes check the database generation. If another process wrote the file
+    meanwhile, the database is reloaded and the changes ``touch``ed since the
+    last write are re-applied to it, so neither side's changes are lost. A
+    conflicting write that includes changes touched without one fails instead.
+    """
+
+    def __init__(self, tools_metadata: ToolsMetadata, lock: ReadWriteLock, delay: float):
+        self._tools_metadata = tools_metadata
+        self._lock = lock
+        self._delay = delay
+        self._condition = threading.Condition()
+        self._first_change: Optional[float] = None
+        self._last_change: Optional[float] = None
+        self._changes: List[Optional[Change]] = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def dirty(self) -> bool:
+        return self._first_change is not None
+
+    def touch(self, change: Optional[Change] = None):
+        """Record a change to the database (call it holding the write lock), written once changes stop."""
+        with self._condition:
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+            self._changes.append(change)
+            self._condition.notify_all()
+
+    def flush(self):
+        # the write lock keeps changes out while the database is written (and maybe reloaded)
+        with self._lock.write():
+            with self._condition:
+                if self._first_change is None:
+                    return
+                first_change = self._first_change
+                changes = self._changes
+                self._first_change = self._last_change = None
+                self._changes = []
+            try:
+                self._write(changes)
+            except BaseException:
+                with self._condition:
+                    # still pending, retried when next due
+                    self._first_change = first_change
+                    self._last_change = time.monotonic()
+                    self._changes = changes + self._changes
+                raise
+
+    def _write(self, changes: List[Optional[Change]]):
+        for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+            try:
+                self._tools_metadata.write(check_generation=True)
+                return
+            except ConcurrentModificationError as e:
+                if attempt == MAX_WRITE_ATTEMPTS or None in changes:
+                    raise
+                warn(f"{e}, re-applying {len(changes)} changes to the updated database")
+                write_retry_pause(attempt)
+                self._reload(changes)
+
+    def rollback(self):
+        """Discard changes made but not ``touch``ed yet (call it holding the write lock).
+
+        The database is reloaded and the changes touched since the last write are re-applied.
+        """
+        with self._condition:
+            changes = list(self._changes)
+        if None in changes:
+            raise Exception("Cannot roll back the database, it has changes that can't be re-applied")
+        self._reload(changes)
+
+    def _reload(self, changes: List[Optional[Change]]):
+        self._tools_metadata.reload()
+        for change in changes:
+            try:
+                cast(Change, change)(self._tools_metadata)
+            except Exception as change_error:
+                warn(f"Failed to re-apply a change to the updated database, dropping it: {change_error}")
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and not self._due():
+                    self._condition.wait(timeout=self._wait_time())
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                warn(f"Failed to write the database, retrying later: {e}")
+
+    def _due(self) -> bool:
+        if self._first_change is None or self._last_change is None:
+            return False
+        now = time.monotonic()
+        quiet = now - self._last_change >= self._delay
+        overdue = now - self._first_change >= self._delay * MAX_DEBOUNCE_MULTIPLIER
+        return quiet or overdue
+
+    def _wait_time(self) -> Optional[float]:
+        if self._last_change is None:
+            return None
+        return max(0.01, self._last_change + self._delay - time.monotonic())
+
+
+class ToolDatabaseDaemon:
+    """Resident database plus the locking and persistence used by the request handler."""
+
+    def __init__(self, metadata_file: str, debounce: float):
+        self.metadata_file = os.path.abspath(metadata_file)
+        self.tools_metadata = ToolsMetadata(self.metadata_file)
+        self.lock = ReadWriteLock()
+        self.writer = DebouncedWriter(self.tools_metadata, self.lock, debounce)
+
+    # lookups read the raw dicts, they don't need the indexes reading commands build
+    def _tools(self) -> Dict[str, Any]:
+        return self.tools_metadata.metadata.get("tools") or {}
+
+    def tool(self, tool_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock.read():
+            return to_plain(self._tools().get(tool_id))
+
+    def labels(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self.lock.read():
+            for tool_metadata in self._tools().values():
+                for label in tool_metadata.get("external_labels") or []:
+                    counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    def tools_with_label(self, label: str) -> List[str]:
+        with self.lock.read():
+            return [
+                tool_id for tool_id, tool_metadata in self._tools().items()
+                if label in (tool_metadata.get("external_labels") or [])
+            ]
+
+    def record_label(self, label: str, tool_ids: List[str], present: bool = True) -> Tuple[int, List[str]]:
+        """Add (or remove) ``label`` on the known tools of ``tool_ids``, return their number and the unknown ids."""
+
+        def change(tools_metadata: ToolsMetadata):
+            # like import-label, only tools already in the database are labelled
+            tools = tools_metadata.metadata.get("tools") or {}
+            for tool_id in tool_ids:
+                if tool_id in tools:
+                    tools_metadata.get_entry_for(tool_id).record_external_label(label, present=present)
+
+        with self.lock.write():
+            tools = self._tools()
+            known = [tool_id for tool_id in tool_ids if tool_id in tools]
+            unknown = [tool_id for tool_id in tool_ids if tool_id not in tools]
+            if known:
+                change(self.tools_metadata)
+                self.writer.touch(change)
+        return len(known), unknown
+
+    def run_command(self, argv: List[str], cwd: Optional[str] = None, tools_metadata: Optional[str] = None):
+        from .main import arg_parser, Config, MUTATING_COMMANDS, process_options_set, run_command
+
+        if cwd and os.path.realpath(cwd) != os.path.realpath(os.getcwd()):
+            raise Exception(f"Daemon is running in {os.getcwd()}, forward commands from that directory")
+        if tools_metadata and os.path.abspath(tools_metadata) != self.metadata_file:
+            raise Exception(f"Daemon is serving {self.metadata_file}, not {tools_metadata}")
+        args = arg_parser().parse_args(argv)
+        if args.command in ["serve", None]:
+            raise Exception(f"Command [{args.command}] cannot be forwarded to the daemon")
+        for option in process_options_set(args):
+            # shared by every command the daemon runs, set them when starting it
+            raise Exception(f"{option} cannot be forwarded to the daemon, pass it to gx-tool-db serve instead")
+
+        def change(tools_metadata: ToolsMetadata):
+            run_command(Config(self.metadata_file, tools_metadata), args)
+
+        if args.command not in MUTATING_COMMANDS:
+            # once the lazily built indexes are current, reading commands only read the database
+            while True:
+                with self.lock.read():
+                    if self.tools_metadata.indexes_built():
+                        run_command(Config(self.metadata_file, self.tools_metadata), args)
+                        return
+                with self.lock.write():
+                    self.tools_metadata.build_indexes()
+
+        modified = []
+        with self.lock.write():
+            config = Config(self.metadata_file, self.tools_metadata, on_database_modified=lambda: modified.append(True))
+            try:
+                run_command(config, args)
+            except BaseException:
+                # a failing command leaves no partial changes behind
+                self.writer.rollback()
+                raise
+            if modified:
+                self.writer.touch(change)
+
+    def close(self):
+        self.writer.close()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: Any
+
+    def do_GET(self):
+        daemon: ToolDatabaseDaemon = self.server.tool_db_daemon
+        path = urllib.parse.unquote(urllib.parse.urlparse(self.path).path)
+        if path == "/status":
+            self._respond(200, {"tools_metadata": daemon.metadata_file, "dirty": daemon.writer.dirty})
+        elif path.startswith("/tools/"):
+            tool_id = path[len("/tools/"):]
+            tool = daemon.tool(tool_id)
+            if tool is None:
+                self._respond(404, {"error": f"Unknown tool [{tool_id}]"})
+            else:
+                self._respond(200, {"tool_id": tool_id, "metadata": tool})
+        elif path == "/labels":
+            self._respond(200, {"labels": daemon.labels()})
+        elif path.startswith("/labels/"):
+            self._respond(200, {"tool_ids": daemon.tools_with_label(path[len("/labels/"):])})
+        else:
+            self._respond(404, {"error": f"Unknown path [{path}]"})
+
+    def do_POST(self):
+        daemon: ToolDatabaseDaemon = self.server.tool_db_daemon
+        path = urllib.parse.unquote(urllib.parse.urlparse(self.path).path)
+        if (path == "/command" or path.startswith("/labels/")) and not isinstance(self.server, _ThreadingUnixHTTPServer):
+            # anyone on the host can connect to the port, access to the socket is restricted to its owner
+            self._respond(403, {"error": f"{path} is only accepted on the Unix socket of the daemon (serve --socket)"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._respond(400, {"error": f"Invalid JSON request body: {e}"})
+            return
+        if not isinstance(body, dict):
+            self._respond(400, {"error": "Invalid request body, expected a JSON object"})
+            return
+        # the output of forwarded commands is sent back to the client instead of printed here
+        with captured_output() as (stdout, stderr):
+            status, response = self._post(daemon, path, body)
+        if path == "/command":
+            response.update(stdout=stdout.getvalue(), stderr=stderr.getvalue())
+        self._respond(status, response)
+
+    def _post(self, daemon: ToolDatabaseDaemon, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        try:
+            if path == "/command":
+                daemon.run_command(body["argv"], body.get("cwd"), body.get("tools_metadata"))
+                return 200, {"ok": True}
+            elif path.startswith("/labels/"):
+                updated, unknown = daemon.record_label(path[len("/labels/"):], body["tool_ids"], body.get("present", True))
+                return 200, {"updated": updated, "unknown": unknown}
+            elif path == "/flush":
+                daemon.writer.flush()
+                return 200, {"ok": True}
+            else:
+                return 404, {"error": f"Unknown path [{path}]"}
+        except SystemExit:
+            return 400, {"error": f"Invalid arguments {body.get('argv')}"}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    def _respond(self, status: int, body: Dict[str, Any]):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        os.chmod(self.server_address, 0o600)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def create_server(
+    tool_db_daemon: ToolDatabaseDaemon,
+    socket_path: Optional[str] = None,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+):
+    server: Any
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _ThreadingUnixHTTPServer(socket_path, _RequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), _RequestHandler)
+        server.daemon_threads = True
+    server.tool_db_daemon = tool_db_daemon
+    return server
+
+
+def serve(config: "Config", socket_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 8765, debounce: float = 2.0):
+    tool_db_daemon = ToolDatabaseDaemon(config.metadata_file, debounce)
+    server = create_server(tool_db_daemon, socket_path=socket_path, host=host, port=port)
+    address = socket_path or f"http://{host}:{port}"
+    print(f"Serving {tool_db_daemon.metadata_file} on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        tool_db_daemon.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_path)
+
+
+class DaemonClient:
+    """Python client for a running daemon, ``address`` is a socket path or ``http://host:port``."""
+
+    def __init__(self, address: str, timeout: Optional[float] = None):
+        self.address = address
+        self.timeout = timeout
+
+    def status(self) -> Dict[str, Any]:
+        return self._request("GET", "/status")
+
+    def tool(self, tool_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._request("GET", f"/tools/{urllib.parse.quote(tool_id)}")["metadata"]
+        except KeyError:
+            return None
+
+    def labels(self) -> Dict[str, int]:
+        return self._request("GET", "/labels")["labels"]
+
+    def tools_with_label(self, label: str) -> List[str]:
+        return self._request("GET", f"/labels/{urllib.parse.quote(label)}")["tool_ids"]
+
+    def record_label(self, label: str, tool_ids: List[str], present: bool = True) -> int:
+        body = {"tool_ids": tool_ids, "present": present}
+        return self._request("POST", f"/labels/{urllib.parse.quote(label)}", body)["updated"]
+
+    def run(self, argv: List[str], tools_metadata: Optional[str] = None) -> None:
+        """Run a CLI command on the daemon, writing what it printed to this process' stdout and stderr."""
+        body = {"argv": argv, "cwd": os.getcwd(), "tools_metadata": tools_metadata}
+        status, result = self._send("POST", "/command", body)
+        sys.stdout.write(result.get("stdout") or "")
+        sys.stderr.write(result.get("stderr") or "")
+        self._check("/command", status, result)
+
+    def flush(self) -> None:
+        self._request("POST", "/flush", {})
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.address.startswith("http://"):
+            parsed = urllib.parse.urlparse(self.address)
+            return http.client.HTTPConnection(parsed.hostname or "127.0.0.1", parsed.port, timeout=self.timeout)
+        return _UnixHTTPConnection(self.address, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        status, result = self._send(method, path, body)
+        self._check(path, status, result)
+        return result
+
+    def _send(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+        connection = self._connection()
+        try:
+            payload = json.dumps(body).encode("utf-8") if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            result = json.loads(response.read() or b"{}")
+        finally:
+            connection.close()
+        return response.status, result
+
+    def _check(self, path: str, status: int, result: Dict[str, Any]) -> None:
+        if status == 404 and path.startswith("/tools/"):
+            raise KeyError(path)
+        if status >= 400:
+            raise Exception(f"gx-tool-db daemon request failed: {result.get('error')}")
+
+
+def forward_command(address: str, argv: List[str], tools_metadata: Optional[str] = None) -> None:
+    """Run a CLI command (``argv`` without ``--daemon``) on a running daemon."""
+    if tools_metadata:
+        tools_metadata = os.path.abspath(tools_metadata)
+    DaemonClient(address).run(argv, tools_metadata=tools_metadata)
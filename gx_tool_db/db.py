@@ -1,31 +1,132 @@
+import contextlib
+import copy
 import os
+import pickle
+import random
 import shutil
 import tempfile
-from typing import Any, Dict, Iterator, List, Optional, Set
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, TYPE_CHECKING
 
 import packaging.version
 import yaml
 
-from .config import FilterArguments, Server, TestDataMergeStrategy, ViewDefintion
-from .io import warn
-from .models import load_from_dict, TestResults, TrainingMetadata
-from .workflows import parse_tools
+from . import instrumentation
+from .compact import compact_tools, plain_metadata, to_plain
+from .config import (
+    FilterArguments,
+    PANEL_VIEW_GROUP_BY_EDAM_TOPIC,
+    Server,
+    TestDataMergeStrategy,
+    ViewDefintion,
+)
+from .io import compression_extension, open_compressed, warn
+from .models import TestResults, TrainingMetadata
+from .tool_ids import ToolIdIndex, versionless_tool_id
+from .validation import validate_database_dict
+
+if TYPE_CHECKING:
+    from .checkpoint import ImportCheckpoint
+    from .edam import EdamIndex
+    from .search import SearchIndex
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, writes are not locked there
+    fcntl = None  # type: ignore
 
 DATABASE_VERSION = "1.0"
+LOCK_SUFFIX = ".lock"
+# section of EDAM topic grouped panel views holding tools without topics
+EDAM_UNCATEGORIZED_SECTION_ID = "edam_no_topic"
+EDAM_UNCATEGORIZED_SECTION_NAME = "No EDAM Topic"
 
+_compact_default = False
 
-class FilterCriteria:
+
+def set_compact_representation(compact: bool) -> None:
+    """Hold tools in the compact slotted form (see ``gx_tool_db.compact``) by default."""
+    global _compact_default
+    _compact_default = compact
+
+
+# times a change is applied and written when other processes keep writing the database concurrently
+MAX_WRITE_ATTEMPTS = 5
+WRITE_RETRY_DELAY = 0.2  # seconds, randomized and growing with each attempt
+
+
+class ConcurrentModificationError(Exception):
+    """The database file was written by another process since it was loaded."""
+
+
+def write_retry_pause(attempt: int) -> None:
+    """Back off before re-applying changes after the ``attempt``-th conflicting write."""
+    time.sleep(random.uniform(0, WRITE_RETRY_DELAY * attempt))
+
+
+@contextlib.contextmanager
+def database_lock(metadata_file: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock (on a ``.lock`` file next to the database) for writing it."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{metadata_file}{LOCK_SUFFIX}", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def read_generation(metadata_file: str) -> int:
+    """Generation of the database on disk, without parsing the whole file (0 if it has none)."""
+    if not os.path.exists(metadata_file):
+        return 0
+    with open_compressed(metadata_file) as f:
+        for line in f:
+            if line[:1] in ("", " ", "-", "#", "\n"):
+                continue  # not a top-level key
+            key = line.split(":", 1)[0]
+            if key == "generation":
+                return yaml.safe_load(line)["generation"] or 0
+            if key > "generation":
+                # keys are sorted, so it would have come before this one
+                break
+    return 0
+
+
+class RetentionPolicy(NamedTuple):
+    """What ``ToolsMetadata.apply_retention`` prunes from a database."""
+    # keep only this many of the newest versions of each tool
+    keep_versions: Optional[int] = None
+    # drop test results whose job_create_time sorts before this (ISO 8601) timestamp
+    tests_before: Optional[str] = None
+    # drop versions not installed on any server
+    drop_unavailable_versions: bool = False
+    # drop empty test results, trainings, labels, ... and tools left without any data
+    drop_empty: bool = False
+
+
+RETENTION_COUNTERS = ["versions", "test_results", "empty_containers", "tools"]
+# per version keys holding containers dropped when empty ("servers" is kept, even empty)
+_VERSION_CONTAINER_KEYS = ["test_results", "trainings", "edam_operations", "edam_topics", "xrefs"]
+_TOOL_CONTAINER_KEYS = ["servers", "versions", "external_labels"]
+
+
+class FilterCriteria(FilterArguments):
     require_repository: Optional[bool] = None
     require_main_shed: Optional[bool] = None
-    require_labels: Optional[List[str]] = None
-    exclude_labels: Optional[List[str]] = None
 
 
 class ToolsMetadata:
     metadata: dict
 
-    def __init__(self, metadata_file: str):
+    def __init__(self, metadata_file: str, compact: Optional[bool] = None):
         self._metadata_file = metadata_file
+        self._compact = _compact_default if compact is None else compact
+        # pickled contents as loaded, when tracking changes (see track_changes)
+        self._baseline: Optional[bytes] = None
         self._init()
 
     def _init(self):
@@ -33,16 +134,63 @@ class ToolsMetadata:
             'version': DATABASE_VERSION,
         }
         if os.path.exists(self._metadata_file):
-            with open(self._metadata_file, 'r') as f:
+            with instrumentation.phase("yaml_load"), open_compressed(self._metadata_file) as f:
                 metadata = yaml.safe_load(f)
-        load_from_dict(metadata)  # validate models
+            instrumentation.count("files_parsed")
+        validate_database_dict(metadata)
+        self._generation = metadata.get("generation") or 0
+        self._search_index: Optional['SearchIndex'] = None
+        # tools whose indexed metadata changed since the search index was last updated
+        self._search_dirty: Set[str] = set()
+        # built on first use, dropped when tools are added or removed
+        self._tool_id_index: Optional[ToolIdIndex] = None
+        if self._compact and metadata.get("tools") is not None:
+            metadata["tools"] = compact_tools(metadata["tools"])
         self.metadata = metadata
 
+    def reload(self) -> None:
+        """Discard the in-memory contents and load the database from disk again."""
+        self._init()
+        if self._baseline is not None:
+            self.track_changes()
+
+    def track_changes(self) -> None:
+        """Remember the current contents so ``write`` keeps changes others wrote since.
+
+        If another process wrote the database meanwhile, ``write`` reloads it and
+        re-applies the changes made to this object since (the difference to the
+        remembered contents) rather than overwriting or rejecting them.
+        """
+        self._baseline = pickle.dumps(plain_metadata(self.metadata), pickle.HIGHEST_PROTOCOL)
+
+    def copy(self) -> 'ToolsMetadata':
+        """Return an independent in-memory copy backed by the same file."""
+        tools_metadata = ToolsMetadata.__new__(ToolsMetadata)
+        tools_metadata._metadata_file = self._metadata_file
+        tools_metadata._compact = self._compact
+        tools_metadata._baseline = self._baseline
+        tools_metadata._generation = self._generation
+        tools_metadata._search_index = None
+        tools_metadata._search_dirty = set(self._search_dirty)
+        tools_metadata._tool_id_index = self._tool_id_index
+        tools_metadata.metadata = copy.deepcopy(self.metadata)
+        return tools_metadata
+
+    def replace_contents(self, other: 'ToolsMetadata') -> None:
+        """Take over the (copied) contents of ``other``, e.g. a modified ``copy()`` of this database."""
+        self.metadata = copy.deepcopy(other.metadata)
+        self._search_dirty.update(other._search_dirty)
+        self._tool_id_index = other._tool_id_index
+
     def get_entry_for(self, tool_id, server: Optional[Server] = None):
         """Fetch entry for parsed tool id."""
         tools_dict = self._tools_dict()
-        tool_source = _ensure_key(tools_dict, tool_id, {})
-        return ToolEntry(tool_source, tool_id, server)
+        if tool_id not in tools_dict:
+            tools_dict[tool_id] = {}
+            self._tool_id_index = None
+            # new tools are indexed (by their id) too
+            self._record_metadata_changed(tool_id)
+        return ToolEntry(tools_dict[tool_id], tool_id, server, self)
 
     def get_entry_for_api_value(self, api_element, server: Optional[Server] = None):
         assert api_element["model_class"].endswith("Tool"), api_element
@@ -55,19 +203,125 @@ class ToolsMetadata:
         panels[server.label] = skeleton_elements
 
     def panel_skeleton_for(self, server_label: str):
-        panels = _ensure_key(self.metadata, "integrated_panels", {})
-        return panels.get(server_label)
+        return (self.metadata.get("integrated_panels") or {}).get(server_label)
 
-    def write(self):
-        load_from_dict(self.metadata)  # make sure models validate before writing...
-
-        # TODO: backups...
-
-        # Dump it to a temporary file and then move the file to prevent
-        # truncated file problems on serialization errors, etc..
-        tf = tempfile.NamedTemporaryFile('w', delete=False)
-        yaml.safe_dump(self.metadata, tf)
-        shutil.move(tf.name, self._metadata_file)
+    @property
+    def generation(self) -> int:
+        """Number of writes the database had seen when loaded (or last written by this object)."""
+        return self._generation
+
+    def write(self, check_generation: bool = False):
+        """Write the database, holding the database lock.
+
+        With ``check_generation`` raise ``ConcurrentModificationError`` instead
+        of overwriting changes written by others since this was loaded, when
+        tracking changes (see ``track_changes``) they are merged instead.
+        """
+        with database_lock(self._metadata_file):
+            on_disk_generation = read_generation(self._metadata_file)
+            if on_disk_generation != self._generation:
+                modified = f"{self._metadata_file} was modified (generation {on_disk_generation}) since it was loaded (generation {self._generation})"
+                if self._baseline is not None:
+                    warn(f"{modified}, re-applying the changes made since to the updated database")
+                    self._reapply_changes_to_disk()
+                    on_disk_generation = self._generation
+                elif check_generation:
+                    raise ConcurrentModificationError(modified)
+            loaded_generation = self._generation if on_disk_generation == self._generation else None
+            generation = max(self._generation, on_disk_generation) + 1
+            self.metadata["generation"] = generation
+            metadata = plain_metadata(self.metadata)
+            validate_database_dict(metadata)  # make sure models validate before writing...
+
+            # TODO: backups...
+
+            # Dump it to a temporary file in the same directory and then move the
+            # file to prevent truncated file problems on serialization errors, etc..
+            # The temporary file keeps the extension selecting the compression.
+            with instrumentation.phase("yaml_dump"):
+                directory = os.path.dirname(os.path.abspath(self._metadata_file))
+                fd, temp_path = tempfile.mkstemp(dir=directory, suffix=compression_extension(self._metadata_file))
+                os.close(fd)
+                try:
+                    with open_compressed(temp_path, "w") as f:
+                        yaml.safe_dump(metadata, f)
+                except BaseException:
+                    os.remove(temp_path)
+                    raise
+                shutil.move(temp_path, self._metadata_file)
+            instrumentation.count("database_writes")
+            if instrumentation.current() is not None:
+                tools = metadata.get("tools") or {}
+                instrumentation.gauge("database_tools", len(tools))
+                instrumentation.gauge("database_versions", sum(len(tool.get("versions") or {}) for tool in tools.values()))
+            self._generation = generation
+            if self._baseline is not None:
+                self.track_changes()
+            self._update_persisted_search_index(loaded_generation)
+
+    def _reapply_changes_to_disk(self) -> None:
+        # called holding the database lock, so nobody writes in between
+        assert self._baseline is not None
+        baseline = pickle.loads(self._baseline)
+        changed = self.metadata
+        self._init()
+        _reapply_changes(self.metadata, baseline, changed)
+        baseline_tools = baseline.get("tools") or {}
+        changed_tools = changed.get("tools") or {}
+        for tool_id in set(baseline_tools) | set(changed_tools):
+            if baseline_tools.get(tool_id) != changed_tools.get(tool_id):
+                self._record_metadata_changed(tool_id)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List['ToolEntry']:
+        """Tools whose name, description, EDAM terms or xrefs match every term of ``query``, best first."""
+        return [self.get_entry_for(hit.tool_id) for hit in self.search_index().search(query, limit)]
+
+    def search_index(self) -> 'SearchIndex':
+        """Full-text index of the tools, loaded from next to the database (or rebuilt if stale)."""
+        from .search import search_index_path, SearchIndex
+
+        tools = self._tools_dict()
+        if self._search_index is None:
+            path = search_index_path(self._metadata_file)
+            index = SearchIndex.load(path)
+            if index is None or index.generation != self._generation:
+                index = SearchIndex.build(tools, self._generation)
+                # only persist an index matching the database on disk
+                if not self._search_dirty and os.path.exists(self._metadata_file):
+                    index.save(path)
+                self._search_dirty.clear()
+            self._search_index = index
+        for tool_id in self._search_dirty:
+            self._search_index.update_tool(tool_id, tools.get(tool_id))
+        self._search_dirty.clear()
+        return self._search_index
+
+    def _record_metadata_changed(self, tool_id: str) -> None:
+        self._search_dirty.add(tool_id)
+
+    def _update_persisted_search_index(self, loaded_generation: Optional[int]) -> None:
+        # Keep an existing persisted index current: if it matched the database
+        # this was loaded from, apply the changed tools and tag it with the new
+        # generation. Otherwise it is stale and gets rebuilt by the next search.
+        from .search import search_index_path, SearchIndex
+
+        path = search_index_path(self._metadata_file)
+        index = self._search_index
+        if index is None:
+            if loaded_generation is None or not os.path.exists(path):
+                return
+            index = SearchIndex.load(path)
+            if index is None or index.generation != loaded_generation:
+                return
+        elif index.generation != loaded_generation:
+            return
+        tools = self._tools_dict()
+        for tool_id in self._search_dirty:
+            index.update_tool(tool_id, tools.get(tool_id))
+        self._search_dirty.clear()
+        index.generation = self._generation
+        index.save(path)
+        self._search_index = index
 
     def known_servers(self):
         """List of unique servers attached to tool metadata."""
@@ -91,7 +345,7 @@ class ToolsMetadata:
 
     def entries(self, server: Optional[Server] = None, filter_criteria: FilterCriteria = None) -> Iterator['ToolEntry']:
         for tool_id, tool_metadata in self.walk_tools_dict(filter_criteria):
-            yield ToolEntry(tool_metadata, tool_id, server)
+            yield ToolEntry(tool_metadata, tool_id, server, self)
 
     def clear_test_results(self, test_target):
         for _, tool_metadata in self._tools_dict().items():
@@ -108,15 +362,74 @@ class ToolsMetadata:
             if not external_labels:
                 tool_metadata.pop("external_labels", None)
 
+    def merge(self, other: 'ToolsMetadata', merge_strategy: TestDataMergeStrategy = TestDataMergeStrategy.latest_executed):
+        """Merge the (partial) database ``other`` into this one.
+
+        Versions, servers, sections, labels and trainings are unioned, test
+        results for the same target are reconciled using ``merge_strategy``
+        and panels are replaced per server. Other values from ``other`` win, so
+        merging is associative and idempotent.
+        """
+        tools = self._tools_dict()
+        for tool_id, other_tool in other._tools_dict().items():
+            if tool_id not in tools:
+                self._tool_id_index = None
+            _merge_tool(_ensure_key(tools, tool_id, {}), other_tool, merge_strategy)
+            self._record_metadata_changed(tool_id)
+        other_panels = other.metadata.get("integrated_panels") or {}
+        if other_panels:
+            panels = _ensure_key(self.metadata, "integrated_panels", {})
+            for server_label, skeleton in other_panels.items():
+                panels[server_label] = copy.deepcopy(skeleton)
+
+    def apply_retention(self, policy: RetentionPolicy) -> Dict[str, int]:
+        """Prune the database according to ``policy``, returning counts of what was removed."""
+        if policy.keep_versions is not None and policy.keep_versions < 1:
+            raise Exception(f"Must keep at least 1 version of each tool, not {policy.keep_versions}")
+        removed = {counter: 0 for counter in RETENTION_COUNTERS}
+        tools = self._tools_dict()
+        for tool_id in list(tools.keys()):
+            tool_metadata = tools[tool_id]
+            versions = tool_metadata.get("versions") or {}
+            version_count = len(versions)
+            if policy.tests_before is not None:
+                for version_metadata in versions.values():
+                    removed["test_results"] += _prune_test_results(version_metadata, policy.tests_before)
+            pruned_versions: List[str] = []
+            if policy.drop_unavailable_versions:
+                pruned_versions += [v for v, version_metadata in versions.items() if not version_metadata.get("servers")]
+            if policy.keep_versions is not None:
+                pruned_versions += [v for v in _version_sorted_keys(versions) if v not in pruned_versions][policy.keep_versions:]
+            for version in pruned_versions:
+                del versions[version]
+                removed["versions"] += 1
+            if pruned_versions:
+                # servers list the versions they have installed too
+                for server_metadata in (tool_metadata.get("servers") or {}).values():
+                    server_versions = server_metadata.get("versions")
+                    if server_versions:
+                        server_metadata["versions"] = [v for v in server_versions if v not in pruned_versions]
+            if policy.drop_empty:
+                for version_metadata in versions.values():
+                    removed["empty_containers"] += _drop_empty_containers(version_metadata, _VERSION_CONTAINER_KEYS)
+                removed["empty_containers"] += _drop_empty_containers(tool_metadata, _TOOL_CONTAINER_KEYS)
+                if not tool_metadata:
+                    del tools[tool_id]
+                    self._tool_id_index = None
+                    removed["tools"] += 1
+            if tool_id not in tools or len(versions) != version_count:
+                self._record_metadata_changed(tool_id)
+        return removed
+
     def _tools_dict(self):
-        return _ensure_key(self.metadata, "tools", {})
+        return _ensure_key(self.metadata, "tools", compact_tools() if self._compact else {})
 
     def _panels_dict(self):
         return _ensure_key(self.metadata, "panels", {})
 
     def walk_tools_dict(self, filter_criteria: Optional[FilterCriteria] = None):
         filter_criteria = filter_criteria or FilterCriteria()
-        for tool_id, tool_metadata in self._tools_dict().items():
+        for tool_id, tool_metadata in self._filtered_tools_items(filter_criteria):
             repo_dict = tool_metadata.get("tool_shed_repository", None)
 
             if filter_criteria.require_repository and repo_dict is None:
@@ -145,6 +458,46 @@ class ToolsMetadata:
 
             yield tool_id, tool_metadata
 
+    def _filtered_tools_items(self, filter_args: FilterArguments):
+        tools = self._tools_dict()
+        if not filter_args.filters_tool_ids:
+            return tools.items()
+        return ((tool_id, tools[tool_id]) for tool_id in self.select_tool_ids(filter_args))
+
+    def tool_id_index(self) -> ToolIdIndex:
+        """Sorted index of the tool ids for tool shed, owner, repository and prefix queries.
+
+        Built once and reused until tools are added or removed, versions recorded
+        since still resolve through their versionless tool id.
+        """
+        if self._tool_id_index is None:
+            self._tool_id_index = ToolIdIndex.from_tools_dict(self._tools_dict())
+        return self._tool_id_index
+
+    def build_indexes(self) -> None:
+        """Build the lazily built indexes (tool ids, search) now.
+
+        Until the database is changed again reading it then doesn't modify this
+        object, so the daemon runs reading commands concurrently.
+        """
+        self._tools_dict()
+        self.tool_id_index()
+        self.search_index()
+
+    def indexes_built(self) -> bool:
+        return (
+            "tools" in self.metadata
+            and self._tool_id_index is not None
+            and self._search_index is not None
+            and not self._search_dirty
+        )
+
+    def select_tool_ids(self, filter_args: FilterArguments) -> List[str]:
+        """Sorted ids of the tools matching the tool shed id filters of ``filter_args``."""
+        return self.tool_id_index().select(
+            filter_args.tool_shed, filter_args.owner, filter_args.repository, filter_args.tool_id_prefix
+        )
+
     def install_dict(self, servers: Optional[List[str]], filter_args: FilterArguments):
         """Return an install dict for Ephemeris or ansible-galaxy-tools."""
         repos = []
@@ -155,6 +508,7 @@ class ToolsMetadata:
         filter_criteria.require_main_shed = True
         filter_criteria.require_labels = filter_args.require_labels
         filter_criteria.exclude_labels = filter_args.exclude_labels
+        filter_criteria.set_tool_id_filters(filter_args)
 
         for _, tool_metadata in self.walk_tools_dict(filter_criteria):
             repo_dict = tool_metadata.get("tool_shed_repository", None)
@@ -191,10 +545,207 @@ class ToolsMetadata:
         }
 
     def panel_view_dict(self, server_label: str, view_def: ViewDefintion):
-        filter_criteria = FilterCriteria()
-        filter_criteria.require_labels = view_def.require_labels
-        filter_criteria.exclude_labels = view_def.exclude_labels
+        return self.panel_view_index().panel_view_dict(server_label, view_def)
+
+    def panel_view_index(self) -> 'PanelViewIndex':
+        """Index used to build any number of panel views with a single walk of the tools."""
+        return PanelViewIndex(self)
+
+    def edam_index(self) -> 'EdamIndex':
+        """Index of the EDAM topics and operations of the tools, from a single walk of the tools."""
+        from .edam import EdamIndex
+
+        return EdamIndex.from_tools_metadata(self)
+
+    def sections_tools(self, server_label: str, filter_criteria: FilterCriteria) -> Dict[str, Set[str]]:
+        sections_tools: Dict[str, Set[str]] = {}
+        for tool_entry in self.entries(filter_criteria=filter_criteria):
+            server_dict = tool_entry.server_dict_for(server_label)
+            if server_dict is None:
+                continue  # tool not found on server
+
+            server_sections = server_dict.get("sections") or {}
+            for server_section_id in server_sections.keys():
+                section_tools = _ensure_key(sections_tools, server_section_id, set())
+                section_tools.add(tool_entry.tool_id)
+        return sections_tools
+
+    def import_trainings(self, training_directory: str, checkpoint: Optional['ImportCheckpoint'] = None) -> 'TrainingIndex':
+        """Record the tools used by the tutorials in ``training_directory``, return the tutorials -> tools index.
+
+        With a ``checkpoint``, tutorials (``topic/tutorial``) it records as completed are skipped
+        and each imported tutorial is recorded.
+        """
+        from .workflows import parse_tools  # gxformat2 is slow to import, only load it when needed
+
+        self.dedupe_trainings()
+        index = TrainingIndex()
+        topics_directory = os.path.join(training_directory, "topics")
+        for topic in sorted(os.listdir(topics_directory)):
+            topic_directory = os.path.join(topics_directory, topic)
+            tutorials_directory = os.path.join(topic_directory, "tutorials")
+            if not os.path.exists(tutorials_directory):
+                continue
+            tutorials = sorted(os.listdir(tutorials_directory))
+            for tutorial in tutorials:
+                if checkpoint is not None and checkpoint.is_completed(f"{topic}/{tutorial}"):
+                    continue
+                tutorial_directory = os.path.join(tutorials_directory, tutorial)
+                self._record_training_tools(topic, tutorial, parse_tools(tutorial_directory), index)
+                if checkpoint is not None:
+                    checkpoint.complete(f"{topic}/{tutorial}")
+        return index
+
+    def import_training_workflow(self, training_directory: str, workflow_path: str) -> Optional[Tuple[str, str]]:
+        """Record the tools used by a single tutorial workflow file, return its ``(topic, tutorial)``.
+
+        Returns ``None`` (and records nothing) if ``workflow_path`` isn't inside a
+        tutorial (``topics/<topic>/tutorials/<tutorial>/``) of ``training_directory``.
+        """
+        from .workflows import parse_tools
+
+        parts = os.path.relpath(workflow_path, training_directory).split(os.sep)
+        if len(parts) < 5 or parts[0] != "topics" or parts[2] != "tutorials":
+            return None
+        topic, tutorial = parts[1], parts[3]
+        self._record_training_tools(topic, tutorial, parse_tools(workflow_path), TrainingIndex())
+        return topic, tutorial
+
+    def _record_training_tools(self, topic: str, tutorial: str, workflow_tools, index: 'TrainingIndex') -> None:
+        for (raw_tool_id, tool_version) in workflow_tools:
+            tool_id = _versionless_tool_id(raw_tool_id)
+            if tool_version is None and "repos" in raw_tool_id:
+                # TODO: workflow missing version - why?
+                tool_version = raw_tool_id.rsplit("/", 1)[1]
+
+            tool_entry = self.get_entry_for(tool_id)
+            if not tool_version:
+                warn(f"No tool_version for tool_id {tool_id} found in workflow and cannot infer from tool ID, skipping training entry")
+                continue
+
+            tool_version_entry = tool_entry.get_version_entry(tool_version)
+            tool_version_entry.record_training(TrainingMetadata(topic=topic, tutorial=tutorial))
+            index.add(topic, tutorial, tool_id, tool_version)
+
+    def training_index(self) -> 'TrainingIndex':
+        """Index of the tools (and versions) used by each tutorial, from a single walk of the tools."""
+        index = TrainingIndex()
+        for tool_id, tool_metadata in self.walk_tools_dict():
+            for tool_version, version_metadata in (tool_metadata.get("versions") or {}).items():
+                for training in version_metadata.get("trainings") or []:
+                    index.add(training["topic"], training["tutorial"], tool_id, tool_version)
+        return index
+
+    def dedupe_trainings(self) -> int:
+        """Drop duplicated training records (left by older versions re-running import-trainings)."""
+        removed = 0
+        for _, tool_metadata in self._tools_dict().items():
+            for version_metadata in (tool_metadata.get("versions") or {}).values():
+                trainings = version_metadata.get("trainings")
+                if not trainings:
+                    continue
+                seen = set()
+                deduped = []
+                for training in trainings:
+                    key = (training["topic"], training["tutorial"])
+                    if key not in seen:
+                        seen.add(key)
+                        deduped.append(training)
+                if len(deduped) != len(trainings):
+                    removed += len(trainings) - len(deduped)
+                    version_metadata["trainings"] = deduped
+        return removed
+
+    # YAGNI
+    # def entries_with_label(self, label):
+    #     for tool_entry in self.entries(filter_criteria=filter_criteria):
+    #         if tool_entry.has_external_label(label):
+    #             yield tool_entry
+
+    # def tool_ids_for(self, server_label: str) -> List[str]:
+    #     tool_ids = List[str]
+    #     for tool_entry in self.entries():
+    #         if tool_entry.has_server_data_for(server_label):
+    #             tool_ids.append(tool_entry.tool_id)
+    #     return tool_ids
 
+
+class TrainingIndex:
+    """(topic, tutorial) -> tool id -> versions, the reverse of the trainings recorded on tool versions."""
+
+    def __init__(self):
+        self.tutorial_tools: Dict[Tuple[str, str], Dict[str, Set[str]]] = {}
+
+    def add(self, topic: str, tutorial: str, tool_id: str, tool_version: str):
+        tools = self.tutorial_tools.setdefault((topic, tutorial), {})
+        tools.setdefault(tool_id, set()).add(tool_version)
+
+    def tutorials(self) -> List[Tuple[str, str]]:
+        return sorted(self.tutorial_tools.keys())
+
+    def tools_for(self, topic: str, tutorial: str) -> Dict[str, Set[str]]:
+        return self.tutorial_tools.get((topic, tutorial), {})
+
+    @property
+    def tool_ids(self) -> Set[str]:
+        return {tool_id for tools in self.tutorial_tools.values() for tool_id in tools}
+
+
+class PanelViewIndex:
+    """(server, section) -> tools and label -> tools maps for generating panel views.
+
+    Building panel views straight from ``ToolsMetadata`` walks every tool for the
+    sections and again for the excludes of each view, building this once lets many
+    views (across many servers) be produced from the same pass over the database.
+    """
+
+    def __init__(self, tools_metadata: ToolsMetadata):
+        self._tools_metadata = tools_metadata
+        self._edam_index: Optional['EdamIndex'] = None
+        # server label -> section id -> tool ids (in database order)
+        self.sections_tools: Dict[str, Dict[str, List[str]]] = {}
+        # label -> tool ids (in database order)
+        self.label_tools: Dict[str, List[str]] = {}
+        self.tool_labels: Dict[str, Set[str]] = {}
+        self.tool_servers: Dict[str, Set[str]] = {}
+        for tool_id, tool_metadata in tools_metadata.walk_tools_dict():
+            labels = tool_metadata.get("external_labels") or []
+            self.tool_labels[tool_id] = set(labels)
+            for label in labels:
+                _ensure_key(self.label_tools, label, []).append(tool_id)
+            servers = tool_metadata.get("servers") or {}
+            self.tool_servers[tool_id] = set(servers.keys())
+            for server_label, server_dict in servers.items():
+                server_sections = (server_dict or {}).get("sections") or {}
+                server_sections_tools = _ensure_key(self.sections_tools, server_label, {})
+                for section_id in server_sections.keys():
+                    _ensure_key(server_sections_tools, section_id, []).append(tool_id)
+
+    def _matches(self, tool_id: str, require_labels: Optional[List[str]], exclude_labels: Optional[List[str]]) -> bool:
+        labels = self.tool_labels.get(tool_id, set())
+        if require_labels and not labels.issuperset(require_labels):
+            return False
+        if exclude_labels and not labels.isdisjoint(exclude_labels):
+            return False
+        return True
+
+    def _view_filter(self, view_def: ViewDefintion) -> Callable[[str], bool]:
+        selected = set(self._tools_metadata.select_tool_ids(view_def)) if view_def.filters_tool_ids else None
+
+        def matches(tool_id: str) -> bool:
+            if selected is not None and tool_id not in selected:
+                return False
+            return self._matches(tool_id, view_def.require_labels, view_def.exclude_labels)
+
+        return matches
+
+    @property
+    def edam_index(self) -> 'EdamIndex':
+        if self._edam_index is None:
+            self._edam_index = self._tools_metadata.edam_index()
+        return self._edam_index
+
+    def panel_view_dict(self, server_label: str, view_def: ViewDefintion):
         rval: Dict[str, Any] = {
             "id": view_def.id,
             "type": view_def.view_type,
@@ -203,11 +754,31 @@ class ToolsMetadata:
         if view_def.description:
             rval["description"] = view_def.description
 
-        sections_tools = self.sections_tools(server_label, filter_criteria)
-        panel_skeleton = self.panel_skeleton_for(server_label)
+        if view_def.group_by == PANEL_VIEW_GROUP_BY_EDAM_TOPIC:
+            rval["items"] = self._edam_topic_items(server_label, view_def)
+        else:
+            rval["items"] = self._skeleton_items(server_label, view_def)
+
+        exclude_labels = view_def.exclude_labels
+        if exclude_labels:
+            excluded_ids: Set[str] = set()
+            for label in exclude_labels:
+                for tool_id in self.label_tools.get(label, []):
+                    if server_label not in self.tool_servers[tool_id]:
+                        excluded_ids.add(tool_id)
+            # keep database order so the output is stable
+            rval["excludes"] = [
+                {"tool_id": tool_id} for tool_id in self.tool_labels if tool_id in excluded_ids
+            ]
+        return rval
+
+    def _skeleton_items(self, server_label: str, view_def: ViewDefintion) -> List[Dict[str, Any]]:
+        panel_skeleton = self._tools_metadata.panel_skeleton_for(server_label)
         if panel_skeleton is None:
             raise Exception(f"No panel skeleton bootstrapped for {server_label}")
 
+        server_sections_tools = self.sections_tools.get(server_label, {})
+        matches = self._view_filter(view_def)
         items = []
         for panel_skeleton_item in panel_skeleton:
             model_class = panel_skeleton_item["model_class"]
@@ -226,7 +797,9 @@ class ToolsMetadata:
                 assert model_class == "ToolSection"
                 section_id = panel_skeleton_item_id
                 name = panel_skeleton_item["name"]
-                section_tools = sections_tools.get(section_id)
+                section_tools = [
+                    tool_id for tool_id in server_sections_tools.get(section_id, []) if matches(tool_id)
+                ]
                 if not section_tools:
                     continue
 
@@ -235,85 +808,40 @@ class ToolsMetadata:
                     "name": name,
                     "type": "section",
                 }
-                # If we're requiring a label need to specify the elements, otherwise we can just
-                # count on a global exclude of the tools in the map.
-                if view_def.require_labels:
-                    section_items = []
-                    for tool_id in section_tools:
-                        section_items.append({
-                            "type": "tool",
-                            "id": tool_id,
-                        })
-                    section["items"] = section_items
+                # If we're requiring a label (or selecting tool ids) need to specify the elements,
+                # otherwise we can just count on a global exclude of the tools in the map.
+                if view_def.require_labels or view_def.filters_tool_ids:
+                    section["items"] = [{"type": "tool", "id": tool_id} for tool_id in section_tools]
                 items.append(section)
+        return items
 
-        rval["items"] = items
+    def _edam_topic_items(self, server_label: str, view_def: ViewDefintion) -> List[Dict[str, Any]]:
+        # one section per EDAM topic (tools with several topics appear in each), untagged tools last
+        from .edam import EDAM_TOPIC
 
-        exclude_labels = view_def.exclude_labels
-        if exclude_labels:
-            excluded_ids = []
-            for tool_entry in self.entries():
-                if tool_entry.has_server_data_for(server_label):
-                    continue
+        edam_index = self.edam_index
+        if not any(server_label in servers for servers in self.tool_servers.values()):
+            raise Exception(f"No tools recorded for {server_label}")
+        matches = self._view_filter(view_def)
 
-                for excluded_label in exclude_labels:
-                    if tool_entry.has_external_label(excluded_label):
-                        excluded_ids.append(tool_entry.tool_id)
-            rval["excludes"] = [
-                {"tool_id": tool_id} for tool_id in excluded_ids
+        def section(section_id: str, name: str, tool_ids: List[str]) -> Optional[Dict[str, Any]]:
+            section_tools = [
+                tool_id for tool_id in tool_ids
+                if server_label in self.tool_servers[tool_id] and matches(tool_id)
             ]
-        return rval
-
-    def sections_tools(self, server_label: str, filter_criteria: FilterCriteria) -> Dict[str, Set[str]]:
-        sections_tools: Dict[str, Set[str]] = {}
-        for tool_entry in self.entries(filter_criteria=filter_criteria):
-            server_dict = tool_entry.server_dict_for(server_label)
-            if server_dict is None:
-                continue  # tool not found on server
-
-            server_sections = server_dict.get("sections") or {}
-            for server_section_id in server_sections.keys():
-                section_tools = _ensure_key(sections_tools, server_section_id, set())
-                section_tools.add(tool_entry.tool_id)
-        return sections_tools
-
-    def import_trainings(self, training_directory: str):
-        topics_directory = os.path.join(training_directory, "topics")
-        for topic in os.listdir(topics_directory):
-            topic_directory = os.path.join(topics_directory, topic)
-            tutorials_directory = os.path.join(topic_directory, "tutorials")
-            if not os.path.exists(tutorials_directory):
-                continue
-            tutorials = os.listdir(tutorials_directory)
-            for tutorial in tutorials:
-                tutorial_directory = os.path.join(tutorials_directory, tutorial)
-                workflow_tools = parse_tools(tutorial_directory)
-                for (raw_tool_id, tool_version) in workflow_tools:
-                    tool_id = _versionless_tool_id(raw_tool_id)
-                    if tool_version is None and "repos" in raw_tool_id:
-                        # TODO: workflow missing version - why?
-                        tool_version = raw_tool_id.rsplit("/", 1)[1]
-
-                    tool_entry = self.get_entry_for(tool_id)
-                    if not tool_version:
-                        warn(f"No tool_version for tool_id {tool_id} found in workflow and cannot infer from tool ID, skipping training entry")
-                        continue
+            if not section_tools:
+                return None
+            # sections don't exist on the server, so always list their tools
+            return {
+                "id": section_id,
+                "name": name,
+                "type": "section",
+                "items": [{"type": "tool", "id": tool_id} for tool_id in section_tools],
+            }
 
-                    tool_version_entry = tool_entry.get_version_entry(tool_version)
-                    tool_version_entry.record_training(TrainingMetadata(topic=topic, tutorial=tutorial))
-
-    # YAGNI
-    # def entries_with_label(self, label):
-    #     for tool_entry in self.entries(filter_criteria=filter_criteria):
-    #         if tool_entry.has_external_label(label):
-    #             yield tool_entry
-
-    # def tool_ids_for(self, server_label: str) -> List[str]:
-    #     tool_ids = List[str]
-    #     for tool_entry in self.entries():
-    #         if tool_entry.has_server_data_for(server_label):
-    #             tool_ids.append(tool_entry.tool_id)
-    #     return tool_ids
+        sections = [section(topic, topic, edam_index.tools_for(EDAM_TOPIC, topic)) for topic in edam_index.terms(EDAM_TOPIC)]
+        sections.append(section(EDAM_UNCATEGORIZED_SECTION_ID, EDAM_UNCATEGORIZED_SECTION_NAME, edam_index.untagged_tools(EDAM_TOPIC)))
+        return [s for s in sections if s is not None]
 
 
 def filter_server_dicts(tool_metadata, servers: Optional[List[str]] = None):
@@ -331,11 +859,13 @@ def filter_server_dicts(tool_metadata, servers: Optional[List[str]] = None):
 
 class ToolEntry:
 
-    def __init__(self, source_data: dict, tool_id: str, server: Optional[Server] = None):
+    def __init__(self, source_data: dict, tool_id: str, server: Optional[Server] = None, tools_metadata: Optional[ToolsMetadata] = None):
         self._source_data = source_data
         self._tool_id = tool_id
         self._server = server
+        self._tools_metadata = tools_metadata
         self._server_dict()  # just to init it...
+        instrumentation.count_distinct("tools_touched", tool_id)
 
     def _server_dict(self):
         if self._server is not None:
@@ -343,11 +873,13 @@ class ToolEntry:
             return _ensure_key(servers, self._server.label, {})
         return None
 
+    # Accessors reading the tool don't fill in missing keys, so the daemon can
+    # run reading commands concurrently (see ToolsMetadata.build_indexes).
     def has_server_data_for(self, server_label):
-        return server_label in _ensure_key(self._source_data, "servers", {})
+        return server_label in (self._source_data.get("servers") or {})
 
     def server_dict_for(self, server_label: str):
-        return _ensure_key(self._source_data, "servers", {}).get(server_label)
+        return (self._source_data.get("servers") or {}).get(server_label)
 
     def get_version_entry(self, version: str) -> Optional['ToolVersionEntry']:
         versions = _ensure_key(self._source_data, "versions", {})
@@ -362,10 +894,11 @@ class ToolEntry:
             if version not in server_versions:
                 server_versions.append(version)
 
+        instrumentation.count_distinct("versions_touched", (self._tool_id, version))
         return ToolVersionEntry(versions[version], self, version)
 
     def get_version_entries(self):
-        versions_dict = _ensure_key(self._source_data, "versions", {})
+        versions_dict = self._source_data.get("versions") or {}
         versions = _version_sorted_keys(versions_dict)
         for version in versions:
             yield self.get_version_entry(version)
@@ -399,10 +932,7 @@ class ToolEntry:
                 external_labels.remove(label)
 
     def has_external_label(self, label):
-        if not "external_labels" in self._source_data:
-            return False
-        external_labels = _ensure_key(self._source_data, "external_labels", [])
-        return label in external_labels
+        return label in (self._source_data.get("external_labels") or [])
 
     def get_latest_test_results_dict(self) -> Dict[str, 'ToolLatestTestResults']:
         latest_test_results_dict = {}
@@ -515,18 +1045,23 @@ class ToolVersionEntry:
 
     def record_training(self, training: TrainingMetadata):
         trainings = _ensure_key(self._source_data, "trainings", [])
-        trainings.append(training.dict())
+        training_dict = training.dict()
+        if training_dict not in trainings:
+            trainings.append(training_dict)
 
     @property
     def trainings(self):
         trainings: Set[TrainingMetadata] = set()
-        raw_trainings = _ensure_key(self._source_data, "trainings", [])
-        for raw_training in raw_trainings:
+        for raw_training in self._source_data.get("trainings") or []:
             trainings.add(TrainingMetadata(**raw_training))
         return trainings
 
     def record_test_results(self, test_target, test_results: TestResults, merge_strategy: TestDataMergeStrategy):
-        results = self.get_test_results()
+        with instrumentation.phase("merge_test_results"):
+            self._record_test_results(test_target, test_results, merge_strategy)
+
+    def _record_test_results(self, test_target, test_results: TestResults, merge_strategy: TestDataMergeStrategy):
+        results = _ensure_key(self._source_data, "test_results", {})
         target_results = results.get(test_target)
         if not target_results:
             # just set them, no need to worry about how to replace...
@@ -538,13 +1073,12 @@ class ToolVersionEntry:
             results[test_target] = merged_test_results.dict()["__root__"]
 
     def get_test_results_for(self, test_target) -> Dict:
-        results = self.get_test_results()
+        results = _ensure_key(self._source_data, "test_results", {})
         target_results = _ensure_key(results, test_target, {})
         return target_results
 
     def get_test_results(self):
-        results = _ensure_key(self._source_data, "test_results", {})
-        return results
+        return self._source_data.get("test_results") or {}
 
     def record_metadata(
         self,
@@ -556,6 +1090,9 @@ class ToolVersionEntry:
         model_class: Optional[str] = None,
     ):
         data = self._source_data
+        tools_metadata = self._tool_entry._tools_metadata
+        if tools_metadata is not None:
+            tools_metadata._record_metadata_changed(self._tool_entry.tool_id)
         data["name"] = name
         if description:
             data["description"] = description
@@ -574,6 +1111,99 @@ class ToolLatestTestResults:
     test_results: dict
 
 
+def _prune_test_results(version_metadata, tests_before: str) -> int:
+    # results without a job_create_time can't be dated, they are kept
+    removed = 0
+    for target_results in (version_metadata.get("test_results") or {}).values():
+        for index in list(target_results.keys()):
+            job_create_time = target_results[index].get("job_create_time")
+            if job_create_time is not None and str(job_create_time) < tests_before:
+                del target_results[index]
+                removed += 1
+    return removed
+
+
+def _drop_empty_containers(metadata, keys: List[str]) -> int:
+    removed = 0
+    test_results = (metadata.get("test_results") if "test_results" in keys else None) or {}
+    for test_target in [target for target, results in test_results.items() if not results]:
+        del test_results[test_target]
+        removed += 1
+    for key in keys:
+        if key in metadata and not metadata[key]:
+            del metadata[key]
+            removed += 1
+    return removed
+
+
+def _merge_tool(tool, other_tool, merge_strategy: TestDataMergeStrategy):
+    for key, value in other_tool.items():
+        if key == "versions" and value:
+            versions = _ensure_key(tool, "versions", {})
+            for version, other_version in value.items():
+                _merge_version(_ensure_key(versions, version, {}), other_version, merge_strategy)
+        else:
+            _merge_value(tool, key, value)
+
+
+def _merge_version(version, other_version, merge_strategy: TestDataMergeStrategy):
+    for key, value in other_version.items():
+        if key == "test_results" and value:
+            results = _ensure_key(version, "test_results", {})
+            for test_target, other_target_results in value.items():
+                target_results = results.get(test_target)
+                if not target_results:
+                    results[test_target] = to_plain(other_target_results)
+                else:
+                    merged = TestResults(__root__=to_plain(target_results)).merged(
+                        TestResults(__root__=to_plain(other_target_results)), merge_strategy
+                    )
+                    results[test_target] = merged.dict(exclude_none=True)["__root__"]
+        else:
+            _merge_value(version, key, value)
+
+
+def _merge_value(target, key, value):
+    # mappings merge recursively, lists are unioned keeping order, anything else but None is replaced
+    existing = target.get(key)
+    if value is None:
+        # nothing known, keep what is there
+        if key not in target:
+            target[key] = None
+    elif isinstance(existing, Mapping) and isinstance(value, Mapping):
+        for item_key, item_value in value.items():
+            _merge_value(existing, item_key, item_value)
+    elif isinstance(existing, list) and isinstance(value, list):
+        for item in value:
+            if item not in existing:
+                existing.append(to_plain(item))
+    else:
+        target[key] = to_plain(value)
+
+
+def _reapply_changes(target, baseline, changed):
+    # apply the difference between the mappings baseline and changed to target:
+    # changed values are replaced (mappings recursively), list items added or
+    # removed are added to or removed from the target's list, removed keys removed
+    for key, value in changed.items():
+        if key in baseline and baseline[key] == value:
+            continue
+        base_value = baseline.get(key)
+        existing = target.get(key)
+        if isinstance(existing, Mapping) and isinstance(value, Mapping):
+            _reapply_changes(existing, base_value if isinstance(base_value, Mapping) else {}, value)
+        elif isinstance(existing, list) and isinstance(value, list):
+            base_items = base_value if isinstance(base_value, list) else []
+            removed = [item for item in base_items if item not in value]
+            kept = [item for item in existing if item not in removed]
+            target[key] = [to_plain(item) for item in kept + [item for item in value if item not in base_items and item not in kept]]
+        else:
+            target[key] = to_plain(value)
+    for key in baseline:
+        if key not in changed:
+            target.pop(key, None)
+
+
 def _ensure_key(the_dict: dict, key: str, the_default: Any):
     if key not in the_dict:
         the_dict[key] = the_default
@@ -587,10 +1217,7 @@ def _id_to_version(tool_id):
 
 
 def _versionless_tool_id(tool_id):
-    if 'repos' in tool_id:
-        return tool_id.rsplit("/", 1)[0]
-    else:
-        return tool_id
+    return versionless_tool_id(tool_id)
 
 
 def _version_sorted_keys(versions_dict: Dict[str, Any]) -> List[str]:
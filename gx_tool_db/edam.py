@@ -0,0 +1,111 @@
+"""Index of EDAM topics and operations to the tools annotated with them.
+
+EDAM annotations are recorded per tool version, a tool is indexed under the
+terms of its newest version carrying annotations of that kind. Per term
+server counts are accumulated while building the index so aggregate reports
+(tools per term per server, terms without tools on a server) don't walk the
+database again.
+"""
+from collections import Counter
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Set
+
+from .db import ToolsMetadata, version_sorted_iterable
+
+EDAM_TOPIC = "topic"
+EDAM_OPERATION = "operation"
+EDAM_KINDS = [EDAM_TOPIC, EDAM_OPERATION]
+# EDAM kind -> version metadata field holding its terms
+EDAM_FIELDS = {
+    EDAM_TOPIC: "edam_topics",
+    EDAM_OPERATION: "edam_operations",
+}
+
+
+class EdamTermSummary(NamedTuple):
+    kind: str
+    term: str
+    tools: int
+    # server label -> number of the term's tools on that server
+    server_tools: Dict[str, int]
+
+
+def newest_edam_terms(tool_metadata: Mapping[str, Any], kind: str) -> List[str]:
+    """EDAM terms of ``kind`` from the newest version of a tool annotated with any."""
+    field = EDAM_FIELDS[kind]
+    versions = tool_metadata.get("versions") or {}
+    for version in version_sorted_iterable(versions.keys()):
+        terms = (versions[version] or {}).get(field)
+        if terms:
+            return list(terms)
+    return []
+
+
+class EdamIndex:
+    """EDAM kind -> term -> tool ids, with per term server counts."""
+
+    def __init__(self):
+        # kind -> term -> tool ids (in database order)
+        self.term_tools: Dict[str, Dict[str, List[str]]] = {kind: {} for kind in EDAM_KINDS}
+        # tool id -> kind -> terms
+        self.tool_terms: Dict[str, Dict[str, List[str]]] = {}
+        # tool id -> servers the tool is on
+        self.tool_servers: Dict[str, Set[str]] = {}
+        self._server_counts: Dict[str, Dict[str, Counter]] = {kind: {} for kind in EDAM_KINDS}
+
+    @staticmethod
+    def from_tools_metadata(tools_metadata: ToolsMetadata) -> 'EdamIndex':
+        index = EdamIndex()
+        for tool_id, tool_metadata in tools_metadata.walk_tools_dict():
+            index.add(tool_id, tool_metadata)
+        return index
+
+    def add(self, tool_id: str, tool_metadata: Mapping[str, Any]):
+        servers = set((tool_metadata.get("servers") or {}).keys())
+        self.tool_servers[tool_id] = servers
+        tool_terms = self.tool_terms[tool_id] = {}
+        for kind in EDAM_KINDS:
+            terms = newest_edam_terms(tool_metadata, kind)
+            tool_terms[kind] = terms
+            for term in dict.fromkeys(terms):
+                self.term_tools[kind].setdefault(term, []).append(tool_id)
+                self._server_counts[kind].setdefault(term, Counter()).update(servers)
+
+    @property
+    def servers(self) -> List[str]:
+        return sorted(set().union(*self.tool_servers.values()))
+
+    def terms(self, kind: str) -> List[str]:
+        return sorted(self.term_tools[kind])
+
+    def tools_for(self, kind: str, term: str, server: Optional[str] = None) -> List[str]:
+        tool_ids = self.term_tools[kind].get(term, [])
+        if server is not None:
+            tool_ids = [tool_id for tool_id in tool_ids if server in self.tool_servers[tool_id]]
+        return tool_ids
+
+    def terms_for(self, tool_id: str, kind: str) -> List[str]:
+        return self.tool_terms.get(tool_id, {}).get(kind, [])
+
+    def untagged_tools(self, kind: str) -> List[str]:
+        """Tools without any EDAM terms of ``kind``."""
+        return [tool_id for tool_id, tool_terms in self.tool_terms.items() if not tool_terms[kind]]
+
+    def tool_counts(self, kind: str, servers: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """term -> server -> number of tools annotated with the term on that server."""
+        servers = self.servers if servers is None else servers
+        return {
+            term: {server: counts[server] for server in servers}
+            for term, counts in sorted(self._server_counts[kind].items())
+        }
+
+    def terms_missing_on(self, server: str, kind: str) -> List[str]:
+        """Terms used by some tool, none of which is on ``server``."""
+        return [term for term, counts in sorted(self._server_counts[kind].items()) if not counts[server]]
+
+    def summaries(self, kinds: Optional[List[str]] = None, servers: Optional[List[str]] = None) -> List[EdamTermSummary]:
+        servers = self.servers if servers is None else servers
+        summaries = []
+        for kind in kinds or EDAM_KINDS:
+            for term, server_tools in self.tool_counts(kind, servers).items():
+                summaries.append(EdamTermSummary(kind, term, len(self.term_tools[kind][term]), server_tools))
+        return summaries
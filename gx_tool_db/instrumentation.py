@@ -0,0 +1,273 @@
+"""Lightweight per-phase timing and counters used by ``--profile``.
+
+Modules wrap interesting work in :func:`phase` and bump counters with
+:func:`count` / :func:`count_distinct`, record latencies and other values with
+:func:`observe` and current values with :func:`gauge`. All are no-ops unless a
+:class:`Profile` has been activated with :func:`enable`, so the hooks can
+stay in hot paths. Keyword arguments to :func:`count` and :func:`observe` are
+labels (e.g. ``server``), labelled counts also add to the counter's total.
+
+::
+
+    from . import instrumentation
+
+    with instrumentation.phase("yaml_load"):
+        ...
+    instrumentation.count("http_bytes", len(content), server=url)
+"""
+import contextlib
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+PROFILE_FORMATS = ["text", "json"]
+
+# sorted (label, value) pairs
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class PhaseStats:
+    """Accumulated cost of every call to one named phase."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_memory_bytes: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
+
+
+class Observation:
+    """Count, sum and maximum of the values observed for one series."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "sum": round(self.total, 6), "max": round(self.maximum, 6)}
+
+
+def _labels_suffix(labels: Labels) -> str:
+    return "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+
+
+class _ActivePhase:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.peak = 0
+
+
+class Profile:
+    """Collects phase timings and counters for one command run."""
+
+    def __init__(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        # counter -> labels -> the part of the counter's total counted with those labels
+        self.labeled_counters: Dict[str, Dict[Labels, int]] = {}
+        self.observations: Dict[str, Dict[Labels, Observation]] = {}
+        self.gauges: Dict[str, float] = {}
+        self._distinct: Dict[str, Set[Any]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[_ActivePhase]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stack = self._stack()
+        tracking = self.track_memory and tracemalloc.is_tracing()
+        if tracking:
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        active = _ActivePhase(name)
+        stack.append(active)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            stack.pop()
+            peak = None
+            if tracking:
+                active.peak = max(active.peak, tracemalloc.get_traced_memory()[1])
+                peak = active.peak
+                if stack:
+                    stack[-1].peak = max(stack[-1].peak, peak)
+            with self._lock:
+                stats = self.phases.get(name)
+                if stats is None:
+                    stats = self.phases[name] = PhaseStats(name)
+                stats.calls += 1
+                stats.wall_seconds += wall
+                stats.cpu_seconds += cpu
+                if peak is not None:
+                    stats.peak_memory_bytes = max(stats.peak_memory_bytes or 0, peak)
+
+    def count(self, name: str, amount: int = 1, labels: Labels = ()) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if labels:
+                series = self.labeled_counters.setdefault(name, {})
+                series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            series = self.observations.setdefault(name, {})
+            observation = series.get(labels)
+            if observation is None:
+                observation = series[labels] = Observation()
+            observation.add(value)
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    def count_distinct(self, name: str, key: Any) -> None:
+        with self._lock:
+            seen = self._distinct.setdefault(name, set())
+            if key not in seen:
+                seen.add(key)
+                self.counters[name] = self.counters.get(name, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phases": {name: stats.to_dict() for name, stats in self.phases.items()},
+            "counters": dict(sorted(self.counters.items())),
+            "labeled_counters": {
+                name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+                for name, series in sorted(self.labeled_counters.items())
+            },
+            "observations": {
+                name: [dict(labels=dict(labels), **observation.to_dict()) for labels, observation in sorted(series.items())]
+                for name, series in sorted(self.observations.items())
+            },
+            "gauges": dict(sorted(self.gauges.items())),
+        }
+
+    def report(self, out: TextIO, format: str = "text") -> None:
+        if format == "json":
+            json.dump(self.to_dict(), out, indent=2)
+            out.write("\n")
+            return
+        out.write(f"{'phase':<24} {'calls':>7} {'wall (s)':>10} {'cpu (s)':>10} {'peak (MiB)':>11}\n")
+        for stats in sorted(self.phases.values(), key=lambda s: -s.wall_seconds):
+            peak = "-" if stats.peak_memory_bytes is None else f"{stats.peak_memory_bytes / (1024 * 1024):.1f}"
+            out.write(f"{stats.name:<24} {stats.calls:>7} {stats.wall_seconds:>10.3f} {stats.cpu_seconds:>10.3f} {peak:>11}\n")
+        for name, value in sorted(self.counters.items()):
+            out.write(f"{name:<24} {value:>7}\n")
+        for name, gauge_value in sorted(self.gauges.items()):
+            out.write(f"{name:<24} {gauge_value:>7}\n")
+        for name, series in sorted(self.observations.items()):
+            for labels, observation in sorted(series.items()):
+                out.write(f"{name}{_labels_suffix(labels) if labels else ''} count={observation.count} "
+                          f"sum={observation.total:.3f} max={observation.maximum:.3f}\n")
+
+
+_profile: Optional[Profile] = None
+
+
+def enable(track_memory: bool = True) -> Profile:
+    """Start collecting into a new :class:`Profile` (tracing allocations if ``track_memory``)."""
+    global _profile
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _profile = Profile(track_memory=track_memory)
+    return _profile
+
+
+def disable() -> Optional[Profile]:
+    """Stop collecting and return the finished profile (if any)."""
+    global _profile
+    profile, _profile = _profile, None
+    if profile is not None and profile.track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return profile
+
+
+def current() -> Optional[Profile]:
+    return _profile
+
+
+def phase(name: str):
+    """Context manager timing ``name`` on the active profile."""
+    profile = _profile
+    if profile is None:
+        return contextlib.nullcontext()
+    return profile.phase(name)
+
+
+def count(name: str, amount: int = 1, **labels: str) -> None:
+    profile = _profile
+    if profile is not None:
+        profile.count(name, amount, tuple(sorted(labels.items())))
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    profile = _profile
+    if profile is not None:
+        profile.observe(name, value, tuple(sorted(labels.items())))
+
+
+def gauge(name: str, value: float) -> None:
+    profile = _profile
+    if profile is not None:
+        profile.gauge(name, value)
+
+
+def count_distinct(name: str, key: Any) -> None:
+    profile = _profile
+    if profile is not None:
+        profile.count_distinct(name, key)
+
+
+@contextlib.contextmanager
+def profiled(format: str = "text", output: Optional[str] = None, cprofile_output: Optional[str] = None) -> Iterator[Profile]:
+    """Profile the enclosed block and report to ``output`` (default stderr) when it ends."""
+    profile = enable()
+    cprofiler = None
+    if cprofile_output:
+        import cProfile
+
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    try:
+        with profile.phase("total"):
+            yield profile
+    finally:
+        if cprofiler is not None and cprofile_output:
+            cprofiler.disable()
+            cprofiler.dump_stats(cprofile_output)
+        disable()
+        if output:
+            with open(output, "w") as f:
+                profile.report(f, format)
+        else:
+            profile.report(sys.stderr, format)
@@ -1,10 +1,12 @@
 import contextlib
 import csv
+import gzip
 import io
+import json
 import os
-from typing import Any, Dict
+from typing import Any, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Type
 
-import urllib3
+from . import instrumentation
 
 
 def warn(message):
@@ -38,6 +40,184 @@ def csv_dict_reader(path: str):
         yield reader
 
 
+class TabularColumn(NamedTuple):
+    """Column of tabular export, ``type`` is one of ``str``, ``int``, ``float`` or ``bool``."""
+    name: str
+    type: Type = str
+
+
+JSON_LINES_EXTENSIONS = [".jsonl", ".ndjson"]
+PARQUET_EXTENSIONS = [".parquet"]
+ARROW_EXTENSIONS = [".arrow", ".feather", ".ipc"]
+ARROW_BATCH_SIZE = 8192
+GZIP_EXTENSIONS = [".gz"]
+ZSTD_EXTENSIONS = [".zst", ".zstd"]
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+
+_compression_level: Optional[int] = None
+
+
+def set_compression_level(level: Optional[int]) -> None:
+    """Level to write ``.gz``/``.zst`` files with (``None`` for each format's default)."""
+    global _compression_level
+    _compression_level = level
+
+
+@contextlib.contextmanager
+def open_compressed(path: str, mode: str = "r", compression_level: Optional[int] = None) -> Iterator[IO[str]]:
+    """Open text file ``path`` for reading or writing, streaming (de)compression for ``.gz`` and ``.zst`` paths."""
+    assert mode in ["r", "w"], mode
+    level = _compression_level if compression_level is None else compression_level
+    if _has_extension(path, GZIP_EXTENSIONS):
+        with open(path, f"{mode}b") as raw:
+            # no file name (it is a temporary one when writing) or time in the header, same content same bytes
+            compresslevel = DEFAULT_GZIP_LEVEL if level is None else level
+            with gzip.GzipFile(filename="", mode=mode, fileobj=raw, compresslevel=compresslevel, mtime=0) as gzip_stream:
+                with io.TextIOWrapper(gzip_stream, encoding="utf-8") as f:
+                    yield f
+    elif _has_extension(path, ZSTD_EXTENSIONS):
+        zstandard = _import_zstandard()
+        with open(path, f"{mode}b") as raw:
+            if mode == "r":
+                stream = zstandard.ZstdDecompressor().stream_reader(raw)
+            else:
+                stream = zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL if level is None else level).stream_writer(raw)
+            with io.TextIOWrapper(stream, encoding="utf-8") as f:
+                yield f
+    else:
+        with open(path, mode) as f:
+            yield f
+
+
+def compression_extension(path: str) -> str:
+    """Extension selecting the compression of ``path`` (empty for uncompressed files)."""
+    for extension in GZIP_EXTENSIONS + ZSTD_EXTENSIONS:
+        if path.endswith(extension):
+            return extension
+    return ""
+
+
+def spreadsheet_value(value: Any) -> Any:
+    """Flatten a typed tabular value into what we write to CSV/TSV and Google Sheets."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if value is None:
+        return ""
+    return value
+
+
+@contextlib.contextmanager
+def tabular_writer(path: str, columns: List[TabularColumn]):
+    """Writer for typed rows that uses path extension to pick an output format.
+
+    ``.jsonl``/``.ndjson`` produce newline-delimited JSON objects, ``.parquet`` and
+    ``.arrow``/``.feather``/``.ipc`` produce typed columnar files (requires pyarrow),
+    anything else is written as CSV or TSV. Rows are written as they are produced.
+    """
+    if _has_extension(path, JSON_LINES_EXTENSIONS):
+        with open(path, "w") as f:
+            yield _JsonLinesWriter(f, columns)
+    elif _has_extension(path, PARQUET_EXTENSIONS + ARROW_EXTENSIONS):
+        writer = _ArrowWriter(path, columns)
+        try:
+            yield writer
+        finally:
+            writer.close()
+    else:
+        with csv_writer(path) as writer:
+            yield _SpreadsheetWriter(writer, columns)
+
+
+class _SpreadsheetWriter:
+
+    def __init__(self, writer, columns: List[TabularColumn]):
+        self._writer = writer
+        writer.writerow([c.name for c in columns])
+
+    def writerow(self, row: List[Any]):
+        self._writer.writerow([spreadsheet_value(v) for v in row])
+
+    def writerows(self, rows: Iterable[List[Any]]):
+        for row in rows:
+            self.writerow(row)
+
+
+class _JsonLinesWriter:
+
+    def __init__(self, f, columns: List[TabularColumn]):
+        self._f = f
+        self._names = [c.name for c in columns]
+
+    def writerow(self, row: List[Any]):
+        self._f.write(json.dumps(dict(zip(self._names, row))))
+        self._f.write("\n")
+
+    def writerows(self, rows: Iterable[List[Any]]):
+        for row in rows:
+            self.writerow(row)
+
+
+class _ArrowWriter:
+
+    def __init__(self, path: str, columns: List[TabularColumn], batch_size: int = ARROW_BATCH_SIZE):
+        pa = _import_pyarrow()
+        arrow_types = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+        self._pa = pa
+        self._schema = pa.schema([(c.name, arrow_types[c.type]) for c in columns])
+        self._batch_size = batch_size
+        self._buffer: List[List[Any]] = [[] for _ in columns]
+        self._buffered = 0
+        if _has_extension(path, PARQUET_EXTENSIONS):
+            import pyarrow.parquet
+            self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        else:
+            self._writer = pa.ipc.new_file(path, self._schema)
+
+    def writerow(self, row: List[Any]):
+        for column_values, value in zip(self._buffer, row):
+            column_values.append(value)
+        self._buffered += 1
+        if self._buffered >= self._batch_size:
+            self._flush()
+
+    def writerows(self, rows: Iterable[List[Any]]):
+        for row in rows:
+            self.writerow(row)
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        batch = self._pa.record_batch(self._buffer, schema=self._schema)
+        self._writer.write_batch(batch)
+        self._buffer = [[] for _ in self._buffer]
+        self._buffered = 0
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise Exception("Writing Parquet or Arrow output requires pyarrow - install it with 'pip install pyarrow'")
+    return pyarrow
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("Reading or writing .zst files requires zstandard - install it with 'pip install zstandard'")
+    return zstandard
+
+
+def _has_extension(path: str, extensions: List[str]) -> bool:
+    return any(path.endswith(e) for e in extensions)
+
+
 def _path_to_csv_args(path: str) -> Dict[str, Any]:
     csv_kwds = {}
     if not path.endswith("csv"):
@@ -59,6 +239,9 @@ def open_uri(input_path_or_uri: str):
     if "://" not in input_path_or_uri:
         return open(input_path_or_uri, "r")
     else:
+        import urllib3
+
+        instrumentation.count("http_requests", server=urllib3.util.parse_url(input_path_or_uri).host or "")
         http = urllib3.PoolManager()
         r = http.request('GET', input_path_or_uri, preload_content=False)
         r.auto_close = False
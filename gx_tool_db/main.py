@@ -2,12 +2,22 @@
 """
 import argparse
 import contextlib
+import os
+import shlex
 import sys
-from typing import Any, cast, Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, cast, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import requests
 import yaml
+from pydantic import ValidationError
 
+from . import (
+    instrumentation,
+    metrics,
+)
+from .checkpoint import ImportCheckpoint
+from .compact import plain_metadata
 from .config import (
     ALL_LABELS,
     ALL_SERVER_LABELS,
@@ -16,6 +26,8 @@ from .config import (
     DEFAULT_PANEL_VIEW_TYPE,
     ExportSpreadsheetConfig,
     FilterArguments,
+    PANEL_VIEW_GROUP_BY,
+    PANEL_VIEW_GROUP_BY_SKELETON,
     PUBLIC_SERVERS,
     Server,
     TestDataMergeStrategy,
@@ -26,28 +38,49 @@ from .config import (
 from .db import (
     _versionless_tool_id,
     FilterCriteria,
+    RetentionPolicy,
+    set_compact_representation,
     ToolLatestTestResults,
     ToolsMetadata,
     ToolVersionEntry,
     version_sorted_iterable,
 )
+from .edam import EDAM_KINDS
 from .io import (
     csv_reader,
-    csv_writer,
+    open_compressed,
     open_uri,
+    set_compression_level,
+    spreadsheet_value,
+    tabular_writer,
+    TabularColumn,
     warn,
 )
+from .metrics import DEFAULT_METRICS_FORMAT, METRICS_FORMATS
 from .models import (
     TestResults,
 )
-from .results import result_collections
-from .sheets import (
-    download_sheet_to_list,
-    download_sheet_to_path,
-    upload_sheet_from_list,
-    upload_sheet_from_path,
+from .results import result_collections, result_file_collection
+from .search import DEFAULT_SEARCH_LIMIT
+from .validation import (
+    describe_validation_errors,
+    set_strict_validation,
+    set_validation_jobs,
+    validate_database_dict,
+)
+from .watch import (
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_WATCH_DEBOUNCE,
+    watch,
+    Watcher,
+    watcher_for,
+    WatchOptions,
 )
-from .workflows import parse_tool_ids
+from .workflow_index import workflow_index_path, WorkflowIndex
+
+# requests, gspread/Google auth (sheets), gxformat2 (workflows) and numpy (coverage)
+# are imported by the commands that use them so the CLI starts quickly for
+# commands that don't need them.
 
 
 COLUMN_HEADER_TOOL_ID = "Tool ID"
@@ -58,66 +91,132 @@ DEFAULT_EXPORT_TYPE = "tsv"  # or csv
 REPORT_PREFIX = "gxtdb_"
 OUTPUT_DEFAULT_SPREADSHEET = f"{REPORT_PREFIX}output.{DEFAULT_EXPORT_TYPE}"
 OUTPUT_DEFAULT_COVERAGE_VERSIONS = f"{REPORT_PREFIX}coverage_versions.{DEFAULT_EXPORT_TYPE}"
+OUTPUT_DEFAULT_COVERAGE_SUMMARY = f"{REPORT_PREFIX}coverage_summary.{DEFAULT_EXPORT_TYPE}"
+OUTPUT_DEFAULT_TRAINING_COVERAGE = f"{REPORT_PREFIX}training_coverage.{DEFAULT_EXPORT_TYPE}"
+OUTPUT_DEFAULT_EDAM = f"{REPORT_PREFIX}edam.{DEFAULT_EXPORT_TYPE}"
+OUTPUT_DEFAULT_WORKFLOW_TOOLS = f"{REPORT_PREFIX}workflow_tools.{DEFAULT_EXPORT_TYPE}"
+OUTPUT_DEFAULT_WORKFLOW_BREAKAGE = f"{REPORT_PREFIX}workflow_breakage.{DEFAULT_EXPORT_TYPE}"
 
 SHEET_TARGET_PREFIX = "sheet:"
 
+DEFAULT_JOBS = 4
+DEFAULT_DAEMON_HOST = "127.0.0.1"
+DEFAULT_DAEMON_PORT = 8765
+DEFAULT_DAEMON_DEBOUNCE = 2.0
+# Commands that modify the database (run exclusively when served by the daemon).
+MUTATING_COMMANDS = {
+    "import-server",
+    "import-server-all",
+    "import-server-as-label",
+    "import-tabular",
+    "import-tests",
+    "import-labels",
+    "import-label",
+    "label-workflow-tools",
+    "import-trainings",
+    "clear-tests",
+    "clear-label",
+    "compact",
+    "merge",
+    "run",
+}
+# Commands reading or maintaining the workflow index (see gx_tool_db.workflow_index).
+WORKFLOW_COMMANDS = {"label-workflow-tools", "index-workflows", "export-workflow-tools", "export-workflow-breakage"}
+# Long imports write the database (and a resume marker) after this many inputs (0 disables checkpoints).
+DEFAULT_CHECKPOINT_EVERY = 100
+DEFAULT_CHECKPOINT_EVERY_SERVERS = 1
+# Script line forcing the pipeline database to be written before continuing.
+RUN_SCRIPT_CHECKPOINT = "checkpoint"
+RUN_SCRIPT_FORBIDDEN_COMMANDS = {"run", "serve"}
+# options setting process-wide defaults -> their argparse dest, applied once by main()
+PROCESS_OPTIONS = {
+    "--strict-validation": "strict_validation",
+    "--validation-jobs": "validation_jobs",
+    "--compact": "compact",
+    "--compression-level": "compression_level",
+    "--sheet-cache": "sheet_cache",
+}
+VIEW_DEFINITION_KEYS = {
+    "id", "server", "name", "description", "view_type", "output", "require_labels", "exclude_labels", "group_by",
+    "tool_shed", "owner", "repository", "tool_id_prefix",
+}
+
 
 class Config:
     metadata_file: str
+    # When set (e.g. by the ``serve`` daemon), commands operate on this resident
+    # database instead of loading and writing ``metadata_file`` themselves.
+    tools_metadata: Optional[ToolsMetadata] = None
+    on_database_modified: Optional[Callable[[], None]] = None
 
-    def __init__(self, metadata_file: str):
+    def __init__(self, metadata_file: str, tools_metadata: Optional[ToolsMetadata] = None, on_database_modified=None):
         self.metadata_file = metadata_file
+        self.tools_metadata = tools_metadata
+        self.on_database_modified = on_database_modified
 
 
 def bootstrap_tools_metadata(config: Config, server: Server):
     with _writable_database(config) as tools_metadata:
-        out_panel = tools_request(server=server, in_panel=False)
-        in_panel = tools_request(server=server, in_panel=True)
+        _import_server(tools_metadata, server)
 
-        for tool in out_panel:
-            tool_entry = tools_metadata.get_entry_for_api_value(tool, server)
-            tool_version = tool["version"]
-            tool_version_entry = tool_entry.get_version_entry(tool_version)
-            repo = tool.get("tool_shed_repository", None)
-            tool_entry.record_ts_repo(repo)
-            labels = tool['labels']
-            tool_version_entry.record_labels(labels)
-            tool_version_entry.record_metadata(
-                name=tool['name'],
-                description=tool['description'],
-                xrefs=tool.get('xrefs', []),
-                edam_operations=tool.get('edam_operations', []),
-                edam_topics=tool.get('edam_topics', []),
-                model_class=tool.get('model_class')
-            )
 
-        for entry in in_panel:
-            if entry["model_class"] != "ToolSection":
+def import_server_all(config: Config, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY_SERVERS, resume: bool = False):
+    with _checkpointed_database(config, "import-server-all", checkpoint_every, resume) as (tools_metadata, checkpoint):
+        for server_label in PUBLIC_SERVERS:
+            if checkpoint.is_completed(server_label):
                 continue
-            section_id = entry["id"]
-            section_name = entry["name"]
-            for section_elem in entry.get("elems", []):
-                if section_elem["model_class"] != "Tool":
-                    continue
-                tool_entry = tools_metadata.get_entry_for_api_value(section_elem, server)
-                tool_entry.record_section(section_id, section_name)
-
-        integrated_panel_skeleton = []
-        for entry in in_panel:
-            model_class = entry.get("model_class")
-            if model_class not in ["ToolSectionLabel", "ToolSection"]:
+            _import_server(tools_metadata, Server(server_label, None))
+            checkpoint.complete(server_label)
+
+
+def _import_server(tools_metadata: ToolsMetadata, server: Server):
+    out_panel = tools_request(server=server, in_panel=False)
+    in_panel = tools_request(server=server, in_panel=True)
+
+    for tool in out_panel:
+        tool_entry = tools_metadata.get_entry_for_api_value(tool, server)
+        tool_version = tool["version"]
+        tool_version_entry = tool_entry.get_version_entry(tool_version)
+        repo = tool.get("tool_shed_repository", None)
+        tool_entry.record_ts_repo(repo)
+        labels = tool['labels']
+        tool_version_entry.record_labels(labels)
+        tool_version_entry.record_metadata(
+            name=tool['name'],
+            description=tool['description'],
+            xrefs=tool.get('xrefs', []),
+            edam_operations=tool.get('edam_operations', []),
+            edam_topics=tool.get('edam_topics', []),
+            model_class=tool.get('model_class')
+        )
+
+    for entry in in_panel:
+        if entry["model_class"] != "ToolSection":
+            continue
+        section_id = entry["id"]
+        section_name = entry["name"]
+        for section_elem in entry.get("elems", []):
+            if section_elem["model_class"] != "Tool":
                 continue
-            element = {
-                "model_class": model_class,
-                "id": entry["id"],
-            }
-            if model_class == "ToolSectionLabel":
-                element["text"] = entry["text"]
-            elif model_class == "ToolSection":
-                element["name"] = entry["name"]
-            integrated_panel_skeleton.append(element)
-
-        tools_metadata.record_panel_skeleton(integrated_panel_skeleton, server)
+            tool_entry = tools_metadata.get_entry_for_api_value(section_elem, server)
+            tool_entry.record_section(section_id, section_name)
+
+    integrated_panel_skeleton = []
+    for entry in in_panel:
+        model_class = entry.get("model_class")
+        if model_class not in ["ToolSectionLabel", "ToolSection"]:
+            continue
+        element = {
+            "model_class": model_class,
+            "id": entry["id"],
+        }
+        if model_class == "ToolSectionLabel":
+            element["text"] = entry["text"]
+        elif model_class == "ToolSection":
+            element["name"] = entry["name"]
+        integrated_panel_skeleton.append(element)
+
+    tools_metadata.record_panel_skeleton(integrated_panel_skeleton, server)
 
 
 def label_server_tools(config: Config, label: str, server: Server):
@@ -139,24 +238,49 @@ def tools_request(server: Server, in_panel=False):
     api_url = url + f"/api/tools?in_panel={str(in_panel).lower()}"
     if api_key:
         api_url += "&key={api_key}"
-    response = requests.get(api_url)
-    response.raise_for_status()
+    import requests
+
+    start = time.perf_counter()
+    with instrumentation.phase("http"):
+        response = requests.get(api_url)
+        response.raise_for_status()
+    instrumentation.observe("http_request_seconds", time.perf_counter() - start, server=url)
+    instrumentation.count("http_requests", server=url)
+    instrumentation.count("http_bytes", len(response.content), server=url)
     return response.json()
 
 
-def _export_spreadsheet(output: str, all_rows: List[List[Any]]):
+def _export_spreadsheet(output: str, columns: List[TabularColumn], rows: Iterable[List[Any]], sync_sheet: bool = False):
     if output.startswith(SHEET_TARGET_PREFIX):
         output_sheet_id = output[len(SHEET_TARGET_PREFIX):]
-        upload_sheet_from_list(all_rows, output_sheet_id)
+        all_rows = [[c.name for c in columns]]
+        all_rows.extend([spreadsheet_value(v) for v in row] for row in rows)
+        from .sheets import upload_sheet_from_list
+
+        upload_sheet_from_list(all_rows, output_sheet_id, sync=sync_sheet)
+        instrumentation.count("rows_exported", len(all_rows) - 1)
     else:
         path = output
-        with csv_writer(path) as writer:
-            writer.writerows(all_rows)
+        exported = 0
+        with instrumentation.phase("export"), tabular_writer(path, columns) as writer:
+            for row in rows:
+                writer.writerow(row)
+                exported += 1
+        instrumentation.count("rows_exported", exported)
+    instrumentation.count("files_exported")
+
+
+def _export_yaml(output: str, value: Any):
+    with instrumentation.phase("export"), open(output, "w") as f:
+        yaml.safe_dump(value, f)
+    instrumentation.count("files_exported")
 
 
 def _import_spreadsheet(input: str) -> List[List[Any]]:
     if input.startswith(SHEET_TARGET_PREFIX):
         input_sheet_id = input[len(SHEET_TARGET_PREFIX):]
+        from .sheets import download_sheet_to_list
+
         return download_sheet_to_list(input_sheet_id)
     else:
         return _read_csv(input)
@@ -164,7 +288,9 @@ def _import_spreadsheet(input: str) -> List[List[Any]]:
 
 def _read_csv(path):
     with csv_reader(path) as reader:
-        return list(reader)
+        rows = list(reader)
+    instrumentation.count("files_parsed")
+    return rows
 
 
 def import_tabular(config, path, labels):
@@ -192,8 +318,14 @@ def import_tabular(config, path, labels):
                 tool_entry.record_external_label(label, present=present)
 
 
-def label_workflow_tools(config: Config, input: str, labels: List[str]):
-    tool_ids = parse_tool_ids(input)
+def label_workflow_tools(config: Config, input: str, labels: List[str], workflow_index: Optional[str] = None):
+    if workflow_index:
+        index = _updated_workflow_index(workflow_index, [input])
+        tool_ids = {tool_id for path in index.workflows_under([input]) for tool_id, _ in index.workflows[path].tools}
+    else:
+        from .workflows import parse_tool_ids
+
+        tool_ids = parse_tool_ids(input)
     with _writable_database(config) as tools_metadata:
         for raw_tool_id in tool_ids:
             tool_id = _versionless_tool_id(raw_tool_id)
@@ -204,52 +336,116 @@ def label_workflow_tools(config: Config, input: str, labels: List[str]):
                 tool_entry.record_external_label(label)
 
 
-def import_test_results(config, uri, test_target, merge_strategy: TestDataMergeStrategy):
-    with _writable_database(config) as tools_metadata:
-        for test_result_collection in result_collections(uri):
-            test_results = test_result_collection.results
-            for tool_id, results in test_results.results_by_id.items():
-                by_versions: Dict[str, List[Dict[str, Any]]] = {}
-                for result in results:
-                    tool_version = result["tool_version"]
-                    if tool_version not in by_versions:
-                        by_versions[tool_version] = []
+def _workflow_index_path(config: Config, workflow_index: Optional[str]) -> str:
+    return workflow_index or workflow_index_path(config.metadata_file)
+
+
+def _updated_workflow_index(path: str, inputs: List[str]) -> WorkflowIndex:
+    index = WorkflowIndex.load(path)
+    update = index.update(inputs)
+    index.save(path)
+    print(f"Indexed {len(index.workflows)} workflows in {path} ({update})")
+    return index
+
 
-                    by_versions[tool_version].append(result)
+def index_workflows(config: Config, inputs: List[str], workflow_index: Optional[str] = None):
+    _updated_workflow_index(_workflow_index_path(config, workflow_index), inputs)
 
-                for tool_version, tool_version_results in by_versions.items():
-                    tool_entry = tools_metadata.get_entry_for(tool_id)
-                    tool_version_entry = tool_entry.get_version_entry(tool_version)
-                    test_results = TestResults.from_test_output_dicts(tool_version_results)
-                    tool_version_entry.record_test_results(test_target, test_results, merge_strategy)
+
+def export_workflow_tools(config: Config, output: str, inputs: Optional[List[str]] = None, workflow_index: Optional[str] = None):
+    index = WorkflowIndex.load(_workflow_index_path(config, workflow_index))
+    workflow_paths = index.workflows_under(inputs) if inputs else sorted(index.workflows)
+    columns = [TabularColumn("Workflow"), TabularColumn(COLUMN_HEADER_TOOL_ID), TabularColumn(COLUMN_HEADER_TOOL_VERSION)]
+
+    def rows():
+        for workflow_path in workflow_paths:
+            for tool_id, tool_version in index.workflows[workflow_path].tools:
+                yield [workflow_path, _versionless_tool_id(tool_id), tool_version]
+
+    _export_spreadsheet(output, columns, rows())
+
+
+def export_workflow_breakage(
+    config: Config, output: str, server: str, removed_tool_ids: Optional[List[str]] = None, workflow_index: Optional[str] = None
+):
+    index = WorkflowIndex.load(_workflow_index_path(config, workflow_index))
+    tools_metadata = _readable_database(config)
+    missing_tools = index.missing_tools(tools_metadata, server, removed_tool_ids or [])
+    columns = [TabularColumn("Workflow"), TabularColumn("Missing Tool Count", int), TabularColumn("Missing Tools")]
+    rows = [[workflow_path, len(tool_ids), ",".join(tool_ids)] for workflow_path, tool_ids in missing_tools.items()]
+    _export_spreadsheet(output, columns, rows)
+
+
+def import_test_results(
+    config,
+    uri,
+    test_target,
+    merge_strategy: TestDataMergeStrategy,
+    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    resume: bool = False,
+    watch_options: Optional[WatchOptions] = None,
+):
+    operation = f"import-tests {uri} {test_target}"
+    with _watcher(config, uri, _is_result_file, watch_options) as watcher:
+        with _checkpointed_database(config, operation, checkpoint_every, resume) as (tools_metadata, checkpoint):
+            for test_result_collection in result_collections(uri, exclude=checkpoint.completed):
+                _record_test_results(tools_metadata, test_result_collection.results, test_target, merge_strategy)
+                checkpoint.complete(test_result_collection.uri)
+        if watcher is not None and watch_options is not None:
+
+            def process(tools_metadata: ToolsMetadata, path: str):
+                test_result_collection = result_file_collection(path)
+                if test_result_collection is not None:
+                    _record_test_results(tools_metadata, test_result_collection.results, test_target, merge_strategy)
+
+            _keep_watching(config, uri, watcher, process, watch_options)
+
+
+def _is_result_file(path: str) -> bool:
+    return path.endswith(".json")
+
+
+def _record_test_results(tools_metadata: ToolsMetadata, test_results, test_target, merge_strategy: TestDataMergeStrategy):
+    for tool_id, results in test_results.results_by_id.items():
+        by_versions: Dict[str, List[Dict[str, Any]]] = {}
+        for result in results:
+            tool_version = result["tool_version"]
+            if tool_version not in by_versions:
+                by_versions[tool_version] = []
+
+            by_versions[tool_version].append(result)
+
+        for tool_version, tool_version_results in by_versions.items():
+            tool_entry = tools_metadata.get_entry_for(tool_id)
+            tool_version_entry = tool_entry.get_version_entry(tool_version)
+            tool_version_entry.record_test_results(test_target, TestResults.from_test_output_dicts(tool_version_results), merge_strategy)
 
 
 def export_coverage(config: Config, export_config: ExportSpreadsheetConfig):
-    rows: List[List[Optional[str]]] = []
-    tools_metadata = ToolsMetadata(config.metadata_file)
+    tools_metadata = _readable_database(config)
 
     # Assemble header...
-    header: List[Optional[str]] = [COLUMN_HEADER_TOOL_ID, COLUMN_HEADER_LATEST_VERSION]
+    columns: List[TabularColumn] = [TabularColumn(COLUMN_HEADER_TOOL_ID), TabularColumn(COLUMN_HEADER_LATEST_VERSION)]
 
     # Include tool metadata.
     if export_config.include_name:
-        header.append("Tool Name")
+        columns.append(TabularColumn("Tool Name"))
     if export_config.include_description:
-        header.append("Tool Description")
+        columns.append(TabularColumn("Tool Description"))
     if export_config.include_model_class:
-        header.append("Tool Class")
+        columns.append(TabularColumn("Tool Class"))
     if export_config.include_tool_shed:
-        header.append("Tool Shed")
+        columns.append(TabularColumn("Tool Shed"))
     if export_config.include_repository_owner:
-        header.append("Repository Owner")
+        columns.append(TabularColumn("Repository Owner"))
     if export_config.include_repository_name:
-        header.append("Repository Name")
+        columns.append(TabularColumn("Repository Name"))
 
     # Assemble training headers columns...
     if export_config.include_training_topics:
-        header.append("Training Topics")
+        columns.append(TabularColumn("Training Topics"))
     if export_config.include_training_tutorials:
-        header.append("Training Tutorials")
+        columns.append(TabularColumn("Training Tutorials"))
 
     # Assemble coverage headers columns...
     if export_config.coverage is ALL_SERVER_LABELS:
@@ -257,8 +453,8 @@ def export_coverage(config: Config, export_config: ExportSpreadsheetConfig):
     else:
         coverage_servers = cast(List[str], export_config.coverage)
     for server in coverage_servers:
-        header.append(f"{server} Latest Version")
-        header.append(f"{server} Is Latest")
+        columns.append(TabularColumn(f"{server} Latest Version"))
+        columns.append(TabularColumn(f"{server} Is Latest", bool))
 
     # Assemble test headers columns...
     if export_config.tests is ALL_TEST_LABELS:
@@ -267,12 +463,12 @@ def export_coverage(config: Config, export_config: ExportSpreadsheetConfig):
         test_keys = cast(List[str], export_config.tests)
 
     for test_key in test_keys:
-        header.append(f"{test_key} Latest Version Tested")
-        header.append(f"{test_key} Is Latest Version Tested")
-        header.append(f"{test_key} Test Count")
-        header.append(f"{test_key} Tests Passed")
-        header.append(f"{test_key} Tests Failed")
-        header.append(f"{test_key} Any Tests Passed")
+        columns.append(TabularColumn(f"{test_key} Latest Version Tested"))
+        columns.append(TabularColumn(f"{test_key} Is Latest Version Tested", bool))
+        columns.append(TabularColumn(f"{test_key} Test Count", int))
+        columns.append(TabularColumn(f"{test_key} Tests Passed", int))
+        columns.append(TabularColumn(f"{test_key} Tests Failed", int))
+        columns.append(TabularColumn(f"{test_key} Any Tests Passed", bool))
 
     if export_config.labels is ALL_LABELS:
         raise NotImplementedError("TODO...")
@@ -280,20 +476,31 @@ def export_coverage(config: Config, export_config: ExportSpreadsheetConfig):
         labels = cast(List[str], export_config.labels)
 
     # Handle labels...
-    header.extend(labels)
-
-    rows.append(header)
+    columns.extend(TabularColumn(label, bool) for label in labels)
 
     filter_criteria = FilterCriteria()
     filter_criteria.exclude_labels = export_config.exclude_labels
     filter_criteria.require_labels = export_config.require_labels
+    filter_criteria.set_tool_id_filters(export_config)
 
+    rows = _coverage_rows(tools_metadata, export_config, filter_criteria, coverage_servers, test_keys, labels)
+    _export_spreadsheet(export_config.output, columns, rows, sync_sheet=export_config.sync_sheet)
+
+
+def _coverage_rows(
+    tools_metadata: ToolsMetadata,
+    export_config: ExportSpreadsheetConfig,
+    filter_criteria: FilterCriteria,
+    coverage_servers: List[str],
+    test_keys: List[str],
+    labels: List[str],
+) -> Iterator[List[Any]]:
     for tool_entry in tools_metadata.entries(filter_criteria=filter_criteria):
         tool_id = tool_entry.tool_id
         tool_metadata = tool_entry._source_data
 
         latest_version = tool_entry.latest_version
-        row: List[Optional[str]] = [tool_id, latest_version]
+        row: List[Any] = [tool_id, latest_version]
 
         # Include tool metadata.
         if export_config.include_name:
@@ -317,33 +524,29 @@ def export_coverage(config: Config, export_config: ExportSpreadsheetConfig):
             row.append(as_str)
 
         # Add server coverage columns if any...
-        coverage_servers_dict = {key: "" for key in coverage_servers}
+        coverage_servers_dict: Dict[str, Optional[str]] = {key: None for key in coverage_servers}
         for server, server_dict in tool_metadata.get("servers", {}).items():
             versions = version_sorted_iterable(server_dict.get("versions", []))
             if versions:
                 coverage_servers_dict[server] = versions[0]
         for known_server in coverage_servers:
-            row.append(coverage_servers_dict[known_server])
-            row.append(spreadsheet_bool(coverage_servers_dict[known_server] == latest_version))
+            server_latest_version = coverage_servers_dict[known_server]
+            row.append(server_latest_version)
+            row.append(server_latest_version is not None and server_latest_version == latest_version)
 
         # Add test columns (if any)
         latest_test_results_dict = tool_entry.get_latest_test_results_dict()
         for test_key in test_keys:
             tool_latest_test_results: Optional[ToolLatestTestResults] = latest_test_results_dict.get(test_key)
             if not tool_latest_test_results or not tool_latest_test_results.test_results:
-                row.append("")
-                row.append("0")
-                row.append("0")
-                row.append("0")
-                row.append("")
-                row.append("0")
+                row.extend([None, False, 0, 0, None, False])
             else:
                 # tool_latest_test_results has version and latest test results...
                 tool_version_entry: ToolVersionEntry = tool_latest_test_results.tool_version_entry
                 test_results: dict = tool_latest_test_results.test_results
                 row.append(tool_version_entry.tool_version)
-                row.append(spreadsheet_bool(tool_version_entry.tool_version == latest_version))
-                row.append(str(len(test_results)))
+                row.append(tool_version_entry.tool_version == latest_version)
+                row.append(len(test_results))
                 passed = 0
                 failed = 0
                 for _, test_result in test_results.items():
@@ -354,42 +557,62 @@ def export_coverage(config: Config, export_config: ExportSpreadsheetConfig):
                         failed += 1
                     else:
                         warn(f"Unknown test result status encountered {status}")
-                row.append(str(passed))
-                row.append(str(failed))
-                row.append(spreadsheet_bool(passed > 0))
+                row.append(passed)
+                row.append(failed)
+                row.append(passed > 0)
 
         for label in labels:
-            value = spreadsheet_bool(tool_entry.has_external_label(label))
-            row.append(value)
-        rows.append(row)
-    _export_spreadsheet(export_config.output, rows)
+            row.append(tool_entry.has_external_label(label))
+        yield row
 
 
-def export_coverage_versions(config, output_name=OUTPUT_DEFAULT_COVERAGE_VERSIONS):
-    rows = []
-    tools_metadata = ToolsMetadata(config.metadata_file)
+def export_coverage_versions(config, output_name=OUTPUT_DEFAULT_COVERAGE_VERSIONS, sync_sheet: bool = False):
+    tools_metadata = _readable_database(config)
     known_servers = tools_metadata.known_servers()
-    header = [COLUMN_HEADER_TOOL_ID, COLUMN_HEADER_TOOL_VERSION, COLUMN_HEADER_LATEST_VERSION, "Is Latest Version"]
+    columns = [
+        TabularColumn(COLUMN_HEADER_TOOL_ID),
+        TabularColumn(COLUMN_HEADER_TOOL_VERSION),
+        TabularColumn(COLUMN_HEADER_LATEST_VERSION),
+        TabularColumn("Is Latest Version", bool),
+    ]
     for server in known_servers:
-        header.append(f"{server} Has Version")
-    rows.append(header)
-    for tool_entry in tools_metadata.entries():
-        tool_id = tool_entry.tool_id
-        tool_metadata = tool_entry._source_data
-        latest_version = tool_entry.latest_version
-        for tool_version, tool_version_metadata in tool_metadata.get("versions", {}).items():
-            row = [tool_id, tool_version, latest_version]
-            known_servers_dict = {key: spreadsheet_bool(False) for key in known_servers}
-            for server in tool_version_metadata.get("servers", {}).keys():
-                known_servers_dict[server] = spreadsheet_bool(True)
-            for known_server in known_servers:
-                row.append(known_servers_dict[known_server])
-            rows.append(row)
-    _export_spreadsheet(output_name, rows)
+        columns.append(TabularColumn(f"{server} Has Version", bool))
+
+    def rows():
+        for tool_entry in tools_metadata.entries():
+            tool_id = tool_entry.tool_id
+            tool_metadata = tool_entry._source_data
+            latest_version = tool_entry.latest_version
+            for tool_version, tool_version_metadata in tool_metadata.get("versions", {}).items():
+                row = [tool_id, tool_version, latest_version, tool_version == latest_version]
+                server_versions = tool_version_metadata.get("servers", {})
+                for known_server in known_servers:
+                    row.append(known_server in server_versions)
+                yield row
+
+    _export_spreadsheet(output_name, columns, rows(), sync_sheet=sync_sheet)
+
+
+def export_coverage_summary(config, output_name=OUTPUT_DEFAULT_COVERAGE_SUMMARY, servers: Optional[List[str]] = None):
+    tools_metadata = _readable_database(config)
+    from .coverage import CoverageMatrix
+
+    matrix = CoverageMatrix.from_tools_metadata(tools_metadata, servers=servers or None)
+    columns = [
+        TabularColumn("Server"),
+        TabularColumn("Tool Count", int),
+        TabularColumn("Tools Present", int),
+        TabularColumn("Coverage Percent", float),
+        TabularColumn("Tools With Latest Version", int),
+        TabularColumn("Tools Lagging Latest Version", int),
+        TabularColumn("Tool Versions Present", int),
+    ]
+    rows = [list(summary) for summary in matrix.summaries()]
+    _export_spreadsheet(output_name, columns, rows)
 
 
 def spreadsheet_bool(val):
-    return "1" if val else "0"
+    return spreadsheet_value(bool(val))
 
 
 def clear_test_results(config, test_target):
@@ -402,27 +625,157 @@ def clear_label(config, label_key):
         tools_metadata.clear_label(label_key)
 
 
-def google_export(input, sheet_id):
-    upload_sheet_from_path(input, sheet_id)
+def google_export(input, sheet_id, sync_sheet: bool = False):
+    from .sheets import upload_sheet_from_path
+
+    upload_sheet_from_path(input, sheet_id, sync=sync_sheet)
 
 
 def google_import(sheet_id, output):
+    from .sheets import download_sheet_to_path
+
     download_sheet_to_path(sheet_id, output)
 
 
 def export_install_yaml(config: Config, output: str, servers: List[str], filter_args: FilterArguments):
-    tools_metadata = ToolsMetadata(config.metadata_file)
+    tools_metadata = _readable_database(config)
     install_dict = tools_metadata.install_dict(servers, filter_args)
-    with open(output, "w") as f:
-        yaml.safe_dump(install_dict, f)
+    _export_yaml(output, install_dict)
 
 
 def export_panel_view(config: Config, server: str, view_def: ViewDefintion):
-    tools_metadata = ToolsMetadata(config.metadata_file)
+    tools_metadata = _readable_database(config)
     view_dict = tools_metadata.panel_view_dict(server, view_def)
-    output_path = view_def.effective_output
-    with open(output_path, "w") as f:
-        yaml.safe_dump(view_dict, f)
+    _export_yaml(view_def.effective_output, view_dict)
+
+
+def export_panel_views(config: Config, views_path: str, output_directory: Optional[str] = None, jobs: int = DEFAULT_JOBS):
+    tools_metadata = _readable_database(config)
+    index = tools_metadata.panel_view_index()
+    server_view_defs = load_view_definitions(views_path)
+
+    def write_view(server_view_def):
+        server, view_def = server_view_def
+        view_dict = index.panel_view_dict(server, view_def)
+        output_path = view_def.effective_output
+        if output_directory:
+            output_path = os.path.join(output_directory, output_path)
+        _export_yaml(output_path, view_dict)
+
+    if output_directory:
+        os.makedirs(output_directory, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        list(executor.map(write_view, server_view_defs))
+
+
+def load_view_definitions(path: str) -> List[Tuple[str, ViewDefintion]]:
+    """Load a YAML list of panel view definitions.
+
+    Each entry needs an ``id`` and a ``server`` and may set ``name``, ``description``,
+    ``view_type``, ``output``, ``require_labels``, ``exclude_labels``, ``group_by`` and
+    the tool id filters ``tool_shed``, ``owner``, ``repository`` and ``tool_id_prefix``.
+    """
+    with open(path, "r") as f:
+        raw_view_defs = yaml.safe_load(f) or []
+    if isinstance(raw_view_defs, dict):
+        raw_view_defs = raw_view_defs.get("views", [])
+    server_view_defs = []
+    for raw_view_def in raw_view_defs:
+        unknown_keys = set(raw_view_def.keys()) - VIEW_DEFINITION_KEYS
+        if unknown_keys:
+            raise Exception(f"Unknown panel view definition keys {sorted(unknown_keys)} in {path}")
+        if "id" not in raw_view_def or "server" not in raw_view_def:
+            raise Exception(f"Panel view definitions require an 'id' and a 'server' - found {raw_view_def}")
+        view_def = ViewDefintion(raw_view_def["id"])
+        view_def.output = raw_view_def.get("output")
+        view_def.view_type = raw_view_def.get("view_type", DEFAULT_PANEL_VIEW_TYPE)
+        view_def.description = raw_view_def.get("description")
+        view_def.name = raw_view_def.get("name")
+        view_def.require_labels = raw_view_def.get("require_labels") or []
+        view_def.exclude_labels = raw_view_def.get("exclude_labels") or []
+        view_def.tool_shed = raw_view_def.get("tool_shed")
+        view_def.owner = raw_view_def.get("owner")
+        view_def.repository = raw_view_def.get("repository")
+        view_def.tool_id_prefix = raw_view_def.get("tool_id_prefix")
+        view_def.group_by = raw_view_def.get("group_by", PANEL_VIEW_GROUP_BY_SKELETON)
+        if view_def.group_by not in PANEL_VIEW_GROUP_BY:
+            raise Exception(f"Unknown panel view group_by [{view_def.group_by}] in {path} - expected one of {PANEL_VIEW_GROUP_BY}")
+        server_view_defs.append((raw_view_def["server"], view_def))
+    return server_view_defs
+
+
+def run_script(config: Config, script_path: str):
+    """Run the subcommands listed in ``script_path`` against one shared database.
+
+    The database is written once at the end (and at ``checkpoint`` lines). If any
+    step fails nothing after the last checkpoint is written. If another process
+    wrote the database meanwhile, the changes of the steps are re-applied to it
+    instead of overwriting its changes.
+    """
+    steps = load_run_script(script_path)
+    source = config.tools_metadata
+    if source is not None:
+        pipeline_db = source.copy()
+    else:
+        pipeline_db = ToolsMetadata(config.metadata_file)
+        pipeline_db.track_changes()
+    pipeline_config = Config(config.metadata_file, pipeline_db)
+    for line_number, step_args in steps:
+        if step_args is None:
+            _commit_run_steps(config, pipeline_db)
+            continue
+        _run_step(pipeline_config, script_path, line_number, step_args)
+    _commit_run_steps(config, pipeline_db)
+
+
+def _run_step(pipeline_config: Config, script_path: str, line_number: int, step_args: argparse.Namespace):
+    try:
+        run_command(pipeline_config, step_args)
+    except Exception as e:
+        raise Exception(f"{script_path}:{line_number} [{step_args.command}] failed: {e}") from e
+
+
+def _commit_run_steps(config: Config, pipeline_db: ToolsMetadata):
+    source = config.tools_metadata
+    if source is None:
+        pipeline_db.write()
+        return
+    source.replace_contents(pipeline_db)
+    if config.on_database_modified is not None:
+        config.on_database_modified()
+
+
+def load_run_script(path: str) -> List[Tuple[int, Optional[argparse.Namespace]]]:
+    """Parse a ``run`` script, one subcommand per line (``None`` marks a checkpoint).
+
+    Lines are split like a shell command line and take the same arguments as
+    ``gx-tool-db`` (without ``--tools_metadata``/``--daemon``); blank lines and
+    lines starting with ``#`` are ignored. Every line is parsed before anything
+    runs so a typo doesn't leave a half finished pipeline behind.
+    """
+    parser = arg_parser()
+    steps: List[Tuple[int, Optional[argparse.Namespace]]] = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            argv = shlex.split(line, comments=True)
+            if not argv:
+                continue
+            if argv == [RUN_SCRIPT_CHECKPOINT]:
+                steps.append((line_number, None))
+                continue
+            for arg in argv:
+                if arg.split("=")[0] in ["--tools_metadata", "--daemon"]:
+                    raise Exception(f"{path}:{line_number} {arg.split('=')[0]} cannot be set per step")
+            try:
+                step_args = parser.parse_args(argv)
+            except SystemExit:
+                raise Exception(f"{path}:{line_number} invalid command: {line.strip()}")
+            for option in process_options_set(step_args, parser):
+                raise Exception(f"{path}:{line_number} {option} applies to the whole run, pass it to gx-tool-db run instead")
+            if step_args.command is None or step_args.command in RUN_SCRIPT_FORBIDDEN_COMMANDS:
+                raise Exception(f"{path}:{line_number} command [{step_args.command}] cannot be used in a run script")
+            steps.append((line_number, step_args))
+    return steps
 
 
 def import_labels(config, input):
@@ -453,7 +806,7 @@ def _import_labels(config, tool_id_pairs):
 
 
 def export_label(config, output, label):
-    tools_metadata = ToolsMetadata(config.metadata_file)
+    tools_metadata = _readable_database(config)
     tool_ids = []
     for tool_entry in tools_metadata.entries():
         if tool_entry.has_external_label(label):
@@ -462,9 +815,149 @@ def export_label(config, output, label):
         f.write("\n".join(tool_ids))
 
 
-def import_training(config, directory):
+def compact_database(config: Config, policy: RetentionPolicy, dry_run: bool = False):
+    bytes_before = None
+    if dry_run:
+        removed = _readable_database(config).copy().apply_retention(policy)
+    else:
+        if config.tools_metadata is None and os.path.exists(config.metadata_file):
+            bytes_before = os.path.getsize(config.metadata_file)
+        with _writable_database(config) as tools_metadata:
+            removed = tools_metadata.apply_retention(policy)
+    summary = ", ".join(f"{count} {counter.replace('_', ' ')}" for counter, count in removed.items())
+    if dry_run:
+        print(f"Would remove {summary} (dry run, database not written)")
+    elif bytes_before is None:
+        print(f"Removed {summary}")
+    else:
+        bytes_after = os.path.getsize(config.metadata_file)
+        print(f"Removed {summary}; {bytes_before} -> {bytes_after} bytes ({bytes_before - bytes_after} bytes removed)")
+
+
+def search_tools(config: Config, query: List[str], limit: int, output: Optional[str] = None):
+    tools_metadata = _readable_database(config)
+    hits = tools_metadata.search_index().search(" ".join(query), limit)
+    columns = [TabularColumn(COLUMN_HEADER_TOOL_ID), TabularColumn("Score", float), TabularColumn("Name"), TabularColumn("Description")]
+
+    def rows():
+        for hit in hits:
+            tool_entry = tools_metadata.get_entry_for(hit.tool_id)
+            yield [hit.tool_id, hit.score, tool_entry.name, tool_entry.description]
+
+    if output:
+        _export_spreadsheet(output, columns, rows())
+    else:
+        for row in rows():
+            print("\t".join(str(spreadsheet_value(value)) for value in row))
+
+
+def merge_databases(config: Config, inputs: List[str], merge_strategy: TestDataMergeStrategy):
     with _writable_database(config) as tools_metadata:
-        tools_metadata.import_trainings(directory)
+        for input in inputs:
+            tools_metadata.merge(ToolsMetadata(input), merge_strategy)
+
+
+def validate_database(config: Config, jobs: int = DEFAULT_JOBS):
+    if config.tools_metadata is not None:
+        as_dict = plain_metadata(config.tools_metadata.metadata)
+    else:
+        with instrumentation.phase("yaml_load"), open_compressed(config.metadata_file) as f:
+            as_dict = yaml.safe_load(f)
+    try:
+        validate_database_dict(as_dict, jobs=jobs)
+    except ValidationError as e:
+        lines = describe_validation_errors(e)
+        raise Exception(f"{len(lines)} validation error(s) in {config.metadata_file}:\n" + "\n".join(lines))
+    tools = as_dict.get("tools") or {}
+    print(f"{config.metadata_file} is valid ({len(tools)} tools)")
+
+
+def import_training(
+    config,
+    directory,
+    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    resume: bool = False,
+    watch_options: Optional[WatchOptions] = None,
+):
+    operation = f"import-trainings {directory}"
+    with _watcher(config, directory, _is_potential_workflow_file, watch_options) as watcher:
+        with _checkpointed_database(config, operation, checkpoint_every, resume) as (tools_metadata, checkpoint):
+            training_index = tools_metadata.import_trainings(directory, checkpoint)
+        if checkpoint.resumed:
+            print(f"Resumed after {checkpoint.resumed} tutorials imported before")
+        print(f"Recorded {len(training_index.tutorial_tools)} tutorials using {len(training_index.tool_ids)} tools")
+        if watcher is not None and watch_options is not None:
+
+            def process(tools_metadata: ToolsMetadata, path: str):
+                tools_metadata.import_training_workflow(directory, path)
+
+            _keep_watching(config, directory, watcher, process, watch_options)
+
+
+def _is_potential_workflow_file(path: str) -> bool:
+    from .workflows import is_potential_workflow_file
+
+    return is_potential_workflow_file(os.path.basename(path))
+
+
+def export_training_coverage(config, output_name=OUTPUT_DEFAULT_TRAINING_COVERAGE, servers: Optional[List[str]] = None):
+    tools_metadata = _readable_database(config)
+    training_index = tools_metadata.training_index()
+    tools_dict = tools_metadata._tools_dict()
+    if not servers:
+        servers = sorted({server for tool_metadata in tools_dict.values() for server in (tool_metadata.get("servers") or {})})
+    columns = [
+        TabularColumn("Topic"),
+        TabularColumn("Tutorial"),
+        TabularColumn(COLUMN_HEADER_TOOL_ID),
+        TabularColumn("Tutorial Versions"),
+    ]
+    for server in servers:
+        columns.append(TabularColumn(f"{server} Has Tool", bool))
+    columns.append(TabularColumn("Missing On"))
+
+    def rows():
+        for topic, tutorial in training_index.tutorials():
+            tutorial_tools = training_index.tools_for(topic, tutorial)
+            for tool_id in sorted(tutorial_tools):
+                tool_servers = (tools_dict.get(tool_id) or {}).get("servers") or {}
+                present = [server in tool_servers for server in servers]
+                missing = [server for server, has_tool in zip(servers, present) if not has_tool]
+                yield [topic, tutorial, tool_id, ",".join(version_sorted_iterable(tutorial_tools[tool_id]))] + present + [",".join(missing)]
+
+    _export_spreadsheet(output_name, columns, rows())
+
+
+def export_edam(
+    config,
+    output_name=OUTPUT_DEFAULT_EDAM,
+    servers: Optional[List[str]] = None,
+    kinds: Optional[List[str]] = None,
+    missing_on: Optional[str] = None,
+):
+    tools_metadata = _readable_database(config)
+    edam_index = tools_metadata.edam_index()
+    servers = servers or edam_index.servers
+    kinds = kinds or EDAM_KINDS
+    columns = [
+        TabularColumn("EDAM Kind"),
+        TabularColumn("EDAM Term"),
+        TabularColumn("Tool Count", int),
+    ]
+    for server in servers:
+        columns.append(TabularColumn(f"{server} Tools", int))
+    columns.append(TabularColumn("Missing On"))
+    missing_terms = {kind: set(edam_index.terms_missing_on(missing_on, kind)) for kind in kinds} if missing_on else None
+
+    def rows():
+        for summary in edam_index.summaries(kinds, servers):
+            if missing_terms is not None and summary.term not in missing_terms[summary.kind]:
+                continue
+            server_tools = [summary.server_tools[server] for server in servers]
+            missing = [server for server, count in zip(servers, server_tools) if not count]
+            yield [summary.kind, summary.term, summary.tools] + server_tools + [",".join(missing)]
+
+    _export_spreadsheet(output_name, columns, rows())
 
 
 def _add_target_arguments(parser):
@@ -476,23 +969,67 @@ def _add_target_arguments(parser):
 
 def arg_parser():
     parser = argparse.ArgumentParser(description="Manage runtime metadata about tools across Galaxy servers")
-    parser.add_argument('--tools_metadata', type=str, help='File containing merged tools metadata (YAML)', default=DEFAULT_DATABASE_PATH)
+    parser.add_argument(
+        '--tools_metadata', type=str, default=DEFAULT_DATABASE_PATH,
+        help='File containing merged tools metadata (YAML, compressed if ending in .gz or .zst)'
+    )
+    parser.add_argument(
+        '--daemon', type=str, default=None,
+        help='Forward the command to a running "gx-tool-db serve" daemon listening on this Unix socket path'
+    )
+    parser.add_argument(
+        '--profile', action='store_true', default=False,
+        help='Report wall time, CPU time and peak memory per phase (YAML load, validation, HTTP, ...) and counters when done'
+    )
+    parser.add_argument('--profile-format', choices=instrumentation.PROFILE_FORMATS, default="text", help='Format of the --profile report')
+    parser.add_argument('--profile-output', type=str, default=None, help='Write the --profile report to this file instead of standard error')
+    parser.add_argument('--profile-cprofile', type=str, default=None, help='Also dump cProfile statistics (pstats format) to this file')
+    parser.add_argument(
+        '--metrics-output', type=str, default=None,
+        help='Write run metrics (duration per phase, HTTP requests per server, database size, peak RSS, ...) to this file for scheduled runs'
+    )
+    parser.add_argument(
+        '--metrics-format', choices=METRICS_FORMATS, default=DEFAULT_METRICS_FORMAT,
+        help='Format of the --metrics-output file (Prometheus textfile collector format or JSON)'
+    )
+    parser.add_argument(
+        '--strict-validation', action='store_true', default=False,
+        help='Validate the database by building the full pydantic models (slower) instead of the compiled validator'
+    )
+    parser.add_argument(
+        '--validation-jobs', type=int, default=1,
+        help='Validate databases with many tools in this many processes when loading them'
+    )
+    parser.add_argument(
+        '--compact', action='store_true', default=False,
+        help='Hold the database in a compact in-memory form (slotted records, interned strings) to reduce memory use'
+    )
+    parser.add_argument(
+        '--compression-level', type=int, default=None,
+        help='Compression level used when writing a database ending in .gz or .zst (default: 6 for gzip, 3 for zstd)'
+    )
+    parser.add_argument(
+        '--sheet-cache', type=str, default=None,
+        help='Directory to cache downloaded Google Sheets contents in (revalidated against the sheet modification time)'
+    )
 
     subparsers = parser.add_subparsers(dest="command")
     parser_dump = subparsers.add_parser('import-server', help='import runtime metadata from a target Galaxy server')
     _add_target_arguments(parser_dump)
 
-    subparsers.add_parser('import-server-all', help='dump all metadata form usegalaxy.org and usegalaxy.eu')
+    parser_import_all = subparsers.add_parser('import-server-all', help='dump all metadata form usegalaxy.org and usegalaxy.eu')
+    add_checkpoint_arguments(parser_import_all, DEFAULT_CHECKPOINT_EVERY_SERVERS, "servers")
 
     import_server_as_label_parser = subparsers.add_parser('import-server-as-label', help='label all tools from server with specified label')
     _add_target_arguments(import_server_as_label_parser)
     import_server_as_label_parser.add_argument('label', help='label to add to all tools on the server')
 
-    HELP_ARG_OUTPUT = 'Report file to output (csv or tsv)'
+    HELP_ARG_OUTPUT = 'Report file to output (csv, tsv, jsonl, parquet or arrow - chosen by extension)'
     HELP_EXPORT_COVERAGE = 'export spreadsheet summary of data'
     parser_export_tabular = subparsers.add_parser('export-tabular', help=HELP_EXPORT_COVERAGE)
     add_common_filters(parser_export_tabular)
     parser_export_tabular.add_argument('--output', type=str, help=HELP_ARG_OUTPUT, default=OUTPUT_DEFAULT_SPREADSHEET)
+    _add_sync_sheet_argument(parser_export_tabular)
     parser_export_tabular.add_argument(
         '--training-topics', help="include column for training topics", action="store_true",
     )
@@ -533,6 +1070,34 @@ def arg_parser():
     HELP_EXPORT_COVERAGE_VERSIONS = 'export coverage of tool versions across servers'
     parser_export_coverage_versions = subparsers.add_parser('export-coverage-versions', help=HELP_EXPORT_COVERAGE_VERSIONS)
     parser_export_coverage_versions.add_argument('--output', type=str, help=HELP_ARG_OUTPUT, default=OUTPUT_DEFAULT_COVERAGE_VERSIONS)
+    _add_sync_sheet_argument(parser_export_coverage_versions)
+
+    HELP_EXPORT_COVERAGE_SUMMARY = 'export per server coverage percentages and counts of tools lagging the latest version'
+    parser_export_coverage_summary = subparsers.add_parser('export-coverage-summary', help=HELP_EXPORT_COVERAGE_SUMMARY)
+    parser_export_coverage_summary.add_argument('--output', type=str, help=HELP_ARG_OUTPUT, default=OUTPUT_DEFAULT_COVERAGE_SUMMARY)
+    parser_export_coverage_summary.add_argument(
+        '--server', action='append', default=[], required=False, help='Restrict summary to specified server(s)'
+    )
+
+    parser_export_training_coverage = subparsers.add_parser(
+        'export-training-coverage', help='export the tools used by each training tutorial and the servers each tool is missing on'
+    )
+    parser_export_training_coverage.add_argument('--output', type=str, help=HELP_ARG_OUTPUT, default=OUTPUT_DEFAULT_TRAINING_COVERAGE)
+    parser_export_training_coverage.add_argument(
+        '--server', action='append', default=[], required=False, help='Report on specified server(s) (default: all servers in the database)'
+    )
+
+    parser_export_edam = subparsers.add_parser(
+        'export-edam', help='export the number of tools per server annotated with each EDAM topic and operation'
+    )
+    parser_export_edam.add_argument('--output', type=str, help=HELP_ARG_OUTPUT, default=OUTPUT_DEFAULT_EDAM)
+    parser_export_edam.add_argument(
+        '--server', action='append', default=[], required=False, help='Report on specified server(s) (default: all servers in the database)'
+    )
+    parser_export_edam.add_argument(
+        '--kind', action='append', default=[], choices=EDAM_KINDS, help='Report on EDAM topics or operations only'
+    )
+    parser_export_edam.add_argument('--missing-on', type=str, default=None, help='Only report terms without any tools on this server')
 
     parser_import_tabular = subparsers.add_parser("import-tabular", help="import external label data from a spreadsheet")
     parser_import_tabular.add_argument('input', help='Input to read from')
@@ -554,15 +1119,40 @@ def arg_parser():
     parser_label_workflow = subparsers.add_parser('label-workflow-tools', help='Label all the tool ids from a workflow')
     parser_label_workflow.add_argument('input', help='Input path or directory to read workflow(s) from')
     parser_label_workflow.add_argument('--label', action='append', default=[], required=True, help='Label to add to tool IDs')
+    HELP_ARG_WORKFLOW_INDEX = 'Workflow index file (default: <tools_metadata>.workflows.json)'
+    parser_label_workflow.add_argument(
+        '--workflow-index', type=str, default=None, help='Take the tool IDs from (and update) this workflow index instead of parsing every workflow'
+    )
+
+    parser_index_workflows = subparsers.add_parser(
+        'index-workflows', help='index the tools used by workflows, re-parsing only workflows that changed since the last run'
+    )
+    parser_index_workflows.add_argument('input', nargs='+', help='Workflow file(s) or directories of workflows to index')
+    parser_index_workflows.add_argument('--workflow-index', type=str, default=None, help=HELP_ARG_WORKFLOW_INDEX)
+
+    parser_export_workflow_tools = subparsers.add_parser(
+        'export-workflow-tools', help='write file containing the tool IDs and versions used by indexed workflows'
+    )
+    parser_export_workflow_tools.add_argument('input', nargs='*', help='Only report indexed workflows at these paths')
+    parser_export_workflow_tools.add_argument('--output', type=str, help=HELP_ARG_OUTPUT, default=OUTPUT_DEFAULT_WORKFLOW_TOOLS)
+    parser_export_workflow_tools.add_argument('--workflow-index', type=str, default=None, help=HELP_ARG_WORKFLOW_INDEX)
 
-    # TODO: we've got the abstractions...
-    # parser_label_workflow = subparsers.add_parser('export-workflow-tools', help='write file containing tool IDs from a workflow')
-    # parser_label_workflow.add_argument('input', help='Input path or directory to read workflow(s) from')
+    parser_export_workflow_breakage = subparsers.add_parser(
+        'export-workflow-breakage', help='write file listing indexed workflows using tools missing on a server'
+    )
+    parser_export_workflow_breakage.add_argument('server', help='Server label to check workflows against')
+    parser_export_workflow_breakage.add_argument(
+        '--tool', dest='tool_ids', action='append', default=[], help='Also treat this tool as missing on the server'
+    )
+    parser_export_workflow_breakage.add_argument('--output', type=str, help=HELP_ARG_OUTPUT, default=OUTPUT_DEFAULT_WORKFLOW_BREAKAGE)
+    parser_export_workflow_breakage.add_argument('--workflow-index', type=str, default=None, help=HELP_ARG_WORKFLOW_INDEX)
 
     parser_import_test_results = subparsers.add_parser('import-tests', help='import test results')
     parser_import_test_results.add_argument('input', help='Input to read from')
     parser_import_test_results.add_argument('test_target', help='Target of tool tests')
     parser_import_test_results.add_argument('--merge-strategy', choices=TestDataMergeStrategy.__members__.keys(), default="latest_executed")
+    add_checkpoint_arguments(parser_import_test_results, DEFAULT_CHECKPOINT_EVERY, "result files")
+    add_watch_arguments(parser_import_test_results, "result files")
 
     parser_clear_test_results = subparsers.add_parser('clear-tests', help='clear test results for target server')
     parser_clear_test_results.add_argument('test_target', help='Target of tool tests')
@@ -574,6 +1164,8 @@ def arg_parser():
         'import-trainings', help='import information about what tools are used by training materials'
     )
     parser_import_training_materials.add_argument('training_directory', help='directory containing updated Galaxy training materials')
+    add_checkpoint_arguments(parser_import_training_materials, DEFAULT_CHECKPOINT_EVERY, "tutorials")
+    add_watch_arguments(parser_import_training_materials, "workflows")
 
     parser_export_install = subparsers.add_parser('export-install-yaml', help='export tools.yaml file for installation')
     parser_export_install.add_argument('--output', type=str, help="Path to tools YAML file to create", default="tools.yaml")
@@ -588,12 +1180,77 @@ def arg_parser():
     parser_export_view.add_argument('--view-type', type=str, help=HELP_ARG_VIEW_TYPE, default=DEFAULT_PANEL_VIEW_TYPE)
     parser_export_view.add_argument('--name', type=str, help="Name of panel view.")
     parser_export_view.add_argument('--description', type=str, help="End user description of panel view.")
+    parser_export_view.add_argument(
+        '--group-by', choices=PANEL_VIEW_GROUP_BY, default=PANEL_VIEW_GROUP_BY_SKELETON,
+        help="Keep the server's panel sections (skeleton) or group tools into a section per EDAM topic (edam_topic)"
+    )
     add_common_filters(parser_export_view)
 
+    parser_export_views = subparsers.add_parser('export-panel-views', help='export many tool panel views described in a YAML file')
+    parser_export_views.add_argument(
+        'views', type=str,
+        help="YAML list of view definitions (id, server, name, description, view_type, output, require_labels, exclude_labels, group_by, "
+             "tool_shed, owner, repository, tool_id_prefix)"
+    )
+    parser_export_views.add_argument('--output-directory', type=str, default=None, help="Directory to write views to (defaults to working directory)")
+    parser_export_views.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help="Number of views to write in parallel")
+
+    parser_compact_database = subparsers.add_parser(
+        'compact', help='prune old versions, old test results and empty entries from the database (see --compact for the in-memory form)'
+    )
+    parser_compact_database.add_argument('--keep-versions', type=int, default=None, help='Keep only the N newest versions of each tool')
+    parser_compact_database.add_argument(
+        '--tests-before', type=str, default=None, help='Drop test results with a job_create_time before this ISO 8601 timestamp (e.g. 2022-01-01)'
+    )
+    parser_compact_database.add_argument(
+        '--drop-unavailable-versions', action='store_true', default=False, help='Drop versions not installed on any server'
+    )
+    parser_compact_database.add_argument(
+        '--drop-empty', action='store_true', default=False, help='Drop empty test results, trainings, labels, ... and tools left without data'
+    )
+    parser_compact_database.add_argument('--dry-run', action='store_true', default=False, help='Report what would be removed without writing')
+
+    parser_search = subparsers.add_parser(
+        'search', help='find tools by name, description, EDAM terms and xrefs (every query term must match, by prefix)'
+    )
+    parser_search.add_argument('query', nargs='+', help='Search terms')
+    parser_search.add_argument('--limit', type=int, default=DEFAULT_SEARCH_LIMIT, help='Maximum number of tools to list')
+    parser_search.add_argument('--output', type=str, default=None, help='Write results to this tabular file instead of standard output')
+
+    parser_merge = subparsers.add_parser(
+        'merge', help='merge partial databases (e.g. written by parallel import jobs) into the database, in the order given'
+    )
+    parser_merge.add_argument('inputs', metavar='INPUT', nargs='+', help='Partial database files')
+    parser_merge.add_argument(
+        '--merge-strategy', choices=TestDataMergeStrategy.__members__.keys(), default="latest_executed",
+        help='How to reconcile test results recorded for the same test target in several databases'
+    )
+
+    parser_validate = subparsers.add_parser('validate', help='validate the database, reporting every error by tool id and field path')
+    parser_validate.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help="Number of processes to validate tools in")
+
+    parser_run = subparsers.add_parser(
+        'run', help='run a script of subcommands (one per line) against one in-memory database, writing it once at the end'
+    )
+    parser_run.add_argument('script', type=str, help=f"Script of subcommands, '{RUN_SCRIPT_CHECKPOINT}' lines write the database before continuing")
+
+    parser_serve = subparsers.add_parser('serve', help='keep the database in memory and answer queries and commands over a local socket')
+    serve_address_group = parser_serve.add_mutually_exclusive_group()
+    serve_address_group.add_argument('--socket', type=str, default=None, help='Unix socket path to listen on')
+    serve_address_group.add_argument(
+        '--port', type=int, default=DEFAULT_DAEMON_PORT, help='localhost port to listen on (lookups only, commands need --socket)'
+    )
+    parser_serve.add_argument('--host', type=str, default=DEFAULT_DAEMON_HOST, help='Interface to bind to (HTTP only)')
+    parser_serve.add_argument(
+        '--debounce', type=float, default=DEFAULT_DAEMON_DEBOUNCE,
+        help='Seconds without further changes to wait before persisting the database'
+    )
+
     # debugging commands...
     parser_g_export = subparsers.add_parser('_google-export', help='export a local spreadsheet to Google Sheets')
     parser_g_export.add_argument('input', help='Input to read spreadsheet from')
     parser_g_export.add_argument('sheet_id', help='ID of sheet to export to Google')
+    _add_sync_sheet_argument(parser_g_export)
 
     parser_g_import = subparsers.add_parser('_google-import', help='import a Google Sheets spreadsheet to the local filesystem')
     parser_g_import.add_argument('sheet_id', help='ID of sheet to import from Google')
@@ -601,6 +1258,16 @@ def arg_parser():
     return parser
 
 
+def _add_sync_sheet_argument(parser):
+    parser.add_argument(
+        '--sync-sheet', action="store_true", default=False,
+        help=(
+            f"When writing to a {SHEET_TARGET_PREFIX} target, only upload rows that changed "
+            f"(matched on the '{COLUMN_HEADER_TOOL_ID}' and '{COLUMN_HEADER_TOOL_VERSION}' columns)"
+        )
+    )
+
+
 def add_common_filters(parser):
     parser.add_argument(
         '--require-label', dest="require_labels", action='append', default=[], required=False,
@@ -610,6 +1277,64 @@ def add_common_filters(parser):
         '--exclude-label', dest="exclude_labels", action='append', default=[], required=False,
         help='Filter to exclude tools with specified label'
     )
+    parser.add_argument(
+        '--filter-tool-shed', dest="filter_tool_shed", default=None, required=False,
+        help='Filter to only tools from the specified tool shed (e.g. toolshed.g2.bx.psu.edu)'
+    )
+    parser.add_argument(
+        '--filter-owner', dest="filter_owner", default=None, required=False,
+        help='Filter to only tool shed tools from repositories of the specified owner'
+    )
+    parser.add_argument(
+        '--filter-repository', dest="filter_repository", default=None, required=False,
+        help='Filter to only tool shed tools from repositories with the specified name'
+    )
+    parser.add_argument(
+        '--tool-id-prefix', dest="filter_tool_id_prefix", default=None, required=False,
+        help='Filter to only tools whose (versionless) id starts with the specified prefix'
+    )
+
+
+def add_checkpoint_arguments(parser, default_every: int, inputs: str):
+    parser.add_argument(
+        '--checkpoint-every', type=int, default=default_every,
+        help=f'Write the database and a resume marker after every N {inputs} (0 to only write at the end)'
+    )
+    parser.add_argument(
+        '--resume', action='store_true', default=False,
+        help=f'Skip the {inputs} completed by an interrupted run of the same import (see --checkpoint-every)'
+    )
+
+
+def add_watch_arguments(parser, files: str):
+    parser.add_argument(
+        '--watch', action='store_true', default=False,
+        help=f'After importing, keep watching the directory and import {files} as they are added or changed (until interrupted)'
+    )
+    parser.add_argument(
+        '--poll', action='store_true', default=False, help='Detect changes by polling even where inotify is available'
+    )
+    parser.add_argument(
+        '--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+        help='Seconds between checks for changes when polling (and between checks for interrupts with inotify)'
+    )
+    parser.add_argument(
+        '--debounce', type=float, default=DEFAULT_WATCH_DEBOUNCE,
+        help='Write the database once no further changes were imported for this many seconds'
+    )
+
+
+def _watch_options(args) -> Optional[WatchOptions]:
+    if not args.watch:
+        return None
+    return WatchOptions(poll=args.poll, poll_interval=args.poll_interval, debounce=args.debounce)
+
+
+def _set_tool_id_filters(filter_args: FilterArguments, args) -> None:
+    filter_args.tool_shed = args.filter_tool_shed
+    filter_args.owner = args.filter_owner
+    filter_args.repository = args.filter_repository
+    filter_args.tool_id_prefix = args.filter_tool_id_prefix
 
 
 def _server_from_args(args) -> Server:
@@ -628,33 +1353,74 @@ def main(argv=None):
 
     parser = arg_parser()
     args = parser.parse_args(argv)
+    if args.daemon and args.command != "serve":
+        from .daemon import forward_command
+
+        forward_command(args.daemon, _strip_daemon_argument(argv), args.tools_metadata)
+        return
+    apply_process_options(args)
     config = Config(args.tools_metadata)
+    with contextlib.ExitStack() as stack:
+        if args.profile or args.profile_cprofile:
+            stack.enter_context(instrumentation.profiled(args.profile_format, args.profile_output, args.profile_cprofile))
+        if args.metrics_output:
+            stack.enter_context(metrics.collected(args.metrics_output, args.metrics_format, args.command, args.tools_metadata))
+        run_command(config, args)
+
+
+def apply_process_options(args) -> None:
+    """Apply the options setting process-wide defaults (see ``PROCESS_OPTIONS``), once per process."""
+    set_strict_validation(args.strict_validation)
+    set_validation_jobs(args.validation_jobs)
+    set_compact_representation(args.compact)
+    set_compression_level(args.compression_level)
+    if args.sheet_cache:
+        from .sheets import set_sheet_cache_directory
+
+        set_sheet_cache_directory(args.sheet_cache)
+
+
+def process_options_set(args, parser: Optional[argparse.ArgumentParser] = None) -> List[str]:
+    """The ``PROCESS_OPTIONS`` given in ``args``, these can't change per ``run`` step or forwarded command."""
+    parser = parser or arg_parser()
+    return [option for option, dest in PROCESS_OPTIONS.items() if getattr(args, dest) != parser.get_default(dest)]
+
+
+def run_command(config: Config, args):
+    """Run the command described by parsed ``args`` (see ``arg_parser``) against ``config``."""
     command = args.command
     if command == "import-server":
         server = _server_from_args(args)
         bootstrap_tools_metadata(config, server)
     elif command == "import-server-all":
-        servers = PUBLIC_SERVERS
-        for server in servers:
-            bootstrap_tools_metadata(config, Server(server, None))
+        import_server_all(config, args.checkpoint_every, args.resume)
     elif command == "import-tabular":
         labels = args.labels
         assert labels
         import_tabular(config, args.input, labels)
     elif command == "import-tests":
         merge_strategy = TestDataMergeStrategy.__members__[args.merge_strategy]
-        import_test_results(config, args.input, args.test_target, merge_strategy)
+        import_test_results(
+            config, args.input, args.test_target, merge_strategy, args.checkpoint_every, args.resume, _watch_options(args)
+        )
     elif command == "export-tabular":
         export_config = ExportSpreadsheetConfig(args)
         export_coverage(config, export_config)
     elif command == "export-coverage-versions":
-        export_coverage_versions(config, args.output)
+        export_coverage_versions(config, args.output, sync_sheet=args.sync_sheet)
+    elif command == "export-coverage-summary":
+        export_coverage_summary(config, args.output, args.server)
+    elif command == "export-training-coverage":
+        export_training_coverage(config, args.output, args.server)
+    elif command == "export-edam":
+        export_edam(config, args.output, args.server, args.kind, args.missing_on)
     elif command == "clear-tests":
         clear_test_results(config, args.test_target)
     elif command == "clear-label":
         clear_label(config, args.label)
     elif command == "export-install-yaml":
         filter_args = FilterArguments(args.require_labels, args.exclude_labels)
+        _set_tool_id_filters(filter_args, args)
         export_install_yaml(config, args.output, args.server, filter_args)
     elif command == "import-labels":
         import_labels(config, args.input)
@@ -670,31 +1436,126 @@ def main(argv=None):
         view_def.name = args.name
         view_def.require_labels = args.require_labels
         view_def.exclude_labels = args.exclude_labels
+        _set_tool_id_filters(view_def, args)
+        view_def.group_by = args.group_by
         export_panel_view(config, args.server, view_def)
-    elif command == "label-workflow-tools":
-        labels = args.label
-        assert labels
-        label_workflow_tools(config, args.input, labels)
+    elif command == "export-panel-views":
+        export_panel_views(config, args.views, args.output_directory, args.jobs)
+    elif command in WORKFLOW_COMMANDS:
+        _run_workflow_command(config, args)
     elif command == "import-trainings":
         directory = args.training_directory
-        import_training(config, directory)
+        import_training(config, directory, args.checkpoint_every, args.resume, _watch_options(args))
     elif command == "import-server-as-label":
         server = _server_from_args(args)
         label_server_tools(config, args.label, server)
     elif command == "_google-export":
-        google_export(args.input, args.sheet_id)
+        google_export(args.input, args.sheet_id, sync_sheet=args.sync_sheet)
     elif command == "_google-import":
         google_import(args.sheet_id, args.output)
+    elif command == "compact":
+        policy = RetentionPolicy(
+            keep_versions=args.keep_versions,
+            tests_before=args.tests_before,
+            drop_unavailable_versions=args.drop_unavailable_versions,
+            drop_empty=args.drop_empty,
+        )
+        compact_database(config, policy, dry_run=args.dry_run)
+    elif command == "search":
+        search_tools(config, args.query, args.limit, args.output)
+    elif command == "merge":
+        merge_strategy = TestDataMergeStrategy.__members__[args.merge_strategy]
+        merge_databases(config, args.inputs, merge_strategy)
+    elif command == "validate":
+        validate_database(config, args.jobs)
+    elif command == "run":
+        run_script(config, args.script)
+    elif command == "serve":
+        from .daemon import serve
+
+        serve(config, socket_path=args.socket, host=args.host, port=args.port, debounce=args.debounce)
     else:
         raise Exception(f"Unknown command [{command}]")
 
 
+def _run_workflow_command(config: Config, args):
+    command = args.command
+    if command == "label-workflow-tools":
+        labels = args.label
+        assert labels
+        label_workflow_tools(config, args.input, labels, args.workflow_index)
+    elif command == "index-workflows":
+        index_workflows(config, args.input, args.workflow_index)
+    elif command == "export-workflow-tools":
+        export_workflow_tools(config, args.output, args.input, args.workflow_index)
+    else:
+        assert command == "export-workflow-breakage"
+        export_workflow_breakage(config, args.output, args.server, args.tool_ids, args.workflow_index)
+
+
+def _strip_daemon_argument(argv: List[str]) -> List[str]:
+    stripped = []
+    skip_next = False
+    for arg in argv:
+        if skip_next:
+            skip_next = False
+        elif arg == "--daemon":
+            skip_next = True
+        elif not arg.startswith("--daemon="):
+            stripped.append(arg)
+    return stripped
+
+
+def _readable_database(config: Config) -> ToolsMetadata:
+    if config.tools_metadata is not None:
+        return config.tools_metadata
+    return ToolsMetadata(config.metadata_file)
+
+
 @contextlib.contextmanager
 def _writable_database(config: Config):
+    if config.tools_metadata is not None:
+        yield config.tools_metadata
+        if config.on_database_modified is not None:
+            config.on_database_modified()
+        return
     db = ToolsMetadata(config.metadata_file)
+    # keeps the changes another process writes meanwhile, see ToolsMetadata.track_changes
+    db.track_changes()
     yield db
     db.write()
 
 
+@contextlib.contextmanager
+def _checkpointed_database(config: Config, operation: str, every: int, resume: bool):
+    # like _writable_database, also writing checkpoints during the import (see gx_tool_db.checkpoint)
+    with _writable_database(config) as tools_metadata:
+        metadata_file = config.metadata_file if config.tools_metadata is None else None
+        checkpoint = ImportCheckpoint(tools_metadata, metadata_file, operation, every, resume)
+        yield tools_metadata, checkpoint
+    checkpoint.finish()
+
+
+@contextlib.contextmanager
+def _watcher(config: Config, directory: str, accept: Callable[[str], bool], options: Optional[WatchOptions]) -> Iterator[Optional[Watcher]]:
+    # started before the initial import so no change made during it is missed
+    if options is None:
+        yield None
+        return
+    if config.tools_metadata is not None:
+        raise Exception("--watch runs until interrupted, it can't be used with --daemon or in a run script")
+    watcher = watcher_for(directory, accept, options.poll)
+    try:
+        yield watcher
+    finally:
+        watcher.close()
+
+
+def _keep_watching(config: Config, directory: str, watcher: Watcher, process: Callable[[ToolsMetadata, str], None], options: WatchOptions):
+    print(f"Watching {directory} for changes (interrupt to stop)")
+    processed = watch(ToolsMetadata(config.metadata_file), watcher, process, options)
+    print(f"Imported {processed} changed files")
+
+
 if __name__ == "__main__":
     main()
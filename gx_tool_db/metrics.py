@@ -0,0 +1,176 @@
+"""Metrics files for scheduled runs, in Prometheus textfile collector format or JSON.
+
+``--metrics-output`` collects the phases, counters and observations of
+:mod:`gx_tool_db.instrumentation` (as ``--profile`` does, but without tracing
+allocations) for one command. The metrics file also records the command's
+duration, whether it succeeded, the database size before and after, and the
+peak RSS. The file is written when the command finishes, even if it fails,
+and replaced atomically so a collector never reads a partial file.
+
+::
+
+    $ gx-tool-db --metrics-output /var/lib/node_exporter/gx_tool_db.prom import-server-all
+"""
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import instrumentation
+
+METRICS_FORMATS = ["prometheus", "json"]
+DEFAULT_METRICS_FORMAT = "prometheus"
+METRIC_PREFIX = "gx_tool_db_"
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, ``None`` where ``resource`` is unavailable."""
+    try:
+        import resource
+    except ImportError:  # e.g. Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _file_size(path: Optional[str]) -> Optional[int]:
+    if path is None or not os.path.exists(path):
+        return None
+    return os.path.getsize(path)
+
+
+def metrics_dict(
+    profile: instrumentation.Profile,
+    command: str,
+    success: bool,
+    started: float,
+    duration_seconds: float,
+    database_size_before: Optional[int],
+    database_size_after: Optional[int],
+) -> Dict[str, Any]:
+    as_dict: Dict[str, Any] = {
+        "command": command,
+        "success": success,
+        "timestamp_seconds": round(started, 3),
+        "duration_seconds": round(duration_seconds, 6),
+        "database_size_bytes": {"before": database_size_before, "after": database_size_after},
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    as_dict.update(profile.to_dict())
+    return as_dict
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _metric_name(name: str) -> str:
+    return METRIC_PREFIX + "".join(c if c.isalnum() else "_" for c in name)
+
+
+class _PrometheusText:
+
+    def __init__(self, command: str):
+        self.command = command
+        self.lines: List[str] = []
+
+    def metric(self, name: str, type: str, help: str) -> str:
+        metric_name = _metric_name(name)
+        self.lines.append(f"# HELP {metric_name} {help}")
+        self.lines.append(f"# TYPE {metric_name} {type}")
+        return metric_name
+
+    def sample(self, metric_name: str, value: Any, **labels: Any) -> None:
+        if value is None:
+            return
+        all_labels = dict(command=self.command, **labels)
+        label_text = ",".join(f'{key}="{_escape(label_value)}"' for key, label_value in all_labels.items())
+        value_text = str(value) if isinstance(value, int) else repr(float(value))
+        self.lines.append(f"{metric_name}{{{label_text}}} {value_text}")
+
+
+def prometheus_text(as_dict: Dict[str, Any]) -> str:
+    """Render a :func:`metrics_dict` in the Prometheus text exposition format."""
+    text = _PrometheusText(as_dict["command"])
+    text.sample(text.metric("last_run_timestamp_seconds", "gauge", "Start time of the last run."), as_dict["timestamp_seconds"])
+    text.sample(text.metric("success", "gauge", "Whether the last run succeeded (1) or failed (0)."), 1 if as_dict["success"] else 0)
+    text.sample(text.metric("duration_seconds", "gauge", "Wall time of the last run."), as_dict["duration_seconds"])
+    name = text.metric("database_size_bytes", "gauge", "Size of the database file before and after the last run.")
+    for when, size in as_dict["database_size_bytes"].items():
+        text.sample(name, size, when=when)
+    text.sample(text.metric("peak_rss_bytes", "gauge", "Peak resident set size of the last run."), as_dict["peak_rss_bytes"])
+
+    phases = as_dict["phases"]
+    for field, help in [("wall_seconds", "Wall time"), ("cpu_seconds", "CPU time"), ("calls", "Number of calls")]:
+        name = text.metric(f"phase_{field}", "gauge", f"{help} of each phase of the last run.")
+        for phase, stats in sorted(phases.items()):
+            text.sample(name, stats[field], phase=phase)
+
+    labeled_counters = as_dict["labeled_counters"]
+    for counter, total in as_dict["counters"].items():
+        name = text.metric(f"{counter}_total", "counter", f"{counter.replace('_', ' ').capitalize()} in the last run.")
+        labeled_total = 0
+        for series in labeled_counters.get(counter, []):
+            text.sample(name, series["value"], **series["labels"])
+            labeled_total += series["value"]
+        if total != labeled_total or not labeled_counters.get(counter):
+            text.sample(name, total - labeled_total)
+
+    for observed, series_list in as_dict["observations"].items():
+        name = text.metric(observed, "summary", f"{observed.replace('_', ' ').capitalize()} observed in the last run.")
+        for series in series_list:
+            text.sample(f"{name}_count", series["count"], **series["labels"])
+            text.sample(f"{name}_sum", series["sum"], **series["labels"])
+        name = text.metric(f"{observed}_max", "gauge", f"Largest {observed.replace('_', ' ')} observed in the last run.")
+        for series in series_list:
+            text.sample(name, series["max"], **series["labels"])
+
+    for gauge, value in as_dict["gauges"].items():
+        text.sample(text.metric(gauge, "gauge", f"{gauge.replace('_', ' ').capitalize()} at the end of the last run."), value)
+    return "\n".join(text.lines) + "\n"
+
+
+def write_metrics(path: str, as_dict: Dict[str, Any], format: str = DEFAULT_METRICS_FORMAT) -> None:
+    if format == "json":
+        content = json.dumps(as_dict, indent=2) + "\n"
+    else:
+        content = prometheus_text(as_dict)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+
+
+@contextlib.contextmanager
+def collected(output: str, format: str, command: str, metadata_file: Optional[str] = None) -> Iterator[instrumentation.Profile]:
+    """Collect metrics for the enclosed command and write them to ``output`` when it ends.
+
+    Shares the active profile if ``--profile`` already enabled one.
+    """
+    profile = instrumentation.current()
+    owned = profile is None
+    if profile is None:
+        profile = instrumentation.enable(track_memory=False)
+    database_size_before = _file_size(metadata_file)
+    started = time.time()
+    start = time.perf_counter()
+    success = False
+    try:
+        yield profile
+        success = True
+    finally:
+        duration_seconds = time.perf_counter() - start
+        if owned:
+            instrumentation.disable()
+        as_dict = metrics_dict(
+            profile, command, success, started, duration_seconds, database_size_before, _file_size(metadata_file)
+        )
+        write_metrics(output, as_dict, format)
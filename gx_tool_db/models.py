@@ -10,7 +10,9 @@ import yaml
 from pydantic import BaseModel, Extra
 from typing_extensions import Literal
 
+from . import instrumentation
 from .config import DEFAULT_DATABASE_PATH, TestDataMergeStrategy
+from .io import open_compressed
 
 
 class GxToolDbBaseModel(BaseModel, extra=Extra.forbid):  # type: ignore
@@ -234,23 +236,27 @@ class ToolDatabase(GxToolDbBaseModel):
     version: Literal['1.0']
     tools: Optional[Dict[str, ToolMetadata]]
     integrated_panels: Optional[Dict[str, ToolPanelSkeleton]]
+    # incremented on every write, used to detect concurrent writers
+    generation: Optional[int]
 
 
 def load_from_path(path: str = ".") -> ToolDatabase:
     """Load Pydantic model form of the database.
 
-    Supplied `path` can be a directory containing tools_metadata.yml or an actual YAML file.
+    Supplied `path` can be a directory containing tools_metadata.yml or an actual YAML file
+    (gzip or zstd compressed if it ends with ``.gz`` or ``.zst``).
     """
     if os.path.isdir(path):
         path = os.path.join(path, DEFAULT_DATABASE_PATH)
-    with open(path, "r") as f:
+    with open_compressed(path) as f:
         as_dict = yaml.safe_load(f)
     return ToolDatabase(**as_dict)
 
 
 def load_from_dict(as_dict: Dict[str, Any]) -> ToolDatabase:
     """Load Pydantic model form of the database."""
-    return ToolDatabase(**as_dict)
+    with instrumentation.phase("validate"):
+        return ToolDatabase(**as_dict)
 
 
 def validate(path: str) -> None:
@@ -1,9 +1,11 @@
 """Abstractions for test result data."""
 import json
 import os
-from typing import Iterator, NamedTuple
+from typing import Container, Iterator, NamedTuple, Optional
 
+from gx_tool_db import instrumentation
 from gx_tool_db.io import open_uri, repository_walk
+from gx_tool_db.tool_ids import versionless_tool_id
 
 
 class TestResults:
@@ -19,25 +21,22 @@ class TestResults:
             results = json_contents
 
         tests = results["tests"]
+        instrumentation.count("test_results_parsed", len(tests))
 
         results_by_id = {}
         for result in tests:
             if not result.get("has_data"):
                 continue
             result_data = result.get("data")
-            tool_id = result_data['tool_id']
+            # tool shed tools are tested by their versioned id, results are recorded per (versionless) tool
+            tool_id = versionless_tool_id(result_data['tool_id'])
             if tool_id not in results_by_id:
                 results_by_id[tool_id] = []
             results_by_id[tool_id].append(result_data)
         self.results_by_id = results_by_id
 
     def get_results_for_tool_id(self, tool_id):
-        results_by_id = self.results_by_id
-        if tool_id in results_by_id:
-            return results_by_id[tool_id]
-        else:
-            tool_id = tool_id.rsplit("/", 1)[0]
-            return results_by_id.get(tool_id)
+        return self.results_by_id.get(versionless_tool_id(tool_id))
 
 
 class TestResultsCollection(NamedTuple):
@@ -46,21 +45,34 @@ class TestResultsCollection(NamedTuple):
     results: TestResults
 
 
-def result_collections(uri: str) -> Iterator[TestResultsCollection]:
+def result_collections(uri: str, exclude: Container[str] = ()) -> Iterator[TestResultsCollection]:
+    """Test results at ``uri`` (a file, URL or directory walked for result files), skipping ``exclude``d uris."""
     if "://" in uri or not os.path.isdir(uri):
-        yield TestResultsCollection(uri, TestResults(path=uri))
+        if uri not in exclude:
+            instrumentation.count("result_files_parsed")
+            yield TestResultsCollection(uri, TestResults(path=uri))
     else:
-        yield from _walk_potential_result_files(uri)
+        yield from _walk_potential_result_files(uri, exclude)
 
 
-def _walk_potential_result_files(path: str):
-    for (dirpath, _, filenames) in repository_walk(path, extensions=[".json"]):
-        for filename in filenames:
+def _walk_potential_result_files(path: str, exclude: Container[str] = ()):
+    for (dirpath, dirs, filenames) in repository_walk(path, extensions=[".json"]):
+        # walk in a stable order so interrupted imports checkpoint a prefix of the files
+        dirs.sort()
+        for filename in sorted(filenames):
             json_path = os.path.join(dirpath, filename)
-            with open(json_path, "r") as f:
-                results = json.load(f)
-                if "tests" in results:
-                    yield TestResultsCollection(
-                        json_path,
-                        TestResults(json_contents=results)
-                    )
+            if json_path in exclude:
+                continue
+            collection = result_file_collection(json_path)
+            if collection is not None:
+                yield collection
+
+
+def result_file_collection(json_path: str) -> Optional[TestResultsCollection]:
+    """Test results in the local JSON file ``json_path``, ``None`` if it isn't a test results file."""
+    with open(json_path, "r") as f:
+        results = json.load(f)
+    instrumentation.count("result_files_parsed")
+    if "tests" not in results:
+        return None
+    return TestResultsCollection(json_path, TestResults(json_contents=results))
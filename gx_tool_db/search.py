@@ -0,0 +1,229 @@
+"""Full-text search over tool names, descriptions, EDAM terms and xrefs.
+
+The index maps each token to the tools containing it, weighted by field and
+term frequency. Query terms match tokens by prefix, tools must match every
+query term and are ranked by the sum of their (idf weighted) term scores,
+exact token matches counting double.
+
+The index is persisted next to the database (``<database>.search.json``)
+tagged with the database ``generation`` it reflects. ``ToolsMetadata``
+updates it incrementally for tools whose metadata changed and rebuilds it
+when it is stale.
+"""
+import bisect
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from . import instrumentation
+from .db import version_sorted_iterable
+
+SEARCH_INDEX_SUFFIX = ".search.json"
+SEARCH_INDEX_FORMAT = 1
+DEFAULT_SEARCH_LIMIT = 20
+# version metadata fields indexed (taken from the newest version that has them) and their weights
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "edam_operations": 2.0,
+    "edam_topics": 2.0,
+    "xrefs": 1.5,
+    "description": 1.0,
+}
+TOOL_ID_WEIGHT = 2.0
+# score multiplier for query terms matching a token only by prefix
+PREFIX_MATCH_FACTOR = 0.5
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_MAX_CHARACTER = chr(0x10FFFF)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def search_index_path(metadata_file: str) -> str:
+    return f"{metadata_file}{SEARCH_INDEX_SUFFIX}"
+
+
+def tool_terms(tool_id: str, tool_metadata: Mapping[str, Any]) -> Dict[str, float]:
+    """Weighted term frequencies indexed for a tool."""
+    terms: Dict[str, float] = {}
+
+    def add(text: Any, weight: float):
+        for token in tokenize(str(text)):
+            terms[token] = terms.get(token, 0.0) + weight
+
+    # the tool's own id, without the tool shed and repository parts
+    add(tool_id.rsplit("/", 1)[-1], TOOL_ID_WEIGHT)
+    versions = tool_metadata.get("versions") or {}
+    newest_first = [versions[version] for version in version_sorted_iterable(versions.keys())]
+    for field, weight in FIELD_WEIGHTS.items():
+        value = next((version[field] for version in newest_first if version.get(field)), None)
+        if not value:
+            continue
+        if field == "xrefs":
+            value = [xref.get("value") for xref in value if xref.get("value")]
+        for text in value if isinstance(value, list) else [value]:
+            add(text, weight)
+    return terms
+
+
+class SearchHit(NamedTuple):
+    tool_id: str
+    score: float
+
+
+class SearchIndex:
+    """Inverted index of tool metadata terms (see module documentation)."""
+
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        # term -> tool id -> weighted frequency
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # tool id -> term -> weighted frequency, to replace a tool's terms on update
+        self._tool_terms: Dict[str, Dict[str, float]] = {}
+        self._sorted_terms: Optional[List[str]] = None
+
+    @staticmethod
+    def build(tools: Mapping[str, Any], generation: int = 0) -> 'SearchIndex':
+        with instrumentation.phase("search_index_build"):
+            index = SearchIndex(generation)
+            for tool_id, tool_metadata in tools.items():
+                index._add(tool_id, tool_terms(tool_id, tool_metadata))
+        return index
+
+    def __len__(self) -> int:
+        return len(self._tool_terms)
+
+    def update_tool(self, tool_id: str, tool_metadata: Optional[Mapping[str, Any]]) -> None:
+        """Re-index ``tool_id`` (``None`` removes it)."""
+        self._remove(tool_id)
+        if tool_metadata is not None:
+            self._add(tool_id, tool_terms(tool_id, tool_metadata))
+
+    def _add(self, tool_id: str, terms: Dict[str, float]) -> None:
+        if not terms:
+            return
+        self._tool_terms[tool_id] = terms
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted_terms = None
+            postings[tool_id] = weight
+
+    def _remove(self, tool_id: str) -> None:
+        for term in self._tool_terms.pop(tool_id, {}):
+            postings = self._postings[term]
+            del postings[tool_id]
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+
+    def _matching_terms(self, prefix: str) -> List[str]:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        sorted_terms = self._sorted_terms
+        start = bisect.bisect_left(sorted_terms, prefix)
+        end = bisect.bisect_left(sorted_terms, prefix + _MAX_CHARACTER, start)
+        return sorted_terms[start:end]
+
+    def _postings_count(self, terms: List[str], bound: float) -> float:
+        count = 0
+        for term in terms:
+            count += len(self._postings[term])
+            if count > bound:
+                break
+        return count
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchHit]:
+        """Tools matching every term of ``query`` (by token prefix), best first (``DEFAULT_SEARCH_LIMIT`` by default)."""
+        limit = DEFAULT_SEARCH_LIMIT if limit is None else limit
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return []
+        matching_terms = {query_term: self._matching_terms(query_term) for query_term in query_terms}
+        if not all(matching_terms.values()):
+            return []
+        tool_count = len(self._tool_terms)
+        factors: Dict[str, float] = {}
+
+        def factor(query_term: str, term: str) -> float:
+            term_factor = factors.get(term)
+            if term_factor is None:
+                term_factor = factors[term] = math.log(1 + tool_count / len(self._postings[term]))
+            return term_factor if term == query_term else term_factor * PREFIX_MATCH_FACTOR
+
+        # candidates are the tools matching the most selective query term...
+        driving_term = None
+        fewest: float = math.inf
+        for query_term in sorted(query_terms, key=lambda query_term: len(matching_terms[query_term])):
+            count = self._postings_count(matching_terms[query_term], fewest)
+            if count < fewest:
+                driving_term, fewest = query_term, count
+        assert driving_term is not None
+        scores: Dict[str, float] = {}
+        for term in matching_terms[driving_term]:
+            term_factor = factor(driving_term, term)
+            for tool_id, weight in self._postings[term].items():
+                scores[tool_id] = scores.get(tool_id, 0.0) + weight * term_factor
+
+        # ... that match every other term, looked up in the postings or the tool's own terms
+        for query_term in query_terms:
+            if query_term == driving_term:
+                continue
+            terms = matching_terms[query_term]
+            term_scores: Dict[str, float] = {}
+            for tool_id, score in scores.items():
+                term_score = 0.0
+                own_terms = self._tool_terms[tool_id]
+                if len(terms) <= len(own_terms):
+                    for term in terms:
+                        tool_weight = own_terms.get(term)
+                        if tool_weight is not None:
+                            term_score += tool_weight * factor(query_term, term)
+                else:
+                    for term, weight in own_terms.items():
+                        if term.startswith(query_term):
+                            term_score += weight * factor(query_term, term)
+                if term_score:
+                    term_scores[tool_id] = score + term_score
+            scores = term_scores
+            if not scores:
+                return []
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [SearchHit(tool_id, round(score, 4)) for tool_id, score in best]
+
+    def save(self, path: str) -> None:
+        # same temporary file and move approach as ToolsMetadata.write
+        with instrumentation.phase("search_index_save"):
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=SEARCH_INDEX_SUFFIX)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"format": SEARCH_INDEX_FORMAT, "generation": self.generation, "tools": self._tool_terms}, f)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            os.replace(temp_path, path)
+
+    @staticmethod
+    def load(path: str) -> Optional['SearchIndex']:
+        """Load a persisted index, ``None`` if there is none (or it can't be read)."""
+        if not os.path.exists(path):
+            return None
+        with instrumentation.phase("search_index_load"):
+            try:
+                with open(path) as f:
+                    as_dict = json.load(f)
+            except ValueError:
+                return None
+            if as_dict.get("format") != SEARCH_INDEX_FORMAT:
+                return None
+            index = SearchIndex(as_dict["generation"])
+            for tool_id, terms in as_dict["tools"].items():
+                index._add(tool_id, terms)
+        return index
@@ -1,9 +1,15 @@
+import json
+import os
 import tempfile
-from typing import Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 import gspread
+from gspread.utils import rowcol_to_a1
 from pkg_resources import resource_string
 
+from . import instrumentation
 from .io import (
     csv_reader,
     csv_writer,
@@ -20,10 +26,22 @@ CSV_KWDS = dict(delimiter="\t", quotechar='"')
 
 REQUIRED_SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
+    # used to read the spreadsheet's modifiedTime to revalidate locally cached sheet contents
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
 ]
 
+# rows are matched on whichever of these columns the sheet has (one row per version in some exports)
+DEFAULT_SYNC_KEY_COLUMNS = ["Tool ID", "Tool Version"]
+# Keep each values.batchUpdate request comfortably below the API payload limits.
+DEFAULT_SYNC_MAX_CELLS_PER_REQUEST = 20000
+DEFAULT_SYNC_MAX_WORKERS = 4
+DEFAULT_SYNC_MAX_RETRIES = 5
+DEFAULT_SYNC_BACKOFF = 1.0
+RETRYABLE_STATUS_CODES = [429, 500, 502, 503, 504]
 
-def get_client():
+
+def authorize_client():
+    """Run the OAuth flow and return a new gspread client."""
     with tempfile.NamedTemporaryFile() as f:
         credentials_str = resource_string(__name__, CREDENTIALS_FILENAME)
         f.write(credentials_str)
@@ -36,31 +54,284 @@ def get_client():
         return gc
 
 
-def get_worksheet(spreadsheet_id: str):
-    gc = get_client()
+class SheetsClientCache:
+    """Lazily authorized client plus spreadsheet and worksheet handles keyed by spreadsheet id.
+
+    If ``cache_directory`` is set, downloaded sheet contents are stored there
+    and only re-downloaded when the spreadsheet's last modification time changes.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any] = authorize_client, cache_directory: Optional[str] = None):
+        self._client_factory = client_factory
+        self._client = None
+        self._spreadsheets: Dict[str, Any] = {}
+        self._worksheets: Dict[str, Any] = {}
+        self.cache_directory = cache_directory
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def spreadsheet(self, spreadsheet_id: str):
+        if spreadsheet_id not in self._spreadsheets:
+            self._spreadsheets[spreadsheet_id] = self.client.open_by_key(spreadsheet_id)
+        return self._spreadsheets[spreadsheet_id]
+
+    def worksheet(self, spreadsheet_id: str):
+        if spreadsheet_id not in self._worksheets:
+            self._worksheets[spreadsheet_id] = self.spreadsheet(spreadsheet_id).worksheets()[0]
+        return self._worksheets[spreadsheet_id]
+
+    def download(self, spreadsheet_id: str) -> List[List[Any]]:
+        cache_path = self._cache_path(spreadsheet_id)
+        revision = None
+        if cache_path is not None:
+            revision = _spreadsheet_revision(self.spreadsheet(spreadsheet_id))
+            if revision is not None and os.path.exists(cache_path):
+                with open(cache_path, "r") as f:
+                    cached = json.load(f)
+                if cached.get("revision") == revision:
+                    return cached["values"]
+        values = self.worksheet(spreadsheet_id).get_all_values()
+        if cache_path is not None and revision is not None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump({"revision": revision, "values": values}, f)
+        return values
+
+    def invalidate(self, spreadsheet_id: str) -> None:
+        """Forget cached contents after the sheet has been written to."""
+        cache_path = self._cache_path(spreadsheet_id)
+        if cache_path is not None and os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    def clear(self) -> None:
+        self._client = None
+        self._spreadsheets.clear()
+        self._worksheets.clear()
+
+    def _cache_path(self, spreadsheet_id: str) -> Optional[str]:
+        if not self.cache_directory:
+            return None
+        return os.path.join(self.cache_directory, f"{spreadsheet_id}.json")
+
+
+def _spreadsheet_revision(spreadsheet) -> Optional[str]:
+    try:
+        return spreadsheet.get_lastUpdateTime()
+    except (AttributeError, gspread.exceptions.APIError):
+        # older gspread or token authorized without Drive metadata scope - skip caching
+        return None
 
-    spreadsheet = gc.open_by_key(spreadsheet_id)
-    worksheet = spreadsheet.worksheets()[0]
-    return worksheet
 
+_default_cache = SheetsClientCache()
 
-def download_sheet_to_path(spreadsheet_id: str, output: str):
+
+def default_cache() -> SheetsClientCache:
+    """Process-wide cache used when no client is supplied explicitly."""
+    return _default_cache
+
+
+def set_sheet_cache_directory(cache_directory: Optional[str]) -> None:
+    _default_cache.cache_directory = cache_directory
+
+
+def _cache_for(client=None) -> SheetsClientCache:
+    if client is None:
+        return _default_cache
+    if isinstance(client, SheetsClientCache):
+        return client
+    return SheetsClientCache(lambda: client)
+
+
+def get_client():
+    return _default_cache.client
+
+
+def get_worksheet(spreadsheet_id: str, client=None):
+    return _cache_for(client).worksheet(spreadsheet_id)
+
+
+def download_sheet_to_path(spreadsheet_id: str, output: str, client=None):
     with csv_writer(output) as writer:
-        writer.writerows(download_sheet_to_list(spreadsheet_id))
+        writer.writerows(download_sheet_to_list(spreadsheet_id, client=client))
 
 
-def download_sheet_to_list(spreadsheet_id: str) -> List[List[Any]]:
-    worksheet = get_worksheet(spreadsheet_id)
-    return worksheet.get_all_values()
+def download_sheet_to_list(spreadsheet_id: str, client=None) -> List[List[Any]]:
+    with instrumentation.phase("google_sheets"):
+        return _cache_for(client).download(spreadsheet_id)
 
 
-def upload_sheet_from_path(input: str, spreadsheet_id: str) -> None:
+def upload_sheet_from_path(input: str, spreadsheet_id: str, sync: bool = False, client=None) -> None:
     with csv_reader(input) as reader:
         res = list(reader)
-    upload_sheet_from_list(res, spreadsheet_id)
+    upload_sheet_from_list(res, spreadsheet_id, sync=sync, client=client)
+
+
+def upload_sheet_from_list(rows: List[List[Any]], spreadsheet_id, sync: bool = False, client=None) -> None:
+    with instrumentation.phase("google_sheets"):
+        cache = _cache_for(client)
+        worksheet = cache.worksheet(spreadsheet_id)
+        cache.invalidate(spreadsheet_id)
+        if sync:
+            sync_worksheet_from_list(worksheet, rows)
+        else:
+            worksheet.clear()
+            worksheet.spreadsheet.values_append("Sheet1", {'valueInputOption': 'USER_ENTERED'}, {'values': rows})
+
+
+class SheetRangeUpdate(NamedTuple):
+    """A block of contiguous rows to write, ``start_row`` is 1-based like the Sheets API."""
+    start_row: int
+    values: List[List[str]]
+
+    @property
+    def a1_range(self) -> str:
+        width = max(len(r) for r in self.values)
+        end_row = self.start_row + len(self.values) - 1
+        return f"{rowcol_to_a1(self.start_row, 1)}:{rowcol_to_a1(end_row, width)}"
+
+    @property
+    def cell_count(self) -> int:
+        return sum(len(r) for r in self.values)
+
+
+def sync_worksheet_from_list(
+    worksheet,
+    rows: List[List[Any]],
+    key_columns: Sequence[str] = DEFAULT_SYNC_KEY_COLUMNS,
+    max_cells_per_request: int = DEFAULT_SYNC_MAX_CELLS_PER_REQUEST,
+    max_workers: int = DEFAULT_SYNC_MAX_WORKERS,
+    max_retries: int = DEFAULT_SYNC_MAX_RETRIES,
+    backoff: float = DEFAULT_SYNC_BACKOFF,
+) -> List[SheetRangeUpdate]:
+    """Update ``worksheet`` to contain ``rows`` sending only the rows that changed.
+
+    Returns the list of range updates that were sent (empty if the sheet was
+    already up to date).
+    """
+    current = worksheet.get_all_values()
+    target = diff_sheet_rows(current, rows, key_columns=key_columns)
+    batches = _chunk_updates(target, max_cells_per_request)
+    if not batches:
+        return target
+
+    def send(batch: List[SheetRangeUpdate]):
+        data = [{"range": u.a1_range, "values": u.values} for u in batch]
+        _with_backoff(lambda: worksheet.batch_update(data, value_input_option="USER_ENTERED"), max_retries, backoff)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # list() so any exception raised by a worker propagates here.
+        list(executor.map(send, batches))
+    return target
+
+
+def diff_sheet_rows(
+    current: List[List[Any]], rows: List[List[Any]], key_columns: Sequence[str] = DEFAULT_SYNC_KEY_COLUMNS
+) -> List[SheetRangeUpdate]:
+    """Compute the range updates needed to turn ``current`` into ``rows``.
+
+    Rows are matched on the ``key_columns`` present in the header. Keys already
+    in the sheet keep their position (so manual sorting of the sheet survives a
+    sync), new keys are appended, and rows whose key disappeared are dropped. If
+    the header row changed or the keys don't identify rows uniquely, rows are
+    compared by position instead.
+    """
+    new_rows = [_normalize_row(r) for r in rows]
+    old_rows = [_normalize_row(r) for r in current]
+    if not new_rows:
+        return _blank_updates(old_rows, 1)
+
+    header = new_rows[0]
+    key_indices = [header.index(column) for column in key_columns if column in header]
+    new_keys = [_row_key(row, key_indices) for row in new_rows[1:]]
+    old_keys = [_row_key(row, key_indices) for row in old_rows[1:]]
+    if (
+        not old_rows or old_rows[0] != header or not key_indices
+        or len(set(new_keys)) != len(new_keys) or len(set(old_keys)) != len(old_keys)
+    ):
+        desired = new_rows
+    else:
+        new_by_key = dict(zip(new_keys, new_rows[1:]))
+        desired = [header]
+        desired.extend(new_by_key[key] for key in old_keys if key in new_by_key)
+        old_key_set = set(old_keys)
+        desired.extend(row for key, row in zip(new_keys, new_rows[1:]) if key not in old_key_set)
+
+    width = max(len(r) for r in desired + old_rows)
+    updates: List[SheetRangeUpdate] = []
+    pending_start: Optional[int] = None
+    pending: List[List[str]] = []
+    for index, row in enumerate(desired):
+        padded = _pad(row, width)
+        old = _pad(old_rows[index], width) if index < len(old_rows) else None
+        if padded != old:
+            if pending_start is None:
+                pending_start = index + 1
+            pending.append(padded)
+        elif pending_start is not None:
+            updates.append(SheetRangeUpdate(pending_start, pending))
+            pending_start, pending = None, []
+    if pending_start is not None:
+        updates.append(SheetRangeUpdate(pending_start, pending))
+
+    updates.extend(_blank_updates(old_rows[len(desired):], len(desired) + 1, width))
+    return updates
+
+
+def _blank_updates(old_rows: List[List[str]], start_row: int, width: Optional[int] = None) -> List[SheetRangeUpdate]:
+    if not old_rows:
+        return []
+    width = width or max(len(r) for r in old_rows) or 1
+    return [SheetRangeUpdate(start_row, [[""] * width for _ in old_rows])]
+
+
+def _chunk_updates(updates: List[SheetRangeUpdate], max_cells: int) -> List[List[SheetRangeUpdate]]:
+    """Split updates so that no single batch request exceeds ``max_cells`` cells."""
+    batches: List[List[SheetRangeUpdate]] = []
+    batch: List[SheetRangeUpdate] = []
+    batch_cells = 0
+    for update in updates:
+        width = max(len(r) for r in update.values)
+        rows_per_piece = max(1, max_cells // max(width, 1))
+        for offset in range(0, len(update.values), rows_per_piece):
+            piece = SheetRangeUpdate(update.start_row + offset, update.values[offset:offset + rows_per_piece])
+            if batch and batch_cells + piece.cell_count > max_cells:
+                batches.append(batch)
+                batch, batch_cells = [], 0
+            batch.append(piece)
+            batch_cells += piece.cell_count
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _with_backoff(func, max_retries: int, backoff: float):
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except gspread.exceptions.APIError as e:
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            if attempt >= max_retries or status_code not in RETRYABLE_STATUS_CODES:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+            attempt += 1
+
+
+def _normalize_row(row: List[Any]) -> List[str]:
+    # Sheets returns every cell as a string and trims trailing empty cells.
+    normalized = ["" if v is None else str(v) for v in row]
+    while normalized and normalized[-1] == "":
+        normalized.pop()
+    return normalized
+
+
+def _row_key(row: List[str], key_indices: List[int]) -> Tuple[str, ...]:
+    return tuple(row[index] if index < len(row) else "" for index in key_indices)
 
 
-def upload_sheet_from_list(rows: List[List[Any]], spreadsheet_id) -> None:
-    worksheet = get_worksheet(spreadsheet_id)
-    worksheet.clear()
-    worksheet.spreadsheet.values_append("Sheet1", {'valueInputOption': 'USER_ENTERED'}, {'values': rows})
+def _pad(row: List[str], width: int) -> List[str]:
+    return row + [""] * (width - len(row))
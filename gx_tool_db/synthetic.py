@@ -0,0 +1,158 @@
+"""Generate realistic synthetic databases for benchmarks and tests.
+
+Databases follow the ``models.ToolDatabase`` schema and are deterministic for
+a given :class:`SyntheticDatabaseSpec` (including its ``seed``).
+"""
+import random
+from typing import Any, Dict, List, NamedTuple
+
+import yaml
+
+MAIN_TOOL_SHED = "toolshed.g2.bx.psu.edu"
+TEST_STATUSES = ["success", "success", "success", "failed", "error"]
+
+
+class SyntheticDatabaseSpec(NamedTuple):
+    tools: int = 1000
+    versions_per_tool: int = 3
+    servers: int = 4
+    labels: int = 10
+    test_targets: int = 2
+    trainings: int = 50  # number of tutorials referencing tools
+    sections: int = 30
+    seed: int = 0
+
+    @property
+    def server_labels(self) -> List[str]:
+        return [f"server{i}" for i in range(self.servers)]
+
+    @property
+    def label_names(self) -> List[str]:
+        return [f"label{i}" for i in range(self.labels)]
+
+    @property
+    def test_target_names(self) -> List[str]:
+        return [f"target{i}" for i in range(self.test_targets)]
+
+    @property
+    def section_ids(self) -> List[str]:
+        return [f"section{i}" for i in range(self.sections)]
+
+
+def synthetic_tool_id(index: int) -> str:
+    if index % 20 == 0:
+        return f"builtin_tool{index}"
+    return f"{MAIN_TOOL_SHED}/repos/owner{index % 97}/repo{index // 3}/tool{index}"
+
+
+def synthetic_database_dict(spec: SyntheticDatabaseSpec = SyntheticDatabaseSpec()) -> Dict[str, Any]:
+    rng = random.Random(spec.seed)
+    servers = spec.server_labels
+    labels = spec.label_names
+    section_ids = spec.section_ids
+    tools: Dict[str, Any] = {}
+    for t in range(spec.tools):
+        tool_id = synthetic_tool_id(t)
+        version_count = rng.randint(1, max(1, spec.versions_per_tool))
+        major = rng.randint(0, 4)
+        versions = [f"{major}.{v}.0+galaxy{rng.randint(0, 2)}" for v in range(version_count)]
+        versions_dict: Dict[str, Any] = {}
+        for version in versions:
+            version_dict: Dict[str, Any] = {
+                "servers": {},
+                "name": f"Tool {t}",
+                "description": f"does synthetic thing {t % 113}",
+                "model_class": "Tool" if t % 50 else "DataManagerTool",
+                "edam_operations": [f"operation_{3000 + (t % 400):04d}"],
+                "edam_topics": [f"topic_{(t % 60) * 10:04d}"],
+            }
+            versions_dict[version] = version_dict
+
+        tool_servers: Dict[str, Any] = {}
+        section_id = section_ids[t % len(section_ids)] if section_ids else None
+        for server in servers:
+            if rng.random() < 0.25:
+                continue
+            # most servers carry the newest version, some lag a version or two behind
+            lag = 0 if rng.random() < 0.7 else rng.randint(1, 2)
+            on_server = versions[: max(1, version_count - lag)]
+            server_dict: Dict[str, Any] = {"versions": list(on_server)}
+            if section_id:
+                server_dict["sections"] = {section_id: {"name": section_id.title()}}
+            tool_servers[server] = server_dict
+            for version in on_server:
+                versions_dict[version]["servers"][server] = {"labels": []}
+
+        for target in spec.test_target_names:
+            version = versions[-1] if rng.random() < 0.8 else rng.choice(versions)
+            if rng.random() < 0.5:
+                continue
+            results = {}
+            for index in range(rng.randint(1, 4)):
+                result: Dict[str, Any] = {"status": rng.choice(TEST_STATUSES)}
+                if rng.random() < 0.9:
+                    result["job_create_time"] = f"2021-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T04:29:32.{index:06d}"
+                results[index] = result
+            versions_dict[version].setdefault("test_results", {})[target] = results
+
+        tool: Dict[str, Any] = {"servers": tool_servers, "versions": versions_dict}
+        if labels and rng.random() < 0.4:
+            tool["external_labels"] = sorted(rng.sample(labels, rng.randint(1, min(3, len(labels)))))
+        if tool_id.startswith(MAIN_TOOL_SHED):
+            _, _, owner, name, _ = tool_id.split("/")
+            tool["tool_shed_repository"] = {"owner": owner, "name": name, "tool_shed": MAIN_TOOL_SHED}
+        tools[tool_id] = tool
+
+    tool_ids = list(tools.keys())
+    for tutorial in range(spec.trainings):
+        topic = f"topic{tutorial % max(1, spec.trainings // 5)}"
+        for tool_id in rng.sample(tool_ids, min(len(tool_ids), 5)):
+            latest_version = list(tools[tool_id]["versions"].keys())[-1]
+            version_dict = tools[tool_id]["versions"][latest_version]
+            version_dict.setdefault("trainings", []).append({"topic": topic, "tutorial": f"tutorial{tutorial}"})
+
+    skeleton: List[Dict[str, Any]] = []
+    for i, section_id in enumerate(section_ids):
+        if i % 10 == 0:
+            skeleton.append({"model_class": "ToolSectionLabel", "id": f"label_{i}", "text": f"SECTIONS {i}+"})
+        skeleton.append({"model_class": "ToolSection", "id": section_id, "name": section_id.title()})
+    return {
+        "version": "1.0",
+        "tools": tools,
+        "integrated_panels": {server: [dict(e) for e in skeleton] for server in servers},
+    }
+
+
+def write_synthetic_database(path: str, spec: SyntheticDatabaseSpec = SyntheticDatabaseSpec()) -> Dict[str, Any]:
+    database = synthetic_database_dict(spec)
+    with open(path, "w") as f:
+        yaml.safe_dump(database, f)
+    return database
+
+
+def synthetic_test_results_dict(database: Dict[str, Any], seed: int = 1, fraction: float = 0.5) -> Dict[str, Any]:
+    """Tool test output JSON (as consumed by ``import-tests``) for a sample of ``database``'s tools."""
+    rng = random.Random(seed)
+    tests = []
+    for tool_id, tool in database.get("tools", {}).items():
+        if rng.random() >= fraction:
+            continue
+        version = list(tool["versions"].keys())[-1]
+        for index in range(rng.randint(1, 3)):
+            tests.append({
+                "id": f"{tool_id}/{version}-{index}",
+                "has_data": True,
+                "data": {
+                    "tool_id": tool_id,
+                    "tool_version": version,
+                    "test_index": index,
+                    "status": rng.choice(TEST_STATUSES),
+                    "job": {"create_time": f"2022-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.{index:06d}"},
+                },
+            })
+    return {"version": "0.1", "tests": tests}
+
+
+def synthetic_label_assignments(database: Dict[str, Any], every: int = 3) -> List[str]:
+    """Every ``every``-th tool id, for exercising ``import-label``."""
+    return [tool_id for i, tool_id in enumerate(database.get("tools", {}).keys()) if i % every == 0]
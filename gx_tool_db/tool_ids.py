@@ -0,0 +1,125 @@
+"""Tool shed tool ids and a sorted index over the tool ids of a database.
+
+Tool shed tool ids look like ``<tool shed>/repos/<owner>/<repository>/<tool>``,
+optionally followed by ``/<version>``. The database is keyed by versionless ids
+so selecting the tools of a tool shed, owner or repository (or resolving a
+versioned id) would otherwise scan every tool id. :class:`ToolIdIndex` keeps the
+ids sorted (answering tool shed and id prefix/range queries by bisection), sorted
+by ``(owner, repository)`` for owner and repository queries across tool sheds, and
+maps known versioned ids to their tool id.
+"""
+import bisect
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+TOOL_SHED_REPOS = "/repos/"
+
+_MAX_CHARACTER = chr(0x10FFFF)
+
+
+class ToolShedId(NamedTuple):
+    tool_shed: str
+    owner: str
+    repository: str
+    tool: str
+    version: Optional[str] = None
+
+    @property
+    def versionless(self) -> str:
+        return f"{self.tool_shed}{TOOL_SHED_REPOS}{self.owner}/{self.repository}/{self.tool}"
+
+
+def parse_tool_shed_id(tool_id: str) -> Optional[ToolShedId]:
+    """Split a tool shed tool id into its parts, ``None`` for other (e.g. built-in) tool ids."""
+    tool_shed, separator, path = tool_id.partition(TOOL_SHED_REPOS)
+    if not separator or not tool_shed:
+        return None
+    parts = path.split("/", 3)
+    if len(parts) < 3 or not all(parts):
+        return None
+    return ToolShedId(tool_shed, *parts)
+
+
+def versionless_tool_id(tool_id: str) -> str:
+    """Strip the version from a versioned tool shed tool id (other ids are returned unchanged)."""
+    parsed = parse_tool_shed_id(tool_id)
+    if parsed is None or parsed.version is None:
+        return tool_id
+    return parsed.versionless
+
+
+def _prefix_range(sorted_keys: List, start, end) -> Tuple[int, int]:
+    low = bisect.bisect_left(sorted_keys, start)
+    return low, bisect.bisect_left(sorted_keys, end, low)
+
+
+class ToolIdIndex:
+    """Sorted (versionless) tool ids supporting tool shed, owner, repository and prefix queries."""
+
+    def __init__(self, tool_versions: Mapping[str, Iterable[str]]):
+        """Index the tool ids (keys of ``tool_versions``) and their known versioned ids."""
+        self._tool_ids: List[str] = sorted(tool_versions)
+        # (owner, repository, tool shed, tool id) of the tool shed tools
+        self._repository_keys: List[Tuple[str, str, str, str]] = []
+        # tool id and versioned tool ids -> tool id
+        self._resolved: Dict[str, str] = {}
+        for tool_id in self._tool_ids:
+            self._resolved[tool_id] = tool_id
+            parsed = parse_tool_shed_id(tool_id)
+            if parsed is None or parsed.version is not None:
+                continue
+            self._repository_keys.append((parsed.owner, parsed.repository, parsed.tool_shed, tool_id))
+            for version in tool_versions[tool_id]:
+                self._resolved[f"{tool_id}/{version}"] = tool_id
+        self._repository_keys.sort()
+
+    @staticmethod
+    def from_tools_dict(tools: Mapping[str, Mapping]) -> 'ToolIdIndex':
+        return ToolIdIndex({tool_id: (tool_metadata.get("versions") or {}).keys() for tool_id, tool_metadata in tools.items()})
+
+    def __len__(self) -> int:
+        return len(self._tool_ids)
+
+    def __contains__(self, tool_id: str) -> bool:
+        return tool_id in self._resolved
+
+    def resolve(self, tool_id: str) -> Optional[str]:
+        """The indexed tool id for a tool id or (versioned) tool shed id, ``None`` if unknown."""
+        resolved = self._resolved.get(tool_id)
+        if resolved is None:
+            # a version not recorded in the database
+            resolved = self._resolved.get(versionless_tool_id(tool_id))
+        return resolved
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        low, high = _prefix_range(self._tool_ids, prefix, prefix + _MAX_CHARACTER)
+        return self._tool_ids[low:high]
+
+    def in_range(self, start: str, end: Optional[str] = None) -> List[str]:
+        """Tool ids from ``start`` (inclusive) to ``end`` (exclusive), in order."""
+        low = bisect.bisect_left(self._tool_ids, start)
+        high = len(self._tool_ids) if end is None else bisect.bisect_left(self._tool_ids, end, low)
+        return self._tool_ids[low:high]
+
+    def select(
+        self,
+        tool_shed: Optional[str] = None,
+        owner: Optional[str] = None,
+        repository: Optional[str] = None,
+        prefix: Optional[str] = None,
+    ) -> List[str]:
+        """Sorted tool ids matching every given criterion."""
+        if owner is not None:
+            key: Tuple[str, ...] = (owner, repository) if repository is not None else (owner,)
+            low, high = _prefix_range(self._repository_keys, key, key + (_MAX_CHARACTER,))
+            candidates = self._repository_keys[low:high]
+        elif repository is not None:
+            candidates = [key for key in self._repository_keys if key[1] == repository]
+        else:
+            # bisect on the longer of the two prefixes, check the other
+            shed_prefix = f"{tool_shed}{TOOL_SHED_REPOS}" if tool_shed is not None else ""
+            longer, shorter = sorted((shed_prefix, prefix or ""), key=len, reverse=True)
+            return [tool_id for tool_id in self.with_prefix(longer) if tool_id.startswith(shorter)]
+        return sorted(
+            tool_id for _, _, key_tool_shed, tool_id in candidates
+            if (tool_shed is None or key_tool_shed == tool_shed) and (not prefix or tool_id.startswith(prefix))
+        )
@@ -0,0 +1,361 @@
+"""Fast validation of raw database dictionaries.
+
+``models.load_from_dict`` builds a complete pydantic ``ToolDatabase`` object
+graph just to check the database. The validator here is compiled once from
+the same pydantic models and walks the raw dictionary in place instead. It
+follows pydantic's (v1) coercion rules - e.g. numbers are accepted for ``str``
+fields and extra keys are rejected - and raises the same
+``pydantic.ValidationError`` (same locations, messages and error types).
+
+The pydantic path stays available as a strict mode (``set_strict_validation``
+or ``--strict-validation``).
+
+Either way large databases can be validated in parallel: the ``tools`` mapping
+is split into chunks checked in a process pool and the errors are merged back
+into one ``ValidationError`` in the order a sequential run reports them.
+"""
+import math
+import multiprocessing
+import threading
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel, Extra, ValidationError
+from pydantic import errors as pydantic_errors
+from pydantic.error_wrappers import ErrorWrapper
+from typing_extensions import Literal
+
+from . import instrumentation
+from .models import load_from_dict, ToolDatabase
+
+# Locations are built lazily as (parent, key) pairs and only flattened for errors.
+Location = Optional[Tuple[Any, Any]]
+Errors = List[Tuple[Exception, Location]]
+Checker = Callable[[Any, Location, Errors], None]
+
+ROOT_KEY = "__root__"
+KEY_LOCATION = "__key__"
+
+# databases with fewer tools aren't worth splitting across processes by default
+PARALLEL_VALIDATION_MIN_TOOLS = 5000
+# chunks per job, so uneven chunks don't leave workers idle
+CHUNKS_PER_JOB = 4
+
+_strict_validation = False
+_validation_jobs = 1
+_validators: Dict[Type[BaseModel], Checker] = {}
+# tools being validated, inherited by forked workers instead of pickling each chunk
+_shared_tools: Optional[List[Tuple[Any, Any]]] = None
+_shared_tools_lock = threading.Lock()
+
+
+def set_strict_validation(strict: bool) -> None:
+    """Validate databases by building the pydantic models (slow) instead of the compiled validator."""
+    global _strict_validation
+    _strict_validation = strict
+
+
+def set_validation_jobs(jobs: int) -> None:
+    """Validate databases of at least ``PARALLEL_VALIDATION_MIN_TOOLS`` tools using ``jobs`` processes."""
+    global _validation_jobs
+    _validation_jobs = jobs
+
+
+def validate_database_dict(as_dict: Dict[str, Any], strict: Optional[bool] = None, jobs: Optional[int] = None) -> None:
+    """Raise ``pydantic.ValidationError`` if ``as_dict`` doesn't describe a valid ``ToolDatabase``.
+
+    ``jobs`` > 1 validates ``tools`` in that many processes, by default large
+    databases are validated with the jobs set by ``set_validation_jobs``.
+    """
+    strict = _strict_validation if strict is None else strict
+    tools = as_dict.get("tools") if isinstance(as_dict, dict) else None
+    if jobs is None:
+        jobs = _validation_jobs if isinstance(tools, dict) and len(tools) >= PARALLEL_VALIDATION_MIN_TOOLS else 1
+    if jobs > 1 and isinstance(tools, dict) and len(tools) > 1:
+        with instrumentation.phase("validate"):
+            _validate_parallel(as_dict, tools, jobs, strict)
+        return
+    if strict:
+        load_from_dict(as_dict)
+        return
+    with instrumentation.phase("validate"):
+        errors: Errors = []
+        compiled_validator(ToolDatabase)(as_dict, None, errors)
+        if errors:
+            raise ValidationError([ErrorWrapper(exc, _flatten(loc)) for exc, loc in errors], ToolDatabase)
+
+
+def describe_validation_errors(error: ValidationError) -> List[str]:
+    """One ``<tool id>: <field path>: <message>`` line per error (``-`` for errors outside ``tools``)."""
+    lines = []
+    for details in error.errors():
+        loc = details["loc"]
+        if len(loc) > 1 and loc[0] == "tools":
+            tool_id, path = str(loc[1]), loc[2:]
+        else:
+            tool_id, path = "-", loc
+        field_path = " -> ".join(str(part) for part in path) or "-"
+        lines.append(f"{tool_id}: {field_path}: {details['msg']} ({details['type']})")
+    return lines
+
+
+def _validate_parallel(as_dict: Dict[str, Any], tools: Dict[str, Any], jobs: int, strict: bool) -> None:
+    global _shared_tools
+    # validate everything but the tools here, the tools in chunks
+    rest = dict(as_dict)
+    rest["tools"] = None
+    rest_errors = _raw_errors(rest, strict)
+    version = as_dict.get("version")
+    items = list(tools.items())
+    chunk_size = math.ceil(len(items) / (jobs * CHUNKS_PER_JOB))
+    bounds = [(start, min(start + chunk_size, len(items))) for start in range(0, len(items), chunk_size)]
+    tool_errors: List[ErrorWrapper] = []
+    if "fork" in multiprocessing.get_all_start_methods():
+        # one validation at a time can share its tools (e.g. concurrent daemon commands)
+        with _shared_tools_lock:
+            _shared_tools = items
+            try:
+                with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+                    futures = [executor.submit(_validate_shared_chunk, start, end, version, strict) for start, end in bounds]
+                    for future in futures:
+                        tool_errors.extend(future.result())
+            finally:
+                _shared_tools = None
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_validate_chunk, dict(items[start:end]), version, strict) for start, end in bounds]
+            for future in futures:
+                tool_errors.extend(future.result())
+    if not rest_errors and not tool_errors:
+        return
+    # a sequential run reports version errors, then tools, then the remaining fields
+    split = sum(1 for error in rest_errors if error.loc_tuple()[0] == "version")
+    raise ValidationError(rest_errors[:split] + tool_errors + rest_errors[split:], ToolDatabase)
+
+
+def _validate_shared_chunk(start: int, end: int, version: Any, strict: bool) -> List[ErrorWrapper]:
+    assert _shared_tools is not None
+    return _validate_chunk(dict(_shared_tools[start:end]), version, strict)
+
+
+def _validate_chunk(tools: Dict[str, Any], version: Any, strict: bool) -> List[ErrorWrapper]:
+    errors = _raw_errors({"version": version, "tools": tools}, strict)
+    return [error for error in errors if error.loc_tuple()[0] == "tools"]
+
+
+def _raw_errors(as_dict: Dict[str, Any], strict: bool) -> List[ErrorWrapper]:
+    if strict:
+        try:
+            load_from_dict(as_dict)
+        except ValidationError as e:
+            return list(_wrappers(e.raw_errors))
+        return []
+    errors: Errors = []
+    compiled_validator(ToolDatabase)(as_dict, None, errors)
+    return [ErrorWrapper(exc, _flatten(loc)) for exc, loc in errors]
+
+
+def compiled_validator(model: Type[BaseModel]) -> Checker:
+    """Return (compiling on first use) the checker for ``model``."""
+    checker = _validators.get(model)
+    if checker is None:
+        checker = _compile_model(model)
+    return checker
+
+
+def _wrappers(raw_errors: Any) -> Iterator[ErrorWrapper]:
+    # pydantic nests lists of errors (one list per field validator)
+    for error in raw_errors:
+        if isinstance(error, ErrorWrapper):
+            yield error
+        else:
+            yield from _wrappers(error)
+
+
+def _flatten(loc: Location) -> Tuple[Any, ...]:
+    parts = []
+    while loc is not None:
+        loc, key = loc
+        parts.append(key)
+    return tuple(reversed(parts))
+
+
+def _compile_model(model: Type[BaseModel]) -> Checker:
+    fields = model.__fields__
+    if ROOT_KEY in fields:
+        root_checker: List[Checker] = []
+
+        def check_root(value, loc, errors):
+            root_checker[0](value, (loc, ROOT_KEY), errors)
+
+        _validators[model] = check_root
+        root_field = fields[ROOT_KEY]
+        root_checker.append(_compile_type(root_field.outer_type_))
+        return check_root
+
+    compiled_fields: List[Tuple[str, bool, bool, Checker]] = []
+    field_names: Set[str] = set()
+    forbid_extra = model.__config__.extra == Extra.forbid
+
+    def check_model(value, loc, errors):
+        if not isinstance(value, dict):
+            try:
+                value = dict(value)
+            except (TypeError, ValueError):
+                errors.append((pydantic_errors.DictError(), loc))
+                return
+        for name, required, allow_none, check in compiled_fields:
+            if name not in value:
+                if required:
+                    errors.append((pydantic_errors.MissingError(), (loc, name)))
+                continue
+            field_value = value[name]
+            if field_value is None:
+                if not allow_none:
+                    errors.append((pydantic_errors.NoneIsNotAllowedError(), (loc, name)))
+                continue
+            check(field_value, (loc, name), errors)
+        if forbid_extra and not value.keys() <= field_names:
+            for key in value:
+                if key not in field_names:
+                    errors.append((pydantic_errors.ExtraError(), (loc, key)))
+
+    # register before compiling fields so self referencing models terminate
+    _validators[model] = check_model
+    for field in fields.values():
+        field_names.add(field.alias)
+        compiled_fields.append((field.alias, field.required is True, field.allow_none, _compile_type(field.outer_type_)))
+    return check_model
+
+
+def _compile_type(type_: Any) -> Checker:
+    """Compile a checker for non-None values of ``type_``."""
+    origin = typing.get_origin(type_)
+    args = typing.get_args(type_)
+    if type_ is str:
+        return _check_str
+    if type_ is int:
+        return _check_int
+    if type_ is Any:
+        return _check_any
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        return compiled_validator(type_)
+    if origin is Literal:
+        return _literal_checker(args)
+    if origin is typing.Union:
+        return _union_checker(args)
+    if origin in (list, List):
+        return _list_checker(_compile_item(args[0]))
+    if origin in (dict, Dict):
+        return _dict_checker(args[0], _compile_item(args[0]), _compile_item(args[1]))
+    raise Exception(f"Cannot compile validator for type {type_}")
+
+
+def _compile_item(type_: Any) -> Checker:
+    """Checker for a container item, None is only allowed for ``Optional`` item types."""
+    args = typing.get_args(type_)
+    if typing.get_origin(type_) is typing.Union and type(None) in args:
+        non_none = [a for a in args if a is not type(None)]
+        inner = _compile_type(non_none[0] if len(non_none) == 1 else typing.Union[tuple(non_none)])
+
+        def check_optional(value, loc, errors):
+            if value is not None:
+                inner(value, loc, errors)
+
+        return check_optional
+    inner = _compile_type(type_)
+
+    def check_item(value, loc, errors):
+        if value is None:
+            errors.append((pydantic_errors.NoneIsNotAllowedError(), loc))
+        else:
+            inner(value, loc, errors)
+
+    return check_item
+
+
+def _check_str(value, loc, errors):
+    # mirrors pydantic's str_validator (numbers are coerced to strings)
+    if type(value) is str or isinstance(value, (str, float, int, Decimal, bytes, bytearray)):  # exact type check first, it's the common case
+        return
+    errors.append((pydantic_errors.StrError(), loc))
+
+
+def _check_int(value, loc, errors):
+    if type(value) is int:
+        return
+    try:
+        int(value)
+    except (TypeError, ValueError, OverflowError):
+        errors.append((pydantic_errors.IntegerError(), loc))
+
+
+def _check_any(value, loc, errors):
+    pass
+
+
+def _literal_checker(permitted: Tuple[Any, ...]) -> Checker:
+    allowed = set(permitted)
+
+    def check_literal(value, loc, errors):
+        try:
+            if value in allowed:
+                return
+        except TypeError:  # unhashable
+            pass
+        errors.append((pydantic_errors.WrongConstantError(given=value, permitted=permitted), loc))
+
+    return check_literal
+
+
+def _union_checker(types: Tuple[Any, ...]) -> Checker:
+    members = [_compile_type(t) for t in types if t is not type(None)]
+
+    def check_union(value, loc, errors):
+        member_errors: Errors = []
+        for member in members:
+            attempt: Errors = []
+            member(value, loc, attempt)
+            if not attempt:
+                return
+            member_errors.extend(attempt)
+        errors.extend(member_errors)
+
+    return check_union
+
+
+def _list_checker(item_checker: Checker) -> Checker:
+
+    def check_list(value, loc, errors):
+        if not isinstance(value, (list, tuple, set, frozenset)):
+            errors.append((pydantic_errors.ListError(), loc))
+            return
+        for index, item in enumerate(value):
+            item_checker(item, (loc, index), errors)
+
+    return check_list
+
+
+def _dict_checker(key_type: Any, key_checker: Checker, value_checker: Checker) -> Checker:
+    # keys already of a plain str/int key type need no checking
+    valid_key_type = key_type if key_type in (str, int) else None
+
+    def check_dict(value, loc, errors):
+        if not isinstance(value, dict):
+            try:
+                value = dict(value)
+            except (TypeError, ValueError):
+                errors.append((pydantic_errors.DictError(), loc))
+                return
+        for key, item in value.items():
+            if type(key) is not valid_key_type:
+                key_errors: Errors = []
+                key_checker(key, (loc, KEY_LOCATION), key_errors)
+                if key_errors:
+                    errors.extend(key_errors)
+                    continue
+            value_checker(item, (loc, key), errors)
+
+    return check_dict
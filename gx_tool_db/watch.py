@@ -0,0 +1,249 @@
+"""Keep watching training material and test result directories after importing them.
+
+``import-trainings --watch`` and ``import-tests --watch`` import the directory
+as usual and then keep running. Only workflow and result files added or
+changed afterwards are parsed again (with ``workflows.parse_tools`` or as
+``results.TestResults``), and database writes are debounced like the
+daemon's (see ``daemon.DebouncedWriter``) so a ``git pull`` touching many
+files ends up as a single write.
+
+Changes are detected with inotify on Linux (through libc, no extra
+dependency) and otherwise, or with ``--poll``, by comparing the size and
+modification time of the files every ``--poll-interval`` seconds. Like a
+full import, watching only adds records - removed files are ignored.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple, TYPE_CHECKING, Union
+
+from . import instrumentation
+from .io import repository_walk, warn
+
+if TYPE_CHECKING:
+    from .db import ToolsMetadata
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_WATCH_DEBOUNCE = 5.0
+
+# from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len - followed by len bytes of name
+
+Accept = Callable[[str], bool]
+
+
+class WatchOptions(NamedTuple):
+    poll: bool = False
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+    debounce: float = DEFAULT_WATCH_DEBOUNCE
+    # set to stop watching, the CLI watches until interrupted
+    stop: Optional[threading.Event] = None
+
+
+class PollingWatcher:
+    """Detect added and changed files by comparing their size and modification time."""
+
+    def __init__(self, directory: str, accept: Accept):
+        self._directory = directory
+        self._accept = accept
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for dirpath, _, filenames in repository_walk(self._directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if not self._accept(path):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # removed while walking
+                    continue
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def changed(self, timeout: float) -> List[str]:
+        """Files added or changed since the last call, checked once after ``timeout`` seconds."""
+        time.sleep(timeout)
+        snapshot = self._scan()
+        changed = sorted(path for path, stat in snapshot.items() if self._snapshot.get(path) != stat)
+        self._snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def _libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """Detect files written or moved into ``directory`` (recursively) with inotify."""
+
+    def __init__(self, directory: str, accept: Accept):
+        libc = _libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._libc = libc
+        self._directory = directory
+        self._accept = accept
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            _raise_errno(directory)
+        self._directories: Dict[int, str] = {}
+        try:
+            self._watch_tree(directory)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _watch_tree(self, directory: str) -> List[str]:
+        # watch directory and its subdirectories, returning the files already in them
+        files: List[str] = []
+        for dirpath, _, filenames in repository_walk(directory):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                if ctypes.get_errno() == errno.ENOENT:  # removed meanwhile
+                    continue
+                _raise_errno(dirpath)
+            self._directories[wd] = dirpath
+            files.extend(path for path in (os.path.join(dirpath, f) for f in filenames) if self._accept(path))
+        return files
+
+    def changed(self, timeout: float) -> List[str]:
+        """Files written or moved in since the last call, waiting up to ``timeout`` seconds for some."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        changed: Set[str] = set()
+        for wd, mask, name in self._read_events():
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, fall back to everything there is
+                warn(f"inotify event queue overflowed, re-reading all files in {self._directory}")
+                self._directories.clear()
+                changed.update(self._watch_tree(self._directory))
+                continue
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            directory = self._directories.get(wd)
+            if directory is None or not name or name.startswith("."):
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                    # files may have been written before the watch was added
+                    changed.update(self._watch_tree(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and self._accept(path):
+                changed.add(path)
+        return sorted(changed)
+
+    def _read_events(self):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                yield wd, mask, name
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _raise_errno(path: str):
+    error = ctypes.get_errno()
+    raise OSError(error, os.strerror(error), path)
+
+
+Watcher = Union[PollingWatcher, InotifyWatcher]
+
+
+def watcher_for(directory: str, accept: Accept, poll: bool = False) -> Watcher:
+    """Watch ``directory`` with inotify where available, else (or if ``poll``) by polling."""
+    if not os.path.isdir(directory):
+        raise Exception(f"Can only watch a local directory, not {directory}")
+    if not poll and _libc() is not None:
+        try:
+            return InotifyWatcher(directory, accept)
+        except OSError as e:
+            # e.g. ENOSPC when fs.inotify.max_user_watches is exhausted
+            warn(f"Cannot watch {directory} with inotify ({e}), polling instead")
+    return PollingWatcher(directory, accept)
+
+
+def watch(
+    tools_metadata: 'ToolsMetadata',
+    watcher: Watcher,
+    process: Callable[['ToolsMetadata', str], None],
+    options: WatchOptions,
+) -> int:
+    """Call ``process`` for each changed file until stopped or interrupted, return the number of files processed.
+
+    Failures (e.g. a file caught half written) are reported and don't stop watching,
+    the file is processed again when it next changes. The database is written
+    ``options.debounce`` seconds after the last change and before returning. If
+    another process wrote it meanwhile, it is reloaded and the files processed
+    since the last write are processed again rather than overwriting those changes.
+    """
+    from .daemon import DebouncedWriter, ReadWriteLock  # http.server is only needed here, not by the CLI
+
+    lock = ReadWriteLock()
+    writer = DebouncedWriter(tools_metadata, lock, options.debounce)
+    processed = 0
+    try:
+        while options.stop is None or not options.stop.is_set():
+            paths = watcher.changed(timeout=options.poll_interval)
+            if not paths:
+                continue
+            with lock.write():
+                for path in paths:
+                    try:
+                        process(tools_metadata, path)
+                    except Exception as e:
+                        warn(f"Failed to import {path}: {e}")
+                        continue
+                    writer.touch(_reprocess(process, path))
+                    processed += 1
+                    instrumentation.count("watched_files_processed")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+    return processed
+
+
+def _reprocess(process: Callable[['ToolsMetadata', str], None], path: str) -> Callable[['ToolsMetadata'], None]:
+    def change(tools_metadata: 'ToolsMetadata'):
+        process(tools_metadata, path)
+
+    return change
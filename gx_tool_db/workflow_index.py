@@ -0,0 +1,185 @@
+"""Persisted index of the tools used by a corpus of workflows.
+
+Each indexed workflow file is recorded with the SHA-256 of its content and the
+``(tool_id, tool_version)`` pairs ``workflows.parse_tools`` found in it,
+along with a reverse map from (versionless) tool id to the workflows using it.
+Updating re-parses only files whose content changed (files with unchanged size
+and modification time aren't even hashed), so questions like "which workflows
+break if a tool is missing on a server" are answered without parsing, or
+importing gxformat2.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from . import instrumentation
+from .db import _versionless_tool_id, ToolsMetadata
+from .io import warn
+
+WORKFLOW_INDEX_SUFFIX = ".workflows.json"
+WORKFLOW_INDEX_FORMAT = 1
+
+
+def workflow_index_path(metadata_file: str) -> str:
+    return f"{metadata_file}{WORKFLOW_INDEX_SUFFIX}"
+
+
+class WorkflowRecord(NamedTuple):
+    sha256: str
+    size: int
+    mtime_ns: int
+    # sorted (raw tool id, tool version) pairs
+    tools: List[Tuple[str, Optional[str]]]
+    # the file could not be parsed as a workflow (it isn't re-parsed until it changes)
+    parse_error: bool = False
+
+    @property
+    def tool_ids(self) -> Set[str]:
+        return {_versionless_tool_id(tool_id) for tool_id, _ in self.tools}
+
+
+class WorkflowIndexUpdate(NamedTuple):
+    added: int
+    changed: int
+    removed: int
+    unchanged: int
+
+    def __str__(self):
+        return f"{self.added} added, {self.changed} changed, {self.removed} removed, {self.unchanged} unchanged"
+
+
+class WorkflowIndex:
+    """Workflow path -> ``WorkflowRecord`` and tool id -> workflow paths."""
+
+    def __init__(self):
+        self.workflows: Dict[str, WorkflowRecord] = {}
+        self._tool_workflows: Optional[Dict[str, Set[str]]] = None
+
+    @staticmethod
+    def load(path: str) -> 'WorkflowIndex':
+        """Load a persisted index (an empty index if ``path`` doesn't exist)."""
+        index = WorkflowIndex()
+        if not os.path.exists(path):
+            return index
+        with instrumentation.phase("workflow_index_load"), open(path) as f:
+            as_dict = json.load(f)
+        if as_dict.get("format") != WORKFLOW_INDEX_FORMAT:
+            raise Exception(f"Unknown workflow index format {as_dict.get('format')} in {path}")
+        for workflow_path, record in as_dict["workflows"].items():
+            tools = [(tool_id, tool_version) for tool_id, tool_version in record["tools"]]
+            index.workflows[workflow_path] = WorkflowRecord(
+                record["sha256"], record["size"], record["mtime_ns"], tools, record.get("parse_error", False)
+            )
+        return index
+
+    def save(self, path: str) -> None:
+        workflows = {workflow_path: record._asdict() for workflow_path, record in sorted(self.workflows.items())}
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=WORKFLOW_INDEX_SUFFIX)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"format": WORKFLOW_INDEX_FORMAT, "workflows": workflows}, f, indent=1)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        os.replace(temp_path, path)
+
+    def update(self, paths: Iterable[str]) -> WorkflowIndexUpdate:
+        """Index the workflows at ``paths`` (files or directories), re-parsing only changed files.
+
+        Indexed files at (or under) ``paths`` that no longer exist are dropped.
+        """
+        from .workflows import potential_workflow_files  # gxformat2 is slow to import, only load it when needed
+
+        by_hash = {record.sha256: record for record in self.workflows.values()}
+        added = changed = removed = unchanged = 0
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                workflow_files = {os.path.abspath(f) for f in potential_workflow_files(path)}
+            elif os.path.exists(path):
+                workflow_files = {path}
+            else:
+                workflow_files = set()
+            for indexed_path in self.workflows_under([path]):
+                if indexed_path not in workflow_files:
+                    del self.workflows[indexed_path]
+                    removed += 1
+            for workflow_file in sorted(workflow_files):
+                previous = self.workflows.get(workflow_file)
+                record = self._record_for(workflow_file, previous, by_hash)
+                if previous is None:
+                    added += 1
+                elif previous.sha256 != record.sha256:
+                    changed += 1
+                else:
+                    unchanged += 1
+                self.workflows[workflow_file] = record
+                by_hash[record.sha256] = record
+        self._tool_workflows = None
+        return WorkflowIndexUpdate(added, changed, removed, unchanged)
+
+    def _record_for(self, path: str, previous: Optional[WorkflowRecord], by_hash: Dict[str, WorkflowRecord]) -> WorkflowRecord:
+        from .workflows import parse_tools
+
+        stat = os.stat(path)
+        if previous is not None and (previous.size, previous.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            return previous
+        with open(path, "rb") as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+        known = by_hash.get(sha256)
+        if known is not None:
+            # same content as an indexed file (e.g. only touched, or copied), no need to parse it
+            return known._replace(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        try:
+            tools = parse_tools(path)
+        except Exception:
+            warn(f"Recording {path} as unparsable in the workflow index")
+            return WorkflowRecord(sha256, stat.st_size, stat.st_mtime_ns, [], True)
+        return WorkflowRecord(sha256, stat.st_size, stat.st_mtime_ns, sorted(tools, key=lambda t: (t[0], t[1] or "")))
+
+    @property
+    def tool_workflows(self) -> Dict[str, Set[str]]:
+        """Versionless tool id -> paths of the workflows using it."""
+        if self._tool_workflows is None:
+            tool_workflows: Dict[str, Set[str]] = {}
+            for workflow_path, record in self.workflows.items():
+                for tool_id in record.tool_ids:
+                    tool_workflows.setdefault(tool_id, set()).add(workflow_path)
+            self._tool_workflows = tool_workflows
+        return self._tool_workflows
+
+    def _indexed_tool_id(self, tool_id: str) -> str:
+        # accept versionless ids as well as the versioned tool shed ids used in workflows
+        return _versionless_tool_id(tool_id)
+
+    def workflows_using(self, tool_id: str) -> List[str]:
+        return sorted(self.tool_workflows.get(self._indexed_tool_id(tool_id), set()))
+
+    def workflows_under(self, paths: Iterable[str]) -> List[str]:
+        """Indexed workflows that are, or are in directories, at ``paths``."""
+        paths = [os.path.abspath(path) for path in paths]
+        return sorted(
+            workflow_path for workflow_path in self.workflows
+            if any(workflow_path == path or workflow_path.startswith(path + os.sep) for path in paths)
+        )
+
+    def missing_tools(
+        self, tools_metadata: ToolsMetadata, server_label: str, removed_tool_ids: Iterable[str] = ()
+    ) -> Dict[str, List[str]]:
+        """Workflow path -> tools it uses that are (or, for ``removed_tool_ids``, would be) missing on a server.
+
+        Only workflows with missing tools are listed.
+        """
+        tools_dict = tools_metadata._tools_dict()
+        missing_tool_ids = {self._indexed_tool_id(tool_id) for tool_id in removed_tool_ids}
+        for tool_id in self.tool_workflows:
+            tool_servers = (tools_dict.get(tool_id) or {}).get("servers") or {}
+            if server_label not in tool_servers:
+                missing_tool_ids.add(tool_id)
+        broken: Dict[str, Set[str]] = {}
+        for tool_id in missing_tool_ids:
+            for workflow_path in self.tool_workflows.get(tool_id, set()):
+                broken.setdefault(workflow_path, set()).add(tool_id)
+        return {workflow_path: sorted(broken[workflow_path]) for workflow_path in sorted(broken)}
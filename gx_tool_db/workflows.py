@@ -3,6 +3,7 @@ from typing import NamedTuple, Set
 
 from gxformat2.normalize import steps_normalized
 
+from . import instrumentation
 from .io import repository_walk, warn
 
 
@@ -22,7 +23,7 @@ def parse_tool_ids(path: str) -> Set[str]:
 def parse_tools(path: str) -> Set[ToolVersionTuple]:
     all_tools: Set[ToolVersionTuple] = set()
     if os.path.isdir(path):
-        for potential_workflow_file in _walk_potential_workflow_files(path):
+        for potential_workflow_file in potential_workflow_files(path):
             try:
                 tool_ids = _parse_tools_from_file(potential_workflow_file)
                 all_tools.update(tool_ids)
@@ -35,7 +36,9 @@ def parse_tools(path: str) -> Set[ToolVersionTuple]:
 
 def _parse_tools_from_file(path: str) -> Set[ToolVersionTuple]:
     try:
-        steps = steps_normalized(workflow_path=path)
+        with instrumentation.phase("workflow_parse"):
+            steps = steps_normalized(workflow_path=path)
+        instrumentation.count("files_parsed")
     except Exception:
         warn(f"Problem parsing workflow file {path}")
         raise
@@ -59,13 +62,21 @@ def _parse_tools_from_file(path: str) -> Set[ToolVersionTuple]:
     return tools
 
 
-def _walk_potential_workflow_files(path: str):
-    for (dirpath, _, filenames) in repository_walk(path, extensions=[".yml", ".yaml", ".ga"]):
+WORKFLOW_EXTENSIONS = [".yml", ".yaml", ".ga"]
+
+
+def potential_workflow_files(path: str):
+    for (dirpath, _, filenames) in repository_walk(path, extensions=WORKFLOW_EXTENSIONS):
         for filename in filenames:
-            # ignore some common training material / ephemeris files that aren't workflows...
-            if filename in ["data-library.yaml", "data-manager.yaml", "tools.yaml"]:
-                continue
-            if "test." in filename or "tests." in filename:
-                # probably a Galaxy test.
-                continue
-            yield os.path.join(dirpath, filename)
+            if is_potential_workflow_file(filename):
+                yield os.path.join(dirpath, filename)
+
+
+def is_potential_workflow_file(filename: str) -> bool:
+    if not filename.endswith(tuple(WORKFLOW_EXTENSIONS)):
+        return False
+    # ignore some common training material / ephemeris files that aren't workflows...
+    if filename in ["data-library.yaml", "data-manager.yaml", "tools.yaml"]:
+        return False
+    # probably a Galaxy test.
+    return "test." not in filename and "tests." not in filename
@@ -56,6 +56,16 @@ else:
     requirements = []
 
 
+extras_require = {
+    # typed columnar export formats (.parquet, .arrow) for export-tabular
+    'arrow': ['pyarrow'],
+    # coverage matrix engine used by export-coverage-summary
+    'coverage': ['numpy'],
+    # zstd compressed databases (.zst)
+    'zstd': ['zstandard'],
+}
+
+
 test_requirements = [
     # TODO: put package test requirements here
 ]
@@ -75,6 +85,7 @@ setup(
     package_dir=PACKAGE_DIR,
     include_package_data=True,
     install_requires=requirements,
+    extras_require=extras_require,
     license="MIT",
     zip_safe=False,
     keywords='galaxy',
@@ -0,0 +1,72 @@
+"""Build small databases offline (without importing from a live Galaxy server)."""
+from gx_tool_db.config import Server, TestDataMergeStrategy, USEGALAXY_EU_URL, USEGALAXY_ORG_URL
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.models import TestResults
+
+MAIN = Server(USEGALAXY_ORG_URL)
+EU = Server(USEGALAXY_EU_URL)
+
+SAMTOOLS_VIEW = "toolshed.g2.bx.psu.edu/repos/iuc/samtools_view/samtools_view"
+BAM_COVERAGE = "toolshed.g2.bx.psu.edu/repos/bgruening/deeptools_bam_coverage/deeptools_bam_coverage"
+CAT1 = "cat1"
+
+# tool id -> (repository owner, {server: (versions, section id, section name)})
+EXAMPLE_TOOLS = {
+    CAT1: (None, {
+        MAIN: (["1.0.0"], "textutil", "Text Manipulation"),
+        EU: (["1.0.0"], "text_manipulation", "Text Manipulation"),
+    }),
+    SAMTOOLS_VIEW: ("iuc", {
+        MAIN: (["1.9+galaxy1", "1.9+galaxy2"], "samtools", "SAM/BAM"),
+        EU: (["1.9+galaxy1"], "sam_bam", "SAM/BAM"),
+    }),
+    BAM_COVERAGE: ("bgruening", {
+        MAIN: (["3.3.2.0.0"], "deeptools", "deepTools"),
+    }),
+}
+
+EXAMPLE_SKELETONS = {
+    MAIN: [
+        {"model_class": "ToolSectionLabel", "id": "general_text_label", "text": "GENERAL TEXT TOOLS"},
+        {"model_class": "ToolSection", "id": "textutil", "name": "Text Manipulation"},
+        {"model_class": "ToolSection", "id": "samtools", "name": "SAM/BAM"},
+        {"model_class": "ToolSection", "id": "deeptools", "name": "deepTools"},
+    ],
+    EU: [
+        {"model_class": "ToolSection", "id": "text_manipulation", "name": "Text Manipulation"},
+        {"model_class": "ToolSection", "id": "sam_bam", "name": "SAM/BAM"},
+    ],
+}
+
+
+def write_example_database(path: str) -> ToolsMetadata:
+    tools_metadata = ToolsMetadata(path)
+    for tool_id, (owner, servers) in EXAMPLE_TOOLS.items():
+        for server, (versions, section_id, section_name) in servers.items():
+            tool_entry = tools_metadata.get_entry_for(tool_id, server)
+            if owner:
+                repo_name = tool_id.split("/")[3]
+                tool_entry.record_ts_repo({"name": repo_name, "owner": owner, "tool_shed": "toolshed.g2.bx.psu.edu"})
+            tool_entry.record_section(section_id, section_name)
+            for version in versions:
+                tool_version_entry = tool_entry.get_version_entry(version)
+                tool_version_entry.record_labels([])
+                tool_version_entry.record_metadata(
+                    name=tool_id.rsplit("/", 1)[-1],
+                    description="an example tool",
+                    edam_topics=["topic_0102"] if owner else None,
+                    model_class="Tool",
+                )
+    for server, skeleton in EXAMPLE_SKELETONS.items():
+        tools_metadata.record_panel_skeleton(skeleton, server)
+
+    tools_metadata.get_entry_for(SAMTOOLS_VIEW).record_external_label("awesome")
+    tools_metadata.get_entry_for(CAT1).record_external_label("meh")
+    test_results = TestResults.parse_obj({
+        0: {"status": "success", "job_create_time": "2021-06-29T04:29:32.110891"},
+        1: {"status": "failed", "job_create_time": "2021-06-29T04:29:32.117016"},
+    })
+    version_entry = tools_metadata.get_entry_for(SAMTOOLS_VIEW).get_version_entry("1.9+galaxy1")
+    version_entry.record_test_results("anvil", test_results, TestDataMergeStrategy.latest_executed)
+    tools_metadata.write()
+    return tools_metadata
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from gx_tool_db import workflows
+from gx_tool_db.checkpoint import checkpoint_path
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from ._data import DATA_DIRECTORY
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+TRAINING_DIRECTORY = os.path.join(DATA_DIRECTORY, "mock_training")
+
+
+def _write_results(path, tool_id, tool_version):
+    tests = [{
+        "id": f"{tool_id}-0",
+        "has_data": True,
+        "data": {"tool_id": tool_id, "tool_version": tool_version, "test_index": 0, "status": "success"},
+    }]
+    with open(path, "w") as f:
+        json.dump({"version": "0.1", "tests": tests}, f)
+
+
+def _tested_tools(database):
+    tools = ToolsMetadata(database)._tools_dict()
+    return sorted(
+        tool_id for tool_id, tool in tools.items()
+        if any("ci" in (version.get("test_results") or {}) for version in tool["versions"].values())
+    )
+
+
+def test_resume_test_results_import(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    results = tmp_path / "results"
+    results.mkdir()
+    _write_results(results / "a.json", CAT1, "1.0.0")
+    _write_results(results / "b.json", SAMTOOLS_VIEW, "1.9+galaxy2")
+    (results / "c.json").write_text("{not json")
+    _write_results(results / "d.json", BAM_COVERAGE, "3.3.2.0.0")
+
+    import_tests = ["--tools_metadata", database, "import-tests", str(results), "ci", "--checkpoint-every", "1"]
+    with pytest.raises(ValueError):
+        main(import_tests)
+    # the results imported before the failure were checkpointed
+    assert _tested_tools(database) == sorted([CAT1, SAMTOOLS_VIEW])
+    with open(checkpoint_path(database)) as f:
+        assert json.load(f)["completed"] == [str(results / "a.json"), str(results / "b.json")]
+
+    # completed files aren't read again
+    (results / "a.json").write_text("{not json")
+    _write_results(results / "c.json", SAMTOOLS_VIEW, "1.9+galaxy1")
+    main(import_tests + ["--resume"])
+    assert _tested_tools(database) == sorted([CAT1, SAMTOOLS_VIEW, BAM_COVERAGE])
+    assert not os.path.exists(checkpoint_path(database))
+
+
+def test_resume_requires_same_import(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    with open(checkpoint_path(database), "w") as f:
+        json.dump({"format": 1, "operation": "import-tests other ci", "completed": []}, f)
+    with pytest.raises(Exception, match="interrupted"):
+        main(["--tools_metadata", database, "import-trainings", TRAINING_DIRECTORY, "--resume"])
+
+
+def test_resume_training_import(tmp_path, monkeypatch, capsys):
+    expected_database = str(tmp_path / "expected.yml")
+    main(["--tools_metadata", expected_database, "import-trainings", TRAINING_DIRECTORY])
+    expected = ToolsMetadata(expected_database).training_index().tutorial_tools
+
+    parse_tools = workflows.parse_tools
+    calls = []
+
+    def failing_parse_tools(path):
+        calls.append(path)
+        if len(calls) == 4:
+            raise Exception("interrupted")
+        return parse_tools(path)
+
+    database = str(tmp_path / "tools_metadata.yml")
+    monkeypatch.setattr(workflows, "parse_tools", failing_parse_tools)
+    with pytest.raises(Exception, match="interrupted"):
+        main(["--tools_metadata", database, "import-trainings", TRAINING_DIRECTORY, "--checkpoint-every", "2"])
+    with open(checkpoint_path(database)) as f:
+        completed = json.load(f)["completed"]
+    assert len(completed) == 2
+    assert {f"{topic}/{tutorial}" for topic, tutorial in ToolsMetadata(database).training_index().tutorials()} <= set(completed)
+
+    monkeypatch.undo()
+    capsys.readouterr()
+    main(["--tools_metadata", database, "import-trainings", TRAINING_DIRECTORY, "--resume"])
+    assert "Resumed after 2 tutorials" in capsys.readouterr().out
+    assert ToolsMetadata(database).training_index().tutorial_tools == expected
+    assert not os.path.exists(checkpoint_path(database))
@@ -0,0 +1,64 @@
+import copy
+
+import pytest
+
+from gx_tool_db.compact import compact_tools, CompactTool, to_plain
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from gx_tool_db.synthetic import synthetic_database_dict, SyntheticDatabaseSpec
+from ._data import DATA_DIRECTORY
+from ._db import SAMTOOLS_VIEW, write_example_database
+
+
+def test_round_trip_is_lossless():
+    database = synthetic_database_dict(SyntheticDatabaseSpec(tools=200, test_targets=3, trainings=20))
+    database["tools"]["odd_status"] = {"versions": {"1.0": {"test_results": {"t": {0: {"status": "weird"}}}}}}
+    tools = compact_tools(copy.deepcopy(database["tools"]))
+    assert isinstance(tools["odd_status"], CompactTool)
+    assert to_plain(tools) == database["tools"]
+    assert to_plain(copy.deepcopy(tools)) == database["tools"]
+
+
+def test_records_behave_like_dicts():
+    tools = compact_tools({})
+    tool = tools.setdefault("cat1", {})
+    assert isinstance(tool, CompactTool)
+    assert "servers" not in tool and tool.get("servers") is None
+    tool["servers"] = {}
+    tool["servers"]["main"] = {"versions": ["1.0"]}
+    tool["servers"]["main"]["versions"].append("1.1")
+    tool["versions"] = {"1.1": {"test_results": {"anvil": {0: {"status": "success"}}}}}
+    assert tool["versions"]["1.1"]["test_results"]["anvil"][0]["status"] == "success"
+    assert tool.pop("versions")["1.1"]["test_results"]["anvil"][0].get("status") == "success"
+    assert to_plain(tools) == {"cat1": {"servers": {"main": {"versions": ["1.0", "1.1"]}}}}
+    with pytest.raises(KeyError):
+        tool["bogus"] = 1
+
+
+COMMANDS = [
+    ["import-label", f"{DATA_DIRECTORY}/deprecated_tools.txt", "deprecated"],
+    ["export-tabular", "--all-coverage", "--all-tests", "--label", "awesome", "--output", "{out}/coverage.tsv"],
+    ["export-coverage-versions", "--output", "{out}/versions.tsv"],
+    ["export-panel-view", "view", "main", "--exclude-label", "meh", "--output", "{out}/view.yml"],
+    ["export-install-yaml", "--output", "{out}/tools.yml"],
+    ["import-tests", f"{DATA_DIRECTORY}/results.json", "anvil"],
+    ["export-label", "{out}/deprecated.txt", "deprecated"],
+]
+
+
+def test_compact_commands_match_plain(tmp_path):
+    outputs = {}
+    for compact in [False, True]:
+        out = tmp_path / str(compact)
+        out.mkdir()
+        database = str(out / "tools_metadata.yml")
+        write_example_database(database)
+        for command in COMMANDS:
+            argv = ["--tools_metadata", database] + (["--compact"] if compact else [])
+            main(argv + [a.format(out=out) for a in command])
+        outputs[compact] = {p.name: p.read_text() for p in out.iterdir()}
+    assert outputs[True] == outputs[False]
+
+    tools_metadata = ToolsMetadata(str(tmp_path / "True" / "tools_metadata.yml"), compact=True)
+    assert isinstance(tools_metadata._tools_dict()[SAMTOOLS_VIEW], CompactTool)
+    assert tools_metadata.get_entry_for(SAMTOOLS_VIEW).get_version_entry("1.9+galaxy1").get_test_results_for("anvil")
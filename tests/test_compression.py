@@ -0,0 +1,52 @@
+import gzip
+import importlib.util
+import os
+
+import pytest
+import yaml
+
+from gx_tool_db.db import read_generation, ToolsMetadata
+from gx_tool_db.io import open_compressed
+from gx_tool_db.main import main
+from gx_tool_db.models import load_from_path
+from ._db import CAT1, SAMTOOLS_VIEW, write_example_database
+
+EXTENSIONS = [
+    ".yml.gz",
+    pytest.param(".yml.zst", marks=pytest.mark.skipif(importlib.util.find_spec("zstandard") is None, reason="zstandard not installed")),
+]
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_compressed_database_round_trip(tmp_path, extension):
+    plain = str(tmp_path / "tools_metadata.yml")
+    write_example_database(plain)
+    compressed = str(tmp_path / f"tools_metadata{extension}")
+    write_example_database(compressed)
+    with open(compressed, "rb") as f:
+        assert f.read(4) in [b"\x1f\x8b\x08\x00", b"\x28\xb5\x2f\xfd"]  # gzip (no file name) / zstd magic
+    assert os.path.getsize(compressed) < os.path.getsize(plain)
+    assert ToolsMetadata(compressed).metadata == ToolsMetadata(plain).metadata
+    assert load_from_path(compressed) == load_from_path(plain)
+    assert read_generation(compressed) == read_generation(plain)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("tmp")]  # temporary file moved
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_commands_on_compressed_database(tmp_path, extension):
+    database = str(tmp_path / f"tools_metadata{extension}")
+    write_example_database(database)
+    (tmp_path / "ids.txt").write_text(f"{CAT1}\n{SAMTOOLS_VIEW}\n")
+    main(["--tools_metadata", database, "--compression-level", "1", "import-label", str(tmp_path / "ids.txt"), "compressed"])
+    main(["--tools_metadata", database, "export-label", str(tmp_path / "out.txt"), "compressed"])
+    assert (tmp_path / "out.txt").read_text().split() == [CAT1, SAMTOOLS_VIEW]
+
+
+def test_open_compressed_streams_text(tmp_path):
+    path = str(tmp_path / "data.yml.gz")
+    with open_compressed(path, "w", compression_level=9) as f:
+        yaml.safe_dump({"key": ["value"] * 3}, f)
+    with gzip.open(path, "rt") as f:
+        assert yaml.safe_load(f) == {"key": ["value"] * 3}
+    with open_compressed(path) as f:
+        assert yaml.safe_load(f) == {"key": ["value"] * 3}
@@ -0,0 +1,102 @@
+import subprocess
+import sys
+
+import pytest
+
+from gx_tool_db.db import ConcurrentModificationError, read_generation, ToolEntry, ToolsMetadata
+from gx_tool_db.main import main
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    return database
+
+
+def _has_label(database, tool_id, label):
+    return ToolsMetadata(database).get_entry_for(tool_id).has_external_label(label)
+
+
+def test_writes_increment_generation(database):
+    generation = read_generation(database)
+    tools_metadata = ToolsMetadata(database)
+    assert tools_metadata.generation == generation
+    tools_metadata.write()
+    assert read_generation(database) == generation + 1
+    assert ToolsMetadata(database).generation == generation + 1
+
+
+def test_checked_write_rejects_stale_database(database):
+    stale = ToolsMetadata(database)
+    ToolsMetadata(database).write()
+    stale.get_entry_for(CAT1).record_external_label("stale")
+    with pytest.raises(ConcurrentModificationError):
+        stale.write(check_generation=True)
+    assert not _has_label(database, CAT1, "stale")
+
+
+def test_tracked_changes_merged_into_concurrent_write(database):
+    mine = ToolsMetadata(database)
+    mine.track_changes()
+    other = ToolsMetadata(database)
+    other.get_entry_for(CAT1).record_external_label("other")
+    other.get_entry_for(SAMTOOLS_VIEW).record_external_label("other")
+    other.write()
+    mine.get_entry_for(CAT1).record_external_label("mine")
+    mine.get_entry_for(SAMTOOLS_VIEW).record_external_label("awesome", present=False)
+    mine.write()
+    assert mine.generation == read_generation(database) == other.generation + 1
+    tools_metadata = ToolsMetadata(database)
+    assert tools_metadata.get_entry_for(CAT1)._source_data["external_labels"] == ["meh", "other", "mine"]
+    assert tools_metadata.get_entry_for(SAMTOOLS_VIEW)._source_data["external_labels"] == ["other"]
+
+
+def test_read_generation_stops_after_its_key(tmp_path):
+    legacy = tmp_path / "legacy.yml"
+    # generation sorts before tools, so a database without one is not read further
+    legacy.write_text("integrated_panels: {}\ntools:\n  a:\n    generation: 3\nversion: '1.0'\ngeneration: 3\n")
+    assert read_generation(str(legacy)) == 0
+    legacy.write_text("edam: {}\ngeneration: 3\ntools: {}\n")
+    assert read_generation(str(legacy)) == 3
+
+
+def test_command_reapplied_after_concurrent_write(tmp_path, database, monkeypatch):
+    (tmp_path / "ids.txt").write_text(CAT1)
+    record_external_label = ToolEntry.record_external_label
+    concurrent_writes = []
+
+    def record_and_write_concurrently(self, label, present=True):
+        if not concurrent_writes:
+            concurrent_writes.append(label)
+            # another process labels a different tool while this command runs
+            other = ToolsMetadata(database)
+            other.get_entry_for(SAMTOOLS_VIEW).record_external_label("other")
+            other.write()
+        record_external_label(self, label, present)
+
+    monkeypatch.setattr(ToolEntry, "record_external_label", record_and_write_concurrently)
+    main(["--tools_metadata", database, "import-label", str(tmp_path / "ids.txt"), "mine"])
+    # the command ran once, its changes were re-applied to the updated database
+    assert concurrent_writes == ["mine"]
+    assert _has_label(database, CAT1, "mine")
+    assert _has_label(database, SAMTOOLS_VIEW, "other")
+
+
+def test_parallel_writers_keep_every_update(tmp_path, database):
+    commands = []
+    for i, tool_id in enumerate([CAT1, SAMTOOLS_VIEW, BAM_COVERAGE] * 2):
+        (tmp_path / f"ids{i}.txt").write_text(tool_id)
+        commands.append(["import-label", str(tmp_path / f"ids{i}.txt"), f"parallel{i}"])
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", "import sys; from gx_tool_db.main import main; main(sys.argv[1:])", "--tools_metadata", database] + command,
+            stdout=subprocess.DEVNULL,
+        )
+        for command in commands
+    ]
+    assert [process.wait() for process in processes] == [0] * len(commands)
+    tools_metadata = ToolsMetadata(database)
+    for i, tool_id in enumerate([CAT1, SAMTOOLS_VIEW, BAM_COVERAGE] * 2):
+        assert tools_metadata.get_entry_for(tool_id).has_external_label(f"parallel{i}")
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from gx_tool_db.coverage import CoverageMatrix
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def matrix(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    return CoverageMatrix.from_tools_metadata(ToolsMetadata(database))
+
+
+def test_coverage_percentages(matrix):
+    assert matrix.servers == ["eu", "main"]
+    percentages = matrix.coverage_percentages()
+    assert percentages["main"] == 100.0
+    assert percentages["eu"] == pytest.approx(200.0 / 3)
+
+
+def test_missing_and_lagging(matrix):
+    assert matrix.tools_missing_from("eu") == [BAM_COVERAGE]
+    assert matrix.tools_missing_from("main") == []
+    assert matrix.tools_lagging_on("eu") == [SAMTOOLS_VIEW]
+    assert matrix.servers_lagging_for(SAMTOOLS_VIEW) == ["eu"]
+    assert matrix.servers_lagging_for(CAT1) == []
+
+
+def test_summaries(matrix):
+    by_server = {s.server: s for s in matrix.summaries()}
+    assert by_server["main"].tools_with_latest_version == 3
+    assert by_server["main"].tool_versions_present == 4
+    assert by_server["eu"].tools_present == 2
+    assert by_server["eu"].tools_lagging_latest_version == 1
+
+
+def test_export_coverage_summary(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    output = str(tmp_path / "summary.jsonl")
+    main(["--tools_metadata", database, "export-coverage-summary", "--output", output, "--server", "eu"])
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1
+    assert records[0]["Server"] == "eu"
+    assert records[0]["Tools Lagging Latest Version"] == 1
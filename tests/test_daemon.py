@@ -0,0 +1,185 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+import yaml
+
+from gx_tool_db.daemon import create_server, DaemonClient, ToolDatabaseDaemon
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    socket_path = str(tmp_path / "daemon.sock")
+    tool_db_daemon = ToolDatabaseDaemon(database, debounce=60)
+    server = create_server(tool_db_daemon, socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield database, socket_path
+    server.shutdown()
+    server.server_close()
+    tool_db_daemon.close()
+
+
+def test_daemon_lookups(daemon):
+    _, socket_path = daemon
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+    client = DaemonClient(socket_path)
+    assert "versions" in client.tool(SAMTOOLS_VIEW)
+    assert client.tool("does/not/exist") is None
+    assert client.labels() == {"awesome": 1, "meh": 1}
+    assert client.tools_with_label("awesome") == [SAMTOOLS_VIEW]
+
+
+def test_daemon_label_writes_are_debounced(daemon):
+    database, socket_path = daemon
+    client = DaemonClient(socket_path)
+    assert client.record_label("cool", [CAT1, SAMTOOLS_VIEW, "typo_tool_id"]) == 2
+    assert client.tools_with_label("cool") == [CAT1, SAMTOOLS_VIEW]
+    assert client.status()["dirty"]
+    assert not ToolsMetadata(database).get_entry_for(CAT1).has_external_label("cool")
+    client.flush()
+    assert not client.status()["dirty"]
+    assert ToolsMetadata(database).get_entry_for(CAT1).has_external_label("cool")
+    # unknown tools are not created
+    assert client.tool("typo_tool_id") is None
+    assert client.record_label("cool", ["typo_tool_id"]) == 0
+    assert not client.status()["dirty"]
+
+
+def test_daemon_flush_keeps_concurrent_writes(daemon, tmp_path):
+    database, socket_path = daemon
+    client = DaemonClient(socket_path)
+    client.record_label("cool", [CAT1])
+    ids_path = tmp_path / "ids.txt"
+    ids_path.write_text(f"{SAMTOOLS_VIEW}\n")
+    main(["--tools_metadata", database, "--daemon", socket_path, "import-label", str(ids_path), "forwarded"])
+    # another process writes the database before the daemon flushes
+    other = ToolsMetadata(database)
+    other.get_entry_for(BAM_COVERAGE).record_external_label("concurrent")
+    other.write()
+    client.flush()
+    tools_metadata = ToolsMetadata(database)
+    assert tools_metadata.get_entry_for(BAM_COVERAGE).has_external_label("concurrent")
+    assert tools_metadata.get_entry_for(CAT1).has_external_label("cool")
+    assert tools_metadata.get_entry_for(SAMTOOLS_VIEW).has_external_label("forwarded")
+    assert client.tools_with_label("concurrent") == [BAM_COVERAGE]
+
+
+def test_daemon_forwards_cli_commands(daemon, tmp_path):
+    database, socket_path = daemon
+    ids_path = tmp_path / "ids.txt"
+    ids_path.write_text(f"{CAT1}\n")
+    main(["--tools_metadata", database, "--daemon", socket_path, "import-label", str(ids_path), "forwarded"])
+    output = tmp_path / "forwarded.txt"
+    main(["--tools_metadata", database, "--daemon", socket_path, "export-label", str(output), "forwarded"])
+    assert output.read_text().split() == [CAT1]
+    # not persisted until the daemon flushes
+    with open(database) as f:
+        assert "forwarded" not in yaml.safe_dump(yaml.safe_load(f))
+
+    with pytest.raises(Exception, match="--compact cannot be forwarded"):
+        main(["--tools_metadata", database, "--daemon", socket_path, "--compact", "export-label", str(output), "x"])
+    with pytest.raises(Exception, match="not"):
+        main(["--tools_metadata", str(tmp_path / "other.yml"), "--daemon", socket_path, "export-label", str(output), "x"])
+
+
+def test_daemon_returns_command_output(daemon, capsys):
+    database, socket_path = daemon
+    capsys.readouterr()
+    status, result = DaemonClient(socket_path)._send("POST", "/command", {"argv": ["search", "samtools"]})
+    assert status == 200
+    assert [line.split("\t")[0] for line in result["stdout"].splitlines()] == [SAMTOOLS_VIEW]
+    # nothing is printed by the daemon itself
+    assert capsys.readouterr().out == ""
+
+    main(["--tools_metadata", database, "--daemon", socket_path, "search", "samtools"])
+    assert capsys.readouterr().out == result["stdout"]
+
+
+def test_daemon_failing_command_leaves_no_changes(daemon, tmp_path, monkeypatch):
+    database, socket_path = daemon
+    client = DaemonClient(socket_path)
+    client.record_label("kept", [CAT1])
+
+    copies = []
+    copy = ToolsMetadata.copy
+    monkeypatch.setattr(ToolsMetadata, "copy", lambda self: copies.append(self) or copy(self))
+    results = tmp_path / "results"
+    results.mkdir()
+    tests = [{"id": "0", "has_data": True, "data": {"tool_id": CAT1, "tool_version": "1.0.0", "test_index": 0, "status": "success"}}]
+    (results / "a.json").write_text(json.dumps({"version": "0.1", "tests": tests}))
+    (results / "b.json").write_text("{not json")
+    with pytest.raises(Exception, match="daemon request failed"):
+        main(["--tools_metadata", database, "--daemon", socket_path, "import-tests", str(results), "ci"])
+    # a.json was imported before b.json failed, none of it is kept
+    assert "test_results" not in client.tool(CAT1)["versions"]["1.0.0"]
+    # the resident database is changed in place, not copied
+    assert copies == []
+    # but the changes made before, not written yet, are
+    assert client.tools_with_label("kept") == [CAT1]
+    client.flush()
+    assert ToolsMetadata(database).get_entry_for(CAT1).has_external_label("kept")
+
+
+def test_daemon_reading_commands_share_the_read_lock(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    tool_db_daemon = ToolDatabaseDaemon(database, debounce=60)
+    try:
+        tool_db_daemon.run_command(["search", "samtools"])  # builds the indexes
+        output = tmp_path / "awesome.txt"
+        tool_db_daemon.lock.acquire_read()  # another reader
+        try:
+            reading = threading.Thread(target=tool_db_daemon.run_command, args=(["export-label", str(output), "awesome"],))
+            reading.start()
+            reading.join(timeout=10)
+            assert not reading.is_alive()
+        finally:
+            tool_db_daemon.lock.release_read()
+        assert output.read_text().split() == [SAMTOOLS_VIEW]
+        assert not tool_db_daemon.writer.dirty
+    finally:
+        tool_db_daemon.close()
+
+
+def test_daemon_rejects_malformed_body(daemon):
+    _, socket_path = daemon
+    connection = DaemonClient(socket_path)._connection()
+    try:
+        connection.request("POST", "/command", body=b"{not json", headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        result = json.loads(response.read())
+    finally:
+        connection.close()
+    assert response.status == 400
+    assert "Invalid JSON" in result["error"]
+
+
+def test_daemon_port_only_serves_lookups(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    tool_db_daemon = ToolDatabaseDaemon(database, debounce=60)
+    server = create_server(tool_db_daemon, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = DaemonClient(f"http://127.0.0.1:{server.server_address[1]}")
+        assert client.labels() == {"awesome": 1, "meh": 1}
+        with pytest.raises(Exception, match="only accepted on the Unix socket"):
+            client.record_label("cool", [CAT1])
+        with pytest.raises(Exception, match="only accepted on the Unix socket"):
+            client.run(["export-label", str(tmp_path / "out.txt"), "awesome"])
+        assert not (tmp_path / "out.txt").exists()
+    finally:
+        server.shutdown()
+        server.server_close()
+        tool_db_daemon.close()
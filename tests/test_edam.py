@@ -0,0 +1,82 @@
+import yaml
+
+from gx_tool_db.db import EDAM_UNCATEGORIZED_SECTION_ID, ToolsMetadata
+from gx_tool_db.edam import EDAM_OPERATION, EDAM_TOPIC
+from gx_tool_db.main import main
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+
+def _read_tabular(path):
+    with open(path) as f:
+        return [line.split("\t") for line in f.read().splitlines()]
+
+
+def _database(tmp_path):
+    path = str(tmp_path / "tools_metadata.yml")
+    tools_metadata = write_example_database(path)
+    # only the newest version's annotations count
+    samtools_view = tools_metadata.get_entry_for(SAMTOOLS_VIEW)
+    samtools_view.get_version_entry("1.9+galaxy1").record_metadata(
+        name="samtools view", description="old", edam_topics=["topic_3168"], edam_operations=["operation_0335"], model_class="Tool",
+    )
+    samtools_view.get_version_entry("1.9+galaxy2").record_metadata(
+        name="samtools view", description="new", edam_topics=["topic_0102", "topic_0080"], edam_operations=["operation_3695"], model_class="Tool",
+    )
+    tools_metadata.write()
+    return path
+
+
+def test_edam_index(tmp_path):
+    edam_index = ToolsMetadata(_database(tmp_path)).edam_index()
+    assert edam_index.servers == ["eu", "main"]
+    assert edam_index.terms(EDAM_TOPIC) == ["topic_0080", "topic_0102"]
+    assert edam_index.terms(EDAM_OPERATION) == ["operation_3695"]
+    assert sorted(edam_index.tools_for(EDAM_TOPIC, "topic_0102")) == sorted([SAMTOOLS_VIEW, BAM_COVERAGE])
+    assert edam_index.tools_for(EDAM_TOPIC, "topic_0102", server="eu") == [SAMTOOLS_VIEW]
+    assert edam_index.terms_for(SAMTOOLS_VIEW, EDAM_TOPIC) == ["topic_0102", "topic_0080"]
+    assert edam_index.untagged_tools(EDAM_TOPIC) == [CAT1]
+    assert edam_index.tool_counts(EDAM_TOPIC) == {
+        "topic_0080": {"eu": 1, "main": 1},
+        "topic_0102": {"eu": 1, "main": 2},
+    }
+    assert edam_index.terms_missing_on("eu", EDAM_TOPIC) == []
+    assert edam_index.terms_missing_on("au", EDAM_OPERATION) == ["operation_3695"]
+
+
+def test_export_edam(tmp_path):
+    database = _database(tmp_path)
+    output = str(tmp_path / "edam.tsv")
+    main(["--tools_metadata", database, "export-edam", "--output", output])
+    header, *rows = _read_tabular(output)
+    assert header == ["EDAM Kind", "EDAM Term", "Tool Count", "eu Tools", "main Tools", "Missing On"]
+    assert rows == [
+        ["topic", "topic_0080", "1", "1", "1", ""],
+        ["topic", "topic_0102", "2", "1", "2", ""],
+        ["operation", "operation_3695", "1", "1", "1", ""],
+    ]
+
+    main(["--tools_metadata", database, "export-edam", "--output", output, "--kind", "topic", "--server", "test", "--missing-on", "test"])
+    header, *rows = _read_tabular(output)
+    assert header == ["EDAM Kind", "EDAM Term", "Tool Count", "test Tools", "Missing On"]
+    assert rows == [["topic", "topic_0080", "1", "0", "test"], ["topic", "topic_0102", "2", "0", "test"]]
+
+
+def test_edam_topic_panel_view(tmp_path):
+    database = _database(tmp_path)
+    tools_metadata = ToolsMetadata(database)
+    tools_metadata.get_entry_for(BAM_COVERAGE).record_external_label("hidden")
+    tools_metadata.write()
+    output = str(tmp_path / "edam_main.yml")
+    main([
+        "--tools_metadata", database, "export-panel-view", "edam_main", "main",
+        "--group-by", "edam_topic", "--output", output, "--exclude-label", "hidden",
+    ])
+    with open(output) as f:
+        view = yaml.safe_load(f)
+    assert view["id"] == "edam_main"
+    assert view["items"] == [
+        {"id": "topic_0080", "name": "topic_0080", "type": "section", "items": [{"type": "tool", "id": SAMTOOLS_VIEW}]},
+        {"id": "topic_0102", "name": "topic_0102", "type": "section", "items": [{"type": "tool", "id": SAMTOOLS_VIEW}]},
+        {"id": EDAM_UNCATEGORIZED_SECTION_ID, "name": "No EDAM Topic", "type": "section", "items": [{"type": "tool", "id": CAT1}]},
+    ]
+    assert view["excludes"] == []  # bam coverage is on main, it is just left out of the sections
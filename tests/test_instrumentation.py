@@ -0,0 +1,54 @@
+import json
+
+from gx_tool_db import instrumentation
+from gx_tool_db.main import main
+from ._db import CAT1, SAMTOOLS_VIEW, write_example_database
+
+
+def test_hooks_are_noops_when_disabled():
+    assert instrumentation.current() is None
+    with instrumentation.phase("ignored"):
+        instrumentation.count("ignored")
+    assert instrumentation.current() is None
+
+
+def test_nested_phases_and_counters():
+    profile = instrumentation.enable()
+    try:
+        with instrumentation.phase("outer"):
+            with instrumentation.phase("inner"):
+                buffer = bytearray(4 * 1024 * 1024)
+            del buffer
+            with instrumentation.phase("inner"):
+                instrumentation.count_distinct("tools", "a")
+                instrumentation.count_distinct("tools", "a")
+                instrumentation.count("bytes", 10)
+    finally:
+        assert instrumentation.disable() is profile
+    assert profile.phases["inner"].calls == 2
+    assert profile.phases["outer"].wall_seconds >= profile.phases["inner"].wall_seconds
+    assert profile.phases["inner"].peak_memory_bytes >= 4 * 1024 * 1024
+    assert profile.phases["outer"].peak_memory_bytes >= profile.phases["inner"].peak_memory_bytes
+    assert profile.counters == {"tools": 1, "bytes": 10}
+
+
+def test_profile_option_reports_json(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    ids = tmp_path / "ids.txt"
+    ids.write_text(f"{CAT1}\n{SAMTOOLS_VIEW}\n")
+    report = tmp_path / "profile.json"
+    stats = tmp_path / "profile.pstats"
+    main([
+        "--tools_metadata", database, "--profile", "--profile-format", "json", "--profile-output", str(report),
+        "--profile-cprofile", str(stats), "import-label", str(ids), "profiled",
+    ])
+    with open(report) as f:
+        profile = json.load(f)
+    for phase in ["total", "yaml_load", "validate", "yaml_dump"]:
+        assert profile["phases"][phase]["calls"] >= 1
+    assert profile["phases"]["validate"]["calls"] == 2
+    assert profile["counters"]["files_parsed"] == 1
+    assert profile["counters"]["tools_touched"] == 3  # import-label walks every entry
+    assert stats.exists()
+    assert instrumentation.current() is None
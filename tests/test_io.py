@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from gx_tool_db.io import csv_dict_reader, tabular_writer, TabularColumn
+from gx_tool_db.main import main
+from ._db import SAMTOOLS_VIEW, write_example_database
+
+COLUMNS = [
+    TabularColumn("Tool ID"),
+    TabularColumn("Latest Version"),
+    TabularColumn("Test Count", int),
+    TabularColumn("awesome", bool),
+]
+ROWS = [
+    ["cat1", "1.0.0", 0, False],
+    [SAMTOOLS_VIEW, None, 7, True],
+]
+
+
+def test_tabular_writer_tsv(tmp_path):
+    path = str(tmp_path / "out.tsv")
+    with tabular_writer(path, COLUMNS) as writer:
+        writer.writerows(ROWS)
+    with open(path) as f:
+        assert f.read().splitlines() == [
+            "Tool ID\tLatest Version\tTest Count\tawesome",
+            "cat1\t1.0.0\t0\t0",
+            f"{SAMTOOLS_VIEW}\t\t7\t1",
+        ]
+
+
+def test_tabular_writer_json_lines(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with tabular_writer(path, COLUMNS) as writer:
+        writer.writerows(ROWS)
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert records == [dict(zip([c.name for c in COLUMNS], row)) for row in ROWS]
+
+
+@pytest.mark.parametrize("extension", ["parquet", "arrow"])
+def test_tabular_writer_arrow_round_trip(tmp_path, extension):
+    pyarrow = pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"out.{extension}")
+    with tabular_writer(path, COLUMNS) as writer:
+        writer.writerows(ROWS)
+    if extension == "parquet":
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(path).read_all()
+    assert table.schema.field("Test Count").type == pyarrow.int64()
+    assert table.schema.field("awesome").type == pyarrow.bool_()
+    assert table.to_pylist() == [dict(zip([c.name for c in COLUMNS], row)) for row in ROWS]
+
+
+def test_export_tabular_formats_agree(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    outputs = {}
+    for extension in ["tsv", "jsonl", "parquet"]:
+        output = str(tmp_path / f"export.{extension}")
+        main(["--tools_metadata", database, "export-tabular", "--output", output, "--all-coverage", "--all-tests", "--label", "awesome"])
+        assert os.path.exists(output)
+        outputs[extension] = output
+
+    with csv_dict_reader(outputs["tsv"]) as reader:
+        tsv_rows = {row["Tool ID"]: row for row in reader}
+    with open(outputs["jsonl"]) as f:
+        json_rows = {r["Tool ID"]: r for r in map(json.loads, f)}
+    parquet_rows = {r["Tool ID"]: r for r in pyarrow.parquet.read_table(outputs["parquet"]).to_pylist()}
+
+    assert tsv_rows[SAMTOOLS_VIEW]["awesome"] == "1"
+    assert tsv_rows[SAMTOOLS_VIEW]["anvil Test Count"] == "2"
+    assert tsv_rows[SAMTOOLS_VIEW]["main Is Latest"] == "1"
+    assert tsv_rows[SAMTOOLS_VIEW]["eu Is Latest"] == "0"
+    for typed_rows in [json_rows, parquet_rows]:
+        assert typed_rows[SAMTOOLS_VIEW]["awesome"] is True
+        assert typed_rows[SAMTOOLS_VIEW]["anvil Test Count"] == 2
+        assert typed_rows[SAMTOOLS_VIEW]["anvil Tests Failed"] == 1
+        assert typed_rows["cat1"]["anvil Test Count"] == 0
+        assert typed_rows["cat1"]["awesome"] is False
+        assert typed_rows[SAMTOOLS_VIEW]["eu Latest Version"] == "1.9+galaxy1"
+
+
+def test_export_coverage_versions_columns_aligned(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    output = str(tmp_path / "versions.jsonl")
+    main(["--tools_metadata", database, "export-coverage-versions", "--output", output])
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    old_samtools = [r for r in records if r["Tool ID"] == SAMTOOLS_VIEW and r["Tool Version"] == "1.9+galaxy1"][0]
+    assert old_samtools["Is Latest Version"] is False
+    assert old_samtools["main Has Version"] is True
+    assert old_samtools["eu Has Version"] is True
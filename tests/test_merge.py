@@ -0,0 +1,87 @@
+import copy
+import random
+
+import pytest
+import yaml
+
+from gx_tool_db.compact import plain_metadata
+from gx_tool_db.config import TestDataMergeStrategy as MergeStrategy
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+from gx_tool_db.validation import validate_database_dict
+
+SEEDS = range(4)
+
+
+def _merged(*databases, strategy=MergeStrategy.latest_executed):
+    merged = databases[0].copy()
+    for database in databases[1:]:
+        merged.merge(database, strategy)
+    return merged
+
+
+def _plain(database):
+    return plain_metadata(database.metadata)
+
+
+def _partials(tmp_path, seed, compact=False):
+    # overlapping tool ids with differing versions, servers, labels, test results and panels
+    rng = random.Random(seed)
+    partials = []
+    for i in range(3):
+        path = str(tmp_path / f"partial{seed}_{i}.yml")
+        spec = SyntheticDatabaseSpec(tools=rng.randint(5, 25), servers=rng.randint(1, 3), trainings=5, seed=seed * 10 + i)
+        write_synthetic_database(path, spec)
+        partials.append(ToolsMetadata(path, compact=compact))
+    return partials
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_merge_is_associative(tmp_path, seed):
+    a, b, c = _partials(tmp_path, seed)
+    for strategy in MergeStrategy:
+        left = _merged(_merged(a, b, strategy=strategy), c, strategy=strategy)
+        right = _merged(a, _merged(b, c, strategy=strategy), strategy=strategy)
+        assert _plain(left) == _plain(right), strategy
+        validate_database_dict(_plain(left))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_merge_is_idempotent(tmp_path, seed):
+    a, b, _ = _partials(tmp_path, seed)
+    for strategy in MergeStrategy:
+        assert _plain(_merged(a, a, strategy=strategy)) == _plain(a), strategy
+        a_b = _merged(a, b, strategy=strategy)
+        assert _plain(_merged(a_b, b, strategy=strategy)) == _plain(a_b), strategy
+        assert _plain(_merged(a_b, a, strategy=strategy)) == _plain(a_b), strategy
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_compact_merge_matches_plain(tmp_path, seed):
+    plain = _merged(*_partials(tmp_path, seed))
+    compact = _merged(*_partials(tmp_path, seed, compact=True))
+    assert _plain(compact) == _plain(plain)
+
+
+def test_merge_command_reassembles_per_server_imports(tmp_path):
+    path = str(tmp_path / "full.yml")
+    spec = SyntheticDatabaseSpec(tools=20, servers=3, trainings=5)
+    full = write_synthetic_database(path, spec)
+    partial_paths = []
+    for server in spec.server_labels:
+        # what a worker importing only this server (plus labels, tests and trainings) would write
+        partial = copy.deepcopy(full)
+        for tool in partial["tools"].values():
+            tool["servers"] = {label: value for label, value in tool["servers"].items() if label == server}
+            for version in tool["versions"].values():
+                version["servers"] = {label: value for label, value in version["servers"].items() if label == server}
+        partial["integrated_panels"] = {server: partial["integrated_panels"][server]}
+        partial_path = tmp_path / f"{server}.yml"
+        partial_path.write_text(yaml.safe_dump(partial))
+        partial_paths.append(str(partial_path))
+    merged_path = str(tmp_path / "merged.yml")
+    main(["--tools_metadata", merged_path, "merge"] + partial_paths)
+    merged = ToolsMetadata(merged_path).metadata
+    merged.pop("generation")
+    assert merged == full
@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+from gx_tool_db import instrumentation
+from gx_tool_db.main import main
+from gx_tool_db.metrics import metrics_dict, prometheus_text
+from ._data import DATA_DIRECTORY
+from ._db import write_example_database
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_prometheus_text_labels():
+    profile = instrumentation.enable(track_memory=False)
+    try:
+        instrumentation.count("http_requests", server="https://usegalaxy.org")
+        instrumentation.count("http_requests", 2, server="https://usegalaxy.eu")
+        instrumentation.count("http_requests")
+        instrumentation.observe("http_request_seconds", 0.5, server="https://usegalaxy.org")
+        instrumentation.observe("http_request_seconds", 1.5, server="https://usegalaxy.org")
+        instrumentation.gauge("database_tools", 3)
+    finally:
+        instrumentation.disable()
+    assert profile.counters == {"http_requests": 4}
+    samples = _samples(prometheus_text(metrics_dict(profile, "import-server-all", True, 1600000000.0, 2.5, None, 100)))
+    assert samples['gx_tool_db_http_requests_total{command="import-server-all",server="https://usegalaxy.org"}'] == "1"
+    assert samples['gx_tool_db_http_requests_total{command="import-server-all",server="https://usegalaxy.eu"}'] == "2"
+    # the requests counted without a server
+    assert samples['gx_tool_db_http_requests_total{command="import-server-all"}'] == "1"
+    labels = '{command="import-server-all",server="https://usegalaxy.org"}'
+    assert samples[f"gx_tool_db_http_request_seconds_count{labels}"] == "2"
+    assert samples[f"gx_tool_db_http_request_seconds_sum{labels}"] == "2.0"
+    assert samples[f"gx_tool_db_http_request_seconds_max{labels}"] == "1.5"
+    assert samples['gx_tool_db_database_tools{command="import-server-all"}'] == "3"
+    assert samples['gx_tool_db_database_size_bytes{command="import-server-all",when="after"}'] == "100"
+    assert 'gx_tool_db_database_size_bytes{command="import-server-all",when="before"}' not in samples
+    assert samples['gx_tool_db_success{command="import-server-all"}'] == "1"
+
+
+def test_metrics_output(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    size_before = os.path.getsize(database)
+    output = tmp_path / "gx_tool_db.prom"
+    main(["--tools_metadata", database, "--metrics-output", str(output), "import-tests", f"{DATA_DIRECTORY}/results.json", "ci"])
+    samples = _samples(output.read_text())
+    assert samples['gx_tool_db_success{command="import-tests"}'] == "1"
+    assert samples['gx_tool_db_database_size_bytes{command="import-tests",when="before"}'] == str(size_before)
+    assert int(samples['gx_tool_db_database_size_bytes{command="import-tests",when="after"}']) > size_before
+    assert samples['gx_tool_db_result_files_parsed_total{command="import-tests"}'] == "1"
+    assert int(samples['gx_tool_db_test_results_parsed_total{command="import-tests"}']) > 0
+    assert int(samples['gx_tool_db_versions_touched_total{command="import-tests"}']) > 0
+    assert samples['gx_tool_db_phase_calls{command="import-tests",phase="yaml_dump"}'] == "1"
+    assert int(samples['gx_tool_db_peak_rss_bytes{command="import-tests"}']) > 0
+    assert instrumentation.current() is None
+
+
+def test_metrics_written_for_failed_commands(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    output = tmp_path / "metrics.json"
+    with pytest.raises(Exception):
+        main([
+            "--tools_metadata", database, "--metrics-output", str(output), "--metrics-format", "json",
+            "import-tests", str(tmp_path / "missing.json"), "ci",
+        ])
+    with open(output) as f:
+        metrics = json.load(f)
+    assert metrics["command"] == "import-tests"
+    assert metrics["success"] is False
+    assert metrics["database_size_bytes"]["before"] == metrics["database_size_bytes"]["after"]
+    assert "yaml_load" in metrics["phases"]
@@ -0,0 +1,68 @@
+import pytest
+import yaml
+
+from gx_tool_db.main import main
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+VIEWS = [
+    {"id": "awesome_main", "server": "main", "require_labels": ["awesome"]},
+    {"id": "no_meh_main", "server": "main", "exclude_labels": ["meh"], "name": "No Meh"},
+    {"id": "no_meh_eu", "server": "eu", "exclude_labels": ["meh"], "output": "eu_no_meh.yml"},
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    tools_metadata = write_example_database(database)
+    # a tool not on eu carrying the excluded label should be listed in eu's excludes
+    tools_metadata.get_entry_for(BAM_COVERAGE).record_external_label("meh")
+    tools_metadata.write()
+    return database
+
+
+def _load(path):
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def test_export_panel_views_matches_single_view(tmp_path, database):
+    views_path = tmp_path / "views.yml"
+    views_path.write_text(yaml.safe_dump(VIEWS))
+    batch_dir = tmp_path / "batch"
+    main(["--tools_metadata", database, "export-panel-views", str(views_path), "--output-directory", str(batch_dir)])
+
+    single_dir = tmp_path / "single"
+    single_dir.mkdir()
+    for view in VIEWS:
+        command = ["--tools_metadata", database, "export-panel-view", view["id"], view["server"]]
+        command += ["--output", str(single_dir / view.get("output", f"{view['id']}.yml"))]
+        if "name" in view:
+            command += ["--name", view["name"]]
+        for label in view.get("require_labels", []):
+            command += ["--require-label", label]
+        for label in view.get("exclude_labels", []):
+            command += ["--exclude-label", label]
+        main(command)
+
+    for name in ["awesome_main.yml", "no_meh_main.yml", "eu_no_meh.yml"]:
+        assert _load(batch_dir / name) == _load(single_dir / name)
+
+    awesome = _load(batch_dir / "awesome_main.yml")
+    assert [s["id"] for s in awesome["items"] if s["type"] == "section"] == ["samtools"]
+    assert awesome["items"][-1]["items"] == [{"type": "tool", "id": SAMTOOLS_VIEW}]
+    assert "excludes" not in awesome
+
+    no_meh_main = _load(batch_dir / "no_meh_main.yml")
+    assert no_meh_main["name"] == "No Meh"
+    assert "textutil" not in [i["id"] for i in no_meh_main["items"]]
+    no_meh_eu = _load(batch_dir / "eu_no_meh.yml")
+    assert no_meh_eu["excludes"] == [{"tool_id": BAM_COVERAGE}]
+    assert CAT1 not in [e["tool_id"] for e in no_meh_eu["excludes"]]
+
+
+def test_export_panel_views_rejects_unknown_keys(tmp_path, database):
+    views_path = tmp_path / "views.yml"
+    views_path.write_text(yaml.safe_dump([{"id": "x", "server": "main", "labels": ["oops"]}]))
+    with pytest.raises(Exception, match="labels"):
+        main(["--tools_metadata", database, "export-panel-views", str(views_path)])
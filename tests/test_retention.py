@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from gx_tool_db.db import RetentionPolicy, ToolsMetadata
+from gx_tool_db.main import main
+from gx_tool_db.synthetic import SyntheticDatabaseSpec, write_synthetic_database
+from gx_tool_db.validation import validate_database_dict
+
+
+def _database(tmp_path, **kwds):
+    path = str(tmp_path / "tools_metadata.yml")
+    write_synthetic_database(path, SyntheticDatabaseSpec(tools=60, versions_per_tool=4, **kwds))
+    return path
+
+
+def _versions(tools_metadata):
+    return {tool_id: list(tool["versions"]) for tool_id, tool in tools_metadata.walk_tools_dict()}
+
+
+def test_keep_newest_versions(tmp_path):
+    tools_metadata = ToolsMetadata(_database(tmp_path))
+    before = _versions(tools_metadata)
+    removed = tools_metadata.apply_retention(RetentionPolicy(keep_versions=1))
+    after = _versions(tools_metadata)
+    assert removed["versions"] == sum(len(versions) - 1 for versions in before.values())
+    for tool_id in before:
+        assert after[tool_id] == [tools_metadata.get_entry_for(tool_id).latest_version]
+        assert after[tool_id][0] in before[tool_id]
+        # servers no longer list the removed versions
+        for server_metadata in tools_metadata._tools_dict()[tool_id]["servers"].values():
+            assert set(server_metadata.get("versions") or []) <= set(after[tool_id])
+
+
+def test_keep_at_least_one_version(tmp_path):
+    database = _database(tmp_path)
+    for keep_versions in [0, -1]:
+        with pytest.raises(Exception, match="at least 1"):
+            ToolsMetadata(database).apply_retention(RetentionPolicy(keep_versions=keep_versions))
+    with pytest.raises(Exception, match="at least 1"):
+        main(["--tools_metadata", database, "compact", "--keep-versions", "0"])
+
+
+def test_drop_old_tests_unavailable_versions_and_empty_containers(tmp_path):
+    tools_metadata = ToolsMetadata(_database(tmp_path))
+    tool_versions = next(iter(tools_metadata._tools_dict().values()))["versions"]
+    tool_versions["0.0.1"] = {"servers": {}, "test_results": {"old": {0: {"status": "success", "job_create_time": "2020-01-01T00:00:00"}}}}
+    tools_metadata._tools_dict()["unknown_tool"] = {"versions": {}, "external_labels": []}
+
+    removed = tools_metadata.apply_retention(RetentionPolicy(tests_before="2021-07-01", drop_unavailable_versions=True, drop_empty=True))
+    assert removed["test_results"] > 0
+    assert removed["versions"] >= 1 and "0.0.1" not in tool_versions
+    assert removed["tools"] == 1 and "unknown_tool" not in tools_metadata._tools_dict()
+    assert removed["empty_containers"] > 0
+    for _, tool in tools_metadata.walk_tools_dict():
+        for version in tool["versions"].values():
+            assert version["servers"]
+            for target_results in (version.get("test_results") or {}).values():
+                assert target_results
+                assert all(result.get("job_create_time", "9999") >= "2021-07-01" for result in target_results.values())
+    validate_database_dict(tools_metadata.metadata)
+
+
+def test_compact_command_reports_and_shrinks(tmp_path, capsys):
+    database = _database(tmp_path)
+    size = os.path.getsize(database)
+    main(["--tools_metadata", database, "compact", "--keep-versions", "1", "--tests-before", "2021-07-01", "--drop-empty", "--dry-run"])
+    assert capsys.readouterr().out.startswith("Would remove ")
+    assert os.path.getsize(database) == size
+
+    main(["--tools_metadata", database, "compact", "--keep-versions", "1", "--tests-before", "2021-07-01", "--drop-empty"])
+    out = capsys.readouterr().out
+    assert out.startswith("Removed ") and f"{size} -> " in out
+    assert os.path.getsize(database) < size
+    assert all(len(versions) == 1 for versions in _versions(ToolsMetadata(database)).values())
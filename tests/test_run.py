@@ -0,0 +1,94 @@
+import pytest
+
+from gx_tool_db import main as main_module
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    (tmp_path / "ids.txt").write_text(f"{CAT1}\n{SAMTOOLS_VIEW}\n")
+    return database
+
+
+def _has_label(database, tool_id, label):
+    return ToolsMetadata(database).get_entry_for(tool_id).has_external_label(label)
+
+
+def test_run_shares_database_between_steps(tmp_path, database):
+    script = tmp_path / "pipeline.txt"
+    script.write_text(f"""
+# label then export without writing in between
+import-label {tmp_path / "ids.txt"} piped
+export-label {tmp_path / "piped.txt"} piped
+export-tabular --label piped --output '{tmp_path / "piped.tsv"}'
+""")
+    main(["--tools_metadata", database, "run", str(script)])
+    assert (tmp_path / "piped.txt").read_text().split() == [CAT1, SAMTOOLS_VIEW]
+    assert "piped" in (tmp_path / "piped.tsv").read_text().splitlines()[0]
+    assert _has_label(database, CAT1, "piped")
+
+
+def test_run_failure_leaves_database_untouched(tmp_path, database):
+    with open(database) as f:
+        before = f.read()
+    script = tmp_path / "pipeline.txt"
+    script.write_text(f"import-label {tmp_path / 'ids.txt'} piped\nimport-label {tmp_path / 'missing.txt'} other\n")
+    with pytest.raises(Exception, match="pipeline.txt:2"):
+        main(["--tools_metadata", database, "run", str(script)])
+    with open(database) as f:
+        assert f.read() == before
+
+
+def test_run_checkpoint_and_validation(tmp_path, database):
+    script = tmp_path / "pipeline.txt"
+    script.write_text(f"import-label {tmp_path / 'ids.txt'} first\ncheckpoint\nimport-label {tmp_path / 'missing.txt'} second\n")
+    with pytest.raises(Exception):
+        main(["--tools_metadata", database, "run", str(script)])
+    assert _has_label(database, CAT1, "first")
+
+    script.write_text(f"import-label {tmp_path / 'ids.txt'} third\nexport-lable out.txt third\n")
+    with pytest.raises(Exception, match="invalid command"):
+        main(["--tools_metadata", database, "run", str(script)])
+    assert not _has_label(database, CAT1, "third")
+
+
+def test_run_keeps_concurrent_writes(tmp_path, database, monkeypatch):
+    (tmp_path / "other.txt").write_text(BAM_COVERAGE)
+    script = tmp_path / "pipeline.txt"
+    script.write_text(f"import-label {tmp_path / 'ids.txt'} first\ncheckpoint\nimport-label {tmp_path / 'ids.txt'} piped\n")
+    run_step = main_module._run_step
+    steps_run = []
+
+    def run_step_and_write_concurrently(pipeline_config, script_path, line_number, step_args):
+        run_step(pipeline_config, script_path, line_number, step_args)
+        steps_run.append(line_number)
+        if steps_run == [1, 3]:
+            # another process labels a tool while the pipeline runs
+            main(["--tools_metadata", database, "import-label", str(tmp_path / "other.txt"), "concurrent"])
+
+    monkeypatch.setattr(main_module, "_run_step", run_step_and_write_concurrently)
+    main(["--tools_metadata", database, "run", str(script)])
+    # no step is re-run, their changes are re-applied to the updated database
+    assert steps_run == [1, 3]
+    assert _has_label(database, BAM_COVERAGE, "concurrent")
+    assert _has_label(database, CAT1, "first")
+    assert _has_label(database, SAMTOOLS_VIEW, "piped")
+
+
+def test_run_keeps_process_options(tmp_path):
+    compressed = str(tmp_path / "tools_metadata.yml.gz")
+    (tmp_path / "ids.txt").write_text(f"{CAT1}\n")
+    script = tmp_path / "pipeline.txt"
+    script.write_text(f"import-label {tmp_path / 'ids.txt'} piped\n")
+    main(["--compression-level", "9", "--strict-validation", "--tools_metadata", compressed, "run", str(script)])
+    with open(compressed, "rb") as f:
+        # gzip header XFL flag, 2 = written with maximum compression
+        assert f.read(10)[8] == 2
+
+    script.write_text(f"--compression-level 1 import-label {tmp_path / 'ids.txt'} piped\n")
+    with pytest.raises(Exception, match="--compression-level applies to the whole run"):
+        main(["--tools_metadata", compressed, "run", str(script)])
@@ -0,0 +1,148 @@
+import os
+
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from gx_tool_db.search import search_index_path, SearchIndex, tokenize
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+
+def _tool(name, description=None, edam_operations=None, xrefs=None):
+    version = {"name": name, "description": description, "edam_operations": edam_operations, "xrefs": xrefs}
+    return {"versions": {"1.0": {key: value for key, value in version.items() if value is not None}}}
+
+
+def _index():
+    return SearchIndex.build({
+        "bowtie2": _tool("Bowtie2", "map reads against reference genome", ["operation_0292"]),
+        "bwa_mem": _tool("Map with BWA-MEM", "map medium and long reads against reference genome"),
+        "samtools_sort": _tool("Samtools sort", "order of storing aligned sequences"),
+        "fastqc": _tool("FastQC", "read quality reports", xrefs=[{"reftype": "bio.tools", "value": "fastqc"}]),
+    })
+
+
+def test_tokenize():
+    assert tokenize("Map with BWA-MEM (v0.7)") == ["map", "with", "bwa", "mem", "v0", "7"]
+
+
+def test_search_requires_every_term_and_matches_prefixes():
+    index = _index()
+    assert {hit.tool_id for hit in index.search("reference genome")} == {"bwa_mem", "bowtie2"}
+    assert [hit.tool_id for hit in index.search("samtools")] == ["samtools_sort"]
+    assert [hit.tool_id for hit in index.search("sam")] == ["samtools_sort"]
+    assert {hit.tool_id for hit in index.search("read")} == {"bowtie2", "bwa_mem", "fastqc"}
+    assert index.search("reads quality") == []
+    assert index.search("") == []
+    assert [hit.tool_id for hit in index.search("operation_0292")] == ["bowtie2"]
+    assert len(index.search("read", limit=2)) == 2
+
+
+def test_search_ranks_names_and_exact_matches_first():
+    index = _index()
+    # "fastqc" is the name, tool id and an xref of fastqc
+    hits = index.search("fastqc")
+    assert hits[0].tool_id == "fastqc"
+    # "read" matches fastqc exactly, bowtie2 and bwa_mem ("reads") only by prefix
+    assert index.search("read")[0].tool_id == "fastqc"
+
+
+def test_update_tool():
+    index = _index()
+    index.update_tool("fastqc", _tool("FastQC", "quality control of sequencing reads"))
+    assert [hit.tool_id for hit in index.search("control")] == ["fastqc"]
+    assert index.search("reports") == []
+    index.update_tool("fastqc", None)
+    assert index.search("fastqc") == []
+    assert len(index) == 3
+
+
+def test_tools_metadata_search(tmp_path):
+    path = str(tmp_path / "tools_metadata.yml")
+    write_example_database(path)
+    tools_metadata = ToolsMetadata(path)
+    entries = tools_metadata.search("samtools view")
+    assert [entry.tool_id for entry in entries] == [SAMTOOLS_VIEW]
+    assert {entry.tool_id for entry in tools_metadata.search("example tool")} == {CAT1, SAMTOOLS_VIEW, BAM_COVERAGE}
+    # persisted for the database generation
+    index = SearchIndex.load(search_index_path(path))
+    assert index is not None and index.generation == tools_metadata.generation
+
+
+def test_index_updated_incrementally_on_write(tmp_path):
+    path = str(tmp_path / "tools_metadata.yml")
+    write_example_database(path)
+    tools_metadata = ToolsMetadata(path)
+    tools_metadata.search("cat1")
+    tools_metadata.get_entry_for(CAT1).get_version_entry("1.0.0").record_metadata(
+        name="Concatenate datasets", description="tail-to-head", edam_topics=None, model_class="Tool",
+    )
+    assert [entry.tool_id for entry in tools_metadata.search("concatenate")] == [CAT1]
+    tools_metadata.write()
+
+    index = SearchIndex.load(search_index_path(path))
+    assert index is not None and index.generation == tools_metadata.generation
+    assert [hit.tool_id for hit in index.search("tail head")] == [CAT1]
+
+    # a write from an object that never searched keeps the persisted index current too
+    other = ToolsMetadata(path)
+    other.get_entry_for(BAM_COVERAGE).get_version_entry("3.3.2.0.0").record_metadata(
+        name="bamCoverage", description="generates a coverage bigWig", edam_topics=None, model_class="Tool",
+    )
+    other.write()
+    index = SearchIndex.load(search_index_path(path))
+    assert index is not None and index.generation == other.generation
+    assert [hit.tool_id for hit in index.search("bigwig")] == [BAM_COVERAGE]
+
+
+def test_index_updated_for_created_tools(tmp_path):
+    path = str(tmp_path / "tools_metadata.yml")
+    write_example_database(path)
+    tools_metadata = ToolsMetadata(path)
+    tools_metadata.search("cat1")
+    tools_metadata.get_entry_for("bcftools_call").get_version_entry("1.15.1")
+    tools_metadata.write()
+    assert [entry.tool_id for entry in ToolsMetadata(path).search("bcftools")] == ["bcftools_call"]
+
+    # a tool created without searching first
+    other = ToolsMetadata(path)
+    other.get_entry_for("bcftools_view").get_version_entry("1.15.1")
+    other.write()
+    index = SearchIndex.load(search_index_path(path))
+    rebuilt = SearchIndex.build(ToolsMetadata(path)._tools_dict(), index.generation)
+    assert index._tool_terms == rebuilt._tool_terms
+    assert index._postings == rebuilt._postings
+    assert {entry.tool_id for entry in ToolsMetadata(path).search("bcftools")} == {"bcftools_call", "bcftools_view"}
+
+
+def test_stale_index_rebuilt(tmp_path):
+    path = str(tmp_path / "tools_metadata.yml")
+    write_example_database(path)
+    ToolsMetadata(path).search("cat1")
+    index_path = search_index_path(path)
+    stale = SearchIndex.build({}, generation=0)
+    stale.save(index_path)
+    tools_metadata = ToolsMetadata(path)
+    assert [entry.tool_id for entry in tools_metadata.search("cat1")] == [CAT1]
+    assert SearchIndex.load(index_path).generation == tools_metadata.generation
+
+    with open(index_path, "w") as f:
+        f.write("not json")
+    assert [entry.tool_id for entry in ToolsMetadata(path).search("cat1")] == [CAT1]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".json") and name != os.path.basename(index_path)]
+
+
+def test_search_command(tmp_path, capsys):
+    path = str(tmp_path / "tools_metadata.yml")
+    write_example_database(path)
+    main(["--tools_metadata", path, "search", "samtools"])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    tool_id, score, name, description = lines[0].split("\t")
+    assert (tool_id, name, description) == (SAMTOOLS_VIEW, "samtools_view", "an example tool")
+    assert float(score) > 0
+
+    output = str(tmp_path / "search.tsv")
+    main(["--tools_metadata", path, "search", "example", "--limit", "2", "--output", output])
+    with open(output) as f:
+        rows = f.read().splitlines()
+    assert rows[0].split("\t") == ["Tool ID", "Score", "Name", "Description"]
+    assert len(rows) == 3
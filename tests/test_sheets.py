@@ -0,0 +1,226 @@
+from typing import List
+
+from gspread.utils import a1_to_rowcol
+
+from gx_tool_db.sheets import (
+    diff_sheet_rows,
+    download_sheet_to_list,
+    SheetsClientCache,
+    sync_worksheet_from_list,
+    upload_sheet_from_list,
+)
+
+HEADER = ["Tool ID", "Latest Version", "awesome"]
+
+
+class FakeWorksheet:
+    """In-memory stand-in for a gspread worksheet."""
+
+    def __init__(self, values=None):
+        self.values: List[List[str]] = [list(r) for r in (values or [])]
+        self.batch_requests: List[list] = []
+        self.value_input_options: List[str] = []
+        self.cleared = False
+
+    def get_all_values(self):
+        rows = [list(r) for r in self.values]
+        for row in rows:
+            while row and row[-1] == "":
+                row.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def batch_update(self, data, value_input_option=None):
+        self.batch_requests.append(data)
+        self.value_input_options.append(value_input_option)
+        for update in data:
+            start, _ = update["range"].split(":")
+            start_row, start_col = a1_to_rowcol(start)
+            for row_offset, row in enumerate(update["values"]):
+                row_index = start_row - 1 + row_offset
+                while len(self.values) <= row_index:
+                    self.values.append([])
+                target = self.values[row_index]
+                for col_offset, value in enumerate(row):
+                    col_index = start_col - 1 + col_offset
+                    while len(target) <= col_index:
+                        target.append("")
+                    target[col_index] = value
+
+    def clear(self):
+        self.cleared = True
+        self.values = []
+
+
+class FakeSpreadsheet:
+
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+        self.revision = "2021-06-29T04:29:32.110Z"
+
+    def worksheets(self):
+        return [self._worksheet]
+
+    def get_lastUpdateTime(self):
+        return self.revision
+
+
+class FakeClient:
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.spreadsheet = FakeSpreadsheet(worksheet)
+        self.opened: List[str] = []
+
+    def open_by_key(self, key):
+        self.opened.append(key)
+        return self.spreadsheet
+
+
+class CountingWorksheet(FakeWorksheet):
+
+    downloads = 0
+
+    def get_all_values(self):
+        self.downloads += 1
+        return super().get_all_values()
+
+
+def test_sync_only_changed_rows():
+    worksheet = FakeWorksheet([
+        HEADER,
+        ["cat1", "1.0", "1"],
+        ["sort1", "1.0", "0"],
+        ["head1", "1.0", "0"],
+    ])
+    rows = [
+        HEADER,
+        ["cat1", "1.0", "1"],
+        ["sort1", "1.1", "0"],
+        ["head1", "1.0", "0"],
+    ]
+    updates = sync_worksheet_from_list(worksheet, rows)
+    assert len(updates) == 1
+    assert updates[0].start_row == 3
+    assert len(worksheet.batch_requests) == 1
+    # parsed like the full upload's values_append
+    assert worksheet.value_input_options == ["USER_ENTERED"]
+    assert worksheet.get_all_values() == rows
+    assert not worksheet.cleared
+
+
+def test_sync_noop_when_unchanged():
+    rows = [HEADER, ["cat1", "1.0", "1"]]
+    worksheet = FakeWorksheet(rows)
+    assert sync_worksheet_from_list(worksheet, rows) == []
+    assert worksheet.batch_requests == []
+
+
+def test_sync_keyed_add_and_remove():
+    worksheet = FakeWorksheet([
+        HEADER,
+        ["sort1", "1.0", "0"],
+        ["cat1", "1.0", "1"],
+        ["gone", "1.0", "1"],
+    ])
+    rows = [
+        HEADER,
+        ["cat1", "1.0", "1"],
+        ["new1", "2.0", None],
+        ["sort1", "1.0", "0"],
+    ]
+    sync_worksheet_from_list(worksheet, rows)
+    # existing keys keep the sheet's order, new keys are appended, removed keys dropped
+    assert worksheet.get_all_values() == [
+        HEADER,
+        ["sort1", "1.0", "0"],
+        ["cat1", "1.0", "1"],
+        ["new1", "2.0"],
+    ]
+
+
+def test_sync_rows_per_version():
+    header = ["Tool ID", "Tool Version", "Tool Name"]
+    rows = [header, ["cat1", "1.0", "Cat"], ["cat1", "1.1", "Cat"], ["sort1", "1.0", "Sort"]]
+    worksheet = FakeWorksheet(rows)
+    assert sync_worksheet_from_list(worksheet, rows) == []
+    rows = [header, ["cat1", "1.1", "Cat"], ["cat1", "1.2", "Cat"], ["sort1", "1.0", "Sort"]]
+    sync_worksheet_from_list(worksheet, rows)
+    assert worksheet.get_all_values() == [header, ["cat1", "1.1", "Cat"], ["sort1", "1.0", "Sort"], ["cat1", "1.2", "Cat"]]
+
+
+def test_sync_duplicate_keys_compared_by_position():
+    rows = [HEADER, ["cat1", "1.0", "1"], ["cat1", "1.0", "0"]]
+    worksheet = FakeWorksheet(rows)
+    assert sync_worksheet_from_list(worksheet, rows) == []
+    rows = [HEADER, ["cat1", "1.0", "1"], ["cat1", "1.0", "1"], ["sort1", "1.0", "0"]]
+    sync_worksheet_from_list(worksheet, rows)
+    assert worksheet.get_all_values() == rows
+
+
+def test_sync_header_change_rewrites_everything():
+    current = [HEADER, ["cat1", "1.0", "1"]]
+    rows = [["Tool ID", "Latest Version"], ["cat1", "1.0"], ["sort1", "1.0"]]
+    updates = diff_sheet_rows(current, rows)
+    worksheet = FakeWorksheet(current)
+    sync_worksheet_from_list(worksheet, rows)
+    assert updates[0].start_row == 1
+    assert worksheet.get_all_values() == rows
+
+
+def test_sync_chunks_large_updates():
+    rows = [HEADER] + [[f"tool{i}", "1.0", "0"] for i in range(100)]
+    worksheet = FakeWorksheet()
+    sync_worksheet_from_list(worksheet, rows, max_cells_per_request=30, max_workers=3)
+    assert len(worksheet.batch_requests) > 1
+    for request in worksheet.batch_requests:
+        assert sum(len(r) for u in request for r in u["values"]) <= 30
+    assert worksheet.get_all_values() == rows
+
+
+def test_upload_with_injected_client():
+    worksheet = FakeWorksheet([HEADER, ["cat1", "1.0", "0"]])
+    client = FakeClient(worksheet)
+    rows = [HEADER, ["cat1", "1.0", "1"]]
+    upload_sheet_from_list(rows, "sheet123", sync=True, client=client)
+    assert client.opened == ["sheet123"]
+    assert worksheet.get_all_values() == rows
+
+
+def test_client_cache_is_lazy_and_reuses_handles():
+    worksheet = FakeWorksheet([HEADER])
+    clients = []
+
+    def factory():
+        clients.append(FakeClient(worksheet))
+        return clients[-1]
+
+    cache = SheetsClientCache(factory)
+    assert clients == []
+    assert cache.worksheet("sheet123") is worksheet
+    assert cache.worksheet("sheet123") is worksheet
+    download_sheet_to_list("sheet123", client=cache)
+    assert len(clients) == 1
+    assert clients[0].opened == ["sheet123"]
+
+
+def test_local_cache_revalidated_against_revision(tmp_path):
+    worksheet = CountingWorksheet([HEADER, ["cat1", "1.0", "1"]])
+    client = FakeClient(worksheet)
+    cache = SheetsClientCache(lambda: client, cache_directory=str(tmp_path))
+    first = cache.download("sheet123")
+    assert worksheet.downloads == 1
+
+    # a fresh process (new cache object) with an unchanged sheet skips the download
+    cache = SheetsClientCache(lambda: client, cache_directory=str(tmp_path))
+    assert cache.download("sheet123") == first
+    assert worksheet.downloads == 1
+
+    client.spreadsheet.revision = "2021-07-29T04:29:32.110Z"
+    cache.download("sheet123")
+    assert worksheet.downloads == 2
+
+    upload_sheet_from_list([HEADER, ["cat1", "1.0", "0"]], "sheet123", sync=True, client=cache)
+    assert cache.download("sheet123") == [HEADER, ["cat1", "1.0", "0"]]
+    assert worksheet.downloads == 4
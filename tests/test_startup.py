@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+from ._db import write_example_database
+
+HEAVY_MODULES = ["requests", "urllib3", "gspread", "google", "pkg_resources", "gxformat2", "numpy", "pyarrow"]
+
+
+def _imported_top_level_modules(argv):
+    code = "import sys; from gx_tool_db.main import main; main(sys.argv[1:])"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code] + argv, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+
+def test_lightweight_commands_skip_heavy_imports(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    for command in [
+        ["export-label", str(tmp_path / "labels.txt"), "awesome"],
+        ["export-tabular", "--all-coverage", "--output", str(tmp_path / "out.tsv")],
+    ]:
+        modules = _imported_top_level_modules(["--tools_metadata", database] + command)
+        assert "gx_tool_db" in modules
+        assert not modules.intersection(HEAVY_MODULES), command
@@ -0,0 +1,38 @@
+import json
+
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from gx_tool_db.models import load_from_dict, load_from_path
+from gx_tool_db.synthetic import (
+    synthetic_database_dict,
+    synthetic_test_results_dict,
+    SyntheticDatabaseSpec,
+    write_synthetic_database,
+)
+
+SPEC = SyntheticDatabaseSpec(tools=60, versions_per_tool=4, servers=3, labels=5, test_targets=2, trainings=6, sections=8)
+
+
+def test_synthetic_database_matches_schema_and_spec():
+    database = synthetic_database_dict(SPEC)
+    load_from_dict(database)
+    assert len(database["tools"]) == SPEC.tools
+    assert set(database["integrated_panels"]) == set(SPEC.server_labels)
+    assert database == synthetic_database_dict(SPEC)
+    assert database != synthetic_database_dict(SPEC._replace(seed=1))
+
+    tools_metadata = ToolsMetadata("/nonexistent/tools_metadata.yml")
+    tools_metadata.metadata = database
+    assert sorted(tools_metadata.known_servers()) == SPEC.server_labels
+    assert sorted(tools_metadata.test_keys()) == SPEC.test_target_names
+    assert any(entry.trainings for entry in tools_metadata.entries())
+
+
+def test_synthetic_test_results_import(tmp_path):
+    path = str(tmp_path / "tools_metadata.yml")
+    database = write_synthetic_database(path, SPEC)
+    load_from_path(path)
+    results_path = tmp_path / "results.json"
+    results_path.write_text(json.dumps(synthetic_test_results_dict(database)))
+    main(["--tools_metadata", path, "import-tests", str(results_path), "synthetic"])
+    assert "synthetic" in ToolsMetadata(path).test_keys()
@@ -0,0 +1,126 @@
+import yaml
+
+from gx_tool_db.config import ViewDefintion
+from gx_tool_db.db import PanelViewIndex, RetentionPolicy, ToolsMetadata
+from gx_tool_db.main import main
+from gx_tool_db.results import TestResults
+from gx_tool_db.tool_ids import parse_tool_shed_id, ToolIdIndex, ToolShedId, versionless_tool_id
+from ._db import BAM_COVERAGE, CAT1, SAMTOOLS_VIEW, write_example_database
+
+MAIN_SHED = "toolshed.g2.bx.psu.edu"
+TEST_SHED = "testtoolshed.g2.bx.psu.edu"
+SAMTOOLS_SORT = f"{MAIN_SHED}/repos/iuc/samtools_sort/samtools_sort"
+TEST_SAMTOOLS_VIEW = f"{TEST_SHED}/repos/iuc/samtools_view/samtools_view"
+
+
+def _index():
+    return ToolIdIndex({
+        CAT1: ["1.0.0"],
+        SAMTOOLS_VIEW: ["1.9+galaxy1", "1.9+galaxy2"],
+        SAMTOOLS_SORT: ["2.0.3"],
+        BAM_COVERAGE: ["3.3.2.0.0"],
+        TEST_SAMTOOLS_VIEW: [],
+    })
+
+
+def test_parse_tool_shed_id():
+    assert parse_tool_shed_id(f"{SAMTOOLS_VIEW}/1.9+galaxy1") == ToolShedId(MAIN_SHED, "iuc", "samtools_view", "samtools_view", "1.9+galaxy1")
+    assert parse_tool_shed_id(SAMTOOLS_VIEW).version is None
+    assert parse_tool_shed_id(CAT1) is None
+    assert parse_tool_shed_id("repos/iuc/samtools_view/samtools_view") is None
+    assert versionless_tool_id(f"{SAMTOOLS_VIEW}/1.9+galaxy1") == SAMTOOLS_VIEW
+    # already versionless ids are left alone
+    assert versionless_tool_id(SAMTOOLS_VIEW) == SAMTOOLS_VIEW
+    assert versionless_tool_id(CAT1) == CAT1
+
+
+def test_index_queries():
+    index = _index()
+    assert len(index) == 5
+    assert index.select(owner="iuc") == [TEST_SAMTOOLS_VIEW, SAMTOOLS_SORT, SAMTOOLS_VIEW]
+    assert index.select(owner="iuc", tool_shed=MAIN_SHED) == [SAMTOOLS_SORT, SAMTOOLS_VIEW]
+    assert index.select(owner="iuc", repository="samtools_view") == [TEST_SAMTOOLS_VIEW, SAMTOOLS_VIEW]
+    assert index.select(repository="samtools_view", tool_shed=TEST_SHED) == [TEST_SAMTOOLS_VIEW]
+    assert index.select(owner="iu") == []
+    assert index.select(tool_shed=MAIN_SHED) == [BAM_COVERAGE, SAMTOOLS_SORT, SAMTOOLS_VIEW]
+    assert index.select(prefix=f"{MAIN_SHED}/repos/iuc/samtools_") == [SAMTOOLS_SORT, SAMTOOLS_VIEW]
+    assert index.select(tool_shed=TEST_SHED, prefix="toolshed") == []
+    assert index.select() == sorted([CAT1, SAMTOOLS_VIEW, SAMTOOLS_SORT, BAM_COVERAGE, TEST_SAMTOOLS_VIEW])
+    assert index.with_prefix("cat") == [CAT1]
+    assert index.in_range(f"{MAIN_SHED}/repos/b", f"{MAIN_SHED}/repos/j") == [BAM_COVERAGE, SAMTOOLS_SORT, SAMTOOLS_VIEW]
+    assert index.in_range(TEST_SHED, MAIN_SHED) == [TEST_SAMTOOLS_VIEW]
+    assert index.in_range(f"{MAIN_SHED}/repos/iuc/samtools_t") == [SAMTOOLS_VIEW]
+
+
+def test_resolve():
+    index = _index()
+    assert index.resolve(f"{SAMTOOLS_VIEW}/1.9+galaxy2") == SAMTOOLS_VIEW
+    assert index.resolve(SAMTOOLS_VIEW) == SAMTOOLS_VIEW
+    assert index.resolve(f"{SAMTOOLS_VIEW}/9.9") == SAMTOOLS_VIEW
+    assert index.resolve(CAT1) == CAT1
+    assert index.resolve(f"{MAIN_SHED}/repos/iuc/bwa/bwa/1.0") is None
+    assert f"{SAMTOOLS_SORT}/2.0.3" in index
+
+
+def test_results_for_versioned_tool_ids():
+    results = TestResults(json_contents={"tests": [
+        {"has_data": True, "data": {"tool_id": f"{SAMTOOLS_VIEW}/1.9+galaxy2", "tool_version": "1.9+galaxy2", "status": "success"}},
+        {"has_data": True, "data": {"tool_id": CAT1, "tool_version": "1.0.0", "status": "success"}},
+    ]})
+    assert sorted(results.results_by_id) == sorted([SAMTOOLS_VIEW, CAT1])
+    assert len(results.get_results_for_tool_id(f"{SAMTOOLS_VIEW}/1.9+galaxy1")) == 1
+    assert len(results.get_results_for_tool_id(SAMTOOLS_VIEW)) == 1
+    assert results.get_results_for_tool_id(SAMTOOLS_SORT) is None
+
+
+def test_tool_id_index_reused_until_tools_change(tmp_path, monkeypatch):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    tools_metadata = ToolsMetadata(database)
+    builds = []
+    from_tools_dict = ToolIdIndex.from_tools_dict
+    monkeypatch.setattr(ToolIdIndex, "from_tools_dict", staticmethod(lambda tools: builds.append(1) or from_tools_dict(tools)))
+
+    panel_view_index = PanelViewIndex(tools_metadata)
+    for owner in ["iuc", "bgruening"]:
+        view_def = ViewDefintion(owner)
+        view_def.owner = owner
+        panel_view_index._view_filter(view_def)
+    assert len(builds) == 1
+
+    view_def = ViewDefintion("iuc")
+    view_def.owner = "iuc"
+    tools_metadata.get_entry_for(SAMTOOLS_VIEW)
+    assert tools_metadata.select_tool_ids(view_def) == [SAMTOOLS_VIEW]
+    assert len(builds) == 1
+    tools_metadata.get_entry_for(SAMTOOLS_SORT)
+    assert tools_metadata.select_tool_ids(view_def) == [SAMTOOLS_SORT, SAMTOOLS_VIEW]
+    # the new, still empty, tool is dropped again
+    tools_metadata.apply_retention(RetentionPolicy(drop_empty=True))
+    assert tools_metadata.select_tool_ids(view_def) == [SAMTOOLS_VIEW]
+    assert len(builds) == 3
+
+
+def test_filtered_exports(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    tools_metadata = ToolsMetadata(database)
+    assert tools_metadata.tool_id_index().resolve(f"{SAMTOOLS_VIEW}/1.9+galaxy1") == SAMTOOLS_VIEW
+
+    output = tmp_path / "install.yml"
+    main(["--tools_metadata", database, "export-install-yaml", "--filter-owner", "bgruening", "--output", str(output)])
+    assert [repo["name"] for repo in yaml.safe_load(output.read_text())["tools"]] == ["deeptools_bam_coverage"]
+
+    output = tmp_path / "tools.tsv"
+    main(["--tools_metadata", database, "export-tabular", "--tool-id-prefix", f"{MAIN_SHED}/repos/iuc/", "--output", str(output)])
+    assert [line.split("\t")[0] for line in output.read_text().splitlines()[1:]] == [SAMTOOLS_VIEW]
+
+    output = tmp_path / "view.yml"
+    main([
+        "--tools_metadata", database, "export-panel-view", "sheds", "main",
+        "--filter-tool-shed", MAIN_SHED, "--output", str(output),
+    ])
+    sections = yaml.safe_load(output.read_text())["items"]
+    assert [(item["id"], [tool["id"] for tool in item["items"]]) for item in sections if item["type"] == "section"] == [
+        ("samtools", [SAMTOOLS_VIEW]), ("deeptools", [BAM_COVERAGE]),
+    ]
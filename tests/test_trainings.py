@@ -0,0 +1,57 @@
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from ._data import MOCK_TRAINING_DIRECTORY
+from ._db import CAT1, write_example_database
+
+
+def _trainings_by_version(database):
+    trainings = {}
+    for tool_id, tool_metadata in ToolsMetadata(database).walk_tools_dict():
+        for version, version_metadata in (tool_metadata.get("versions") or {}).items():
+            if version_metadata.get("trainings"):
+                trainings[(tool_id, version)] = version_metadata["trainings"]
+    return trainings
+
+
+def test_import_trainings_is_idempotent(tmp_path, capsys):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    main(["--tools_metadata", database, "import-trainings", MOCK_TRAINING_DIRECTORY])
+    assert "Recorded 9 tutorials using 71 tools" in capsys.readouterr().out
+    trainings = _trainings_by_version(database)
+    assert trainings
+    main(["--tools_metadata", database, "import-trainings", MOCK_TRAINING_DIRECTORY])
+    assert _trainings_by_version(database) == trainings
+
+
+def test_dedupe_existing_trainings(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    tools_metadata = write_example_database(database)
+    version_metadata = tools_metadata.get_entry_for(CAT1).get_version_entry("1.0.0")._source_data
+    training = {"topic": "introduction", "tutorial": "galaxy-intro-101"}
+    version_metadata["trainings"] = [training, dict(training), {"topic": "introduction", "tutorial": "other"}, dict(training)]
+    assert tools_metadata.dedupe_trainings() == 2
+    assert version_metadata["trainings"] == [training, {"topic": "introduction", "tutorial": "other"}]
+
+
+def test_export_training_coverage(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    tools_metadata = write_example_database(database)
+    version_entry = tools_metadata.get_entry_for(CAT1).get_version_entry("1.0.0")
+    version_entry._source_data["trainings"] = [{"topic": "introduction", "tutorial": "galaxy-intro-101"}]
+    unknown_entry = tools_metadata.get_entry_for("not_installed").get_version_entry("0.1")
+    unknown_entry._source_data["trainings"] = [{"topic": "introduction", "tutorial": "galaxy-intro-101"}]
+    tools_metadata.write()
+
+    index = ToolsMetadata(database).training_index()
+    assert index.tutorials() == [("introduction", "galaxy-intro-101")]
+    assert index.tools_for("introduction", "galaxy-intro-101") == {CAT1: {"1.0.0"}, "not_installed": {"0.1"}}
+
+    output = tmp_path / "coverage.tsv"
+    main(["--tools_metadata", database, "export-training-coverage", "--output", str(output)])
+    lines = [line.split("\t") for line in output.read_text().splitlines()]
+    assert lines[0][:4] == ["Topic", "Tutorial", "Tool ID", "Tutorial Versions"]
+    assert lines[0][-1] == "Missing On"
+    rows = {line[2]: line for line in lines[1:]}
+    assert rows[CAT1][-1] == ""
+    assert set(rows["not_installed"][-1].split(",")) == {header.rsplit(" ", 2)[0] for header in lines[0][4:-1]}
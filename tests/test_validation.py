@@ -0,0 +1,81 @@
+import pytest
+from pydantic import ValidationError
+
+from gx_tool_db.main import main
+from gx_tool_db.models import load_from_dict
+from gx_tool_db.synthetic import synthetic_database_dict, SyntheticDatabaseSpec
+from gx_tool_db.validation import validate_database_dict
+
+INVALID_DATABASES = [
+    {},
+    {"version": "1.1"},
+    {"version": ["1.0"]},
+    {"version": "1.0", "tools": [1]},
+    {"version": "1.0", "tools": {"a": None, "b": {"external_labels": None, "tool_shed_repository": {"owner": 1}}}},
+    {"version": "1.0", "tools": {"a": {"servers": {"main": {"versions": ["1", 2, None], "sections": {"s": {}}}}, "bogus": 1}}},
+    {"version": "1.0", "tools": {"a": {"servers": {"main": {"versions": "1.0"}}, "external_labels": [True, 1.5, {"a": 1}]}}},
+    {"version": "1.0", "tools": {"a": {"versions": {1.0: {
+        "test_results": {"t": {"x": {"status": "ok"}, 1: {"status": 3, "extra": 1}}, "u": None, "v": [1]},
+        "trainings": [{"topic": "a"}],
+        "xrefs": "notalist",
+    }}}}},
+    {"version": "1.0", "integrated_panels": {"main": [{"model_class": "ToolSection", "id": "a"}, {"model_class": "Other"}, "str"]}},
+    {"version": "1.0", "tools": {None: {}, 3: {}}, "extra": True},
+]
+
+
+def _errors(func, as_dict):
+    try:
+        func(as_dict)
+    except ValidationError as e:
+        return e.errors(), str(e)
+    return None
+
+
+@pytest.mark.parametrize("as_dict", INVALID_DATABASES)
+def test_compiled_validator_reports_pydantic_errors(as_dict):
+    expected = _errors(load_from_dict, as_dict)
+    assert expected is not None
+    assert _errors(validate_database_dict, as_dict) == expected
+
+
+def test_compiled_validator_accepts_valid_database():
+    database = synthetic_database_dict(SyntheticDatabaseSpec(tools=50))
+    validate_database_dict(database)
+    validate_database_dict(database, strict=True)
+
+
+def test_strict_validation_option(tmp_path):
+    path = tmp_path / "tools_metadata.yml"
+    path.write_text("version: '1.0'\ntools:\n  cat1:\n    unknown: 1\n")
+    for strict in [[], ["--strict-validation"]]:
+        with pytest.raises(ValidationError, match="extra fields not permitted"):
+            main(["--tools_metadata", str(path)] + strict + ["export-label", str(tmp_path / "out.txt"), "x"])
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_parallel_validation_matches_sequential(strict):
+    database = synthetic_database_dict(SyntheticDatabaseSpec(tools=60))
+    tool_ids = list(database["tools"])
+    database["tools"][tool_ids[3]]["versions"]["bad"] = {"servers": 3}
+    database["tools"][tool_ids[45]]["bogus"] = 1
+    database["version"] = "2.0"
+    database["extra"] = True
+    expected = _errors(lambda d: validate_database_dict(d, strict=strict, jobs=1), database)
+    assert expected is not None
+    assert _errors(lambda d: validate_database_dict(d, strict=strict, jobs=3), database) == expected
+
+
+def test_validate_command(tmp_path, capsys):
+    path = tmp_path / "tools_metadata.yml"
+    path.write_text("version: '1.0'\ntools:\n  cat1:\n    unknown: 1\n  cat2: {}\n  cat3:\n    versions: {'1.0': {servers: 3}}\n")
+    with pytest.raises(Exception) as exc_info:
+        main(["--tools_metadata", str(path), "validate", "--jobs", "2"])
+    message = str(exc_info.value)
+    assert message.startswith("2 validation error(s)")
+    assert "cat1: unknown: extra fields not permitted" in message
+    assert "cat3: versions -> 1.0 -> servers: value is not a valid dict" in message
+
+    path.write_text("version: '1.0'\ntools:\n  cat1: {}\n  cat2: {}\n")
+    main(["--tools_metadata", str(path), "validate", "--jobs", "2"])
+    assert "is valid (2 tools)" in capsys.readouterr().out
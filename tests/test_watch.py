@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from gx_tool_db import config
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import Config, import_test_results, import_training
+from gx_tool_db.watch import _libc, InotifyWatcher, PollingWatcher, WatchOptions
+from ._data import DATA_DIRECTORY
+from ._db import CAT1, SAMTOOLS_VIEW, write_example_database
+
+TRAINING_DIRECTORY = os.path.join(DATA_DIRECTORY, "mock_training")
+WATCH_MODES = [True, pytest.param(False, marks=pytest.mark.skipif(_libc() is None, reason="inotify unavailable"))]
+
+
+def _write_results(path, tool_id, tool_version):
+    tests = [{
+        "id": f"{tool_id}-0",
+        "has_data": True,
+        "data": {"tool_id": tool_id, "tool_version": tool_version, "test_index": 0, "status": "success"},
+    }]
+    with open(path, "w") as f:
+        json.dump({"version": "0.1", "tests": tests}, f)
+
+
+def _tested_tools(database):
+    tools = ToolsMetadata(database)._tools_dict()
+    return sorted(
+        tool_id for tool_id, tool in tools.items()
+        if any("ci" in (version.get("test_results") or {}) for version in tool["versions"].values())
+    )
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the watched change"
+        time.sleep(0.05)
+
+
+def _is_json(path):
+    return path.endswith(".json")
+
+
+def test_polling_watcher(tmp_path):
+    (tmp_path / "a.json").write_text("{}")
+    watcher = PollingWatcher(str(tmp_path), _is_json)
+    assert watcher.changed(0) == []
+    (tmp_path / "a.json").write_text('{"tests": []}')
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "b.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("")
+    (tmp_path / ".c.json").write_text("{}")
+    assert watcher.changed(0) == [str(tmp_path / "a.json"), str(tmp_path / "nested" / "b.json")]
+    assert watcher.changed(0) == []
+
+
+@pytest.mark.skipif(_libc() is None, reason="inotify unavailable")
+def test_inotify_watcher(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    watched = tmp_path / "watched"
+    watched.mkdir()
+    (watched / "a.json").write_text("{}")
+    watcher = InotifyWatcher(str(watched), _is_json)
+    try:
+        assert watcher.changed(0) == []
+        (watched / "a.json").write_text('{"tests": []}')
+        # a new directory, written before its watch is added
+        (watched / "nested").mkdir()
+        (watched / "nested" / "b.json").write_text("{}")
+        (outside / "c.json").write_text("{}")
+        os.rename(outside / "c.json", watched / "c.json")
+        (watched / "notes.txt").write_text("")
+        assert watcher.changed(1) == [str(watched / "a.json"), str(watched / "c.json"), str(watched / "nested" / "b.json")]
+        (watched / "nested" / "b.json").write_text('{"tests": []}')
+        assert watcher.changed(1) == [str(watched / "nested" / "b.json")]
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("poll", WATCH_MODES)
+def test_watch_test_results(tmp_path, poll):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    results = tmp_path / "results"
+    results.mkdir()
+    _write_results(results / "a.json", CAT1, "1.0.0")
+
+    stop = threading.Event()
+    options = WatchOptions(poll=poll, poll_interval=0.05, debounce=0.05, stop=stop)
+    watching = threading.Thread(target=import_test_results, args=(
+        Config(database), str(results), "ci", config.TestDataMergeStrategy.latest_executed, 100, False, options
+    ))
+    watching.start()
+    try:
+        _wait_for(lambda: _tested_tools(database) == [CAT1])
+        (results / "broken.json").write_text("{not json")
+        _write_results(results / "b.json", SAMTOOLS_VIEW, "1.9+galaxy2")
+        _wait_for(lambda: _tested_tools(database) == sorted([CAT1, SAMTOOLS_VIEW]))
+    finally:
+        stop.set()
+        watching.join()
+
+
+@pytest.mark.parametrize("poll", WATCH_MODES)
+def test_watch_training(tmp_path, poll):
+    database = str(tmp_path / "tools_metadata.yml")
+    training = tmp_path / "training"
+    shutil.copytree(TRAINING_DIRECTORY, training)
+
+    stop = threading.Event()
+    options = WatchOptions(poll=poll, poll_interval=0.05, debounce=0.05, stop=stop)
+    watching = threading.Thread(target=import_training, args=(Config(database), str(training), 100, False, options))
+    watching.start()
+    try:
+        _wait_for(lambda: os.path.exists(database))
+        tutorials = set(ToolsMetadata(database).training_index().tutorials())
+        assert ("new-topic", "new-tutorial") not in tutorials
+        workflows = training / "topics" / "new-topic" / "tutorials" / "new-tutorial" / "workflows"
+        workflows.mkdir(parents=True)
+        shutil.copy(
+            training / "topics" / "assembly" / "tutorials" / "unicycler-assembly" / "workflows" / "unicycler.ga",
+            workflows / "unicycler.ga",
+        )
+        _wait_for(lambda: ("new-topic", "new-tutorial") in ToolsMetadata(database).training_index().tutorials())
+    finally:
+        stop.set()
+        watching.join()
+
+
+def test_watch_keeps_concurrent_writes(tmp_path):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    results = tmp_path / "results"
+    results.mkdir()
+
+    stop = threading.Event()
+    options = WatchOptions(poll=True, poll_interval=0.05, debounce=0.5, stop=stop)
+    watching = threading.Thread(target=import_test_results, args=(
+        Config(database), str(results), "ci", config.TestDataMergeStrategy.latest_executed, 100, False, options
+    ))
+    watching.start()
+    try:
+        generation = ToolsMetadata(database).generation
+        _wait_for(lambda: ToolsMetadata(database).generation > generation)  # the initial import was written
+        _write_results(results / "a.json", CAT1, "1.0.0")
+        # another process writes the database before the watch flushes its change
+        other = ToolsMetadata(database)
+        other.get_entry_for(SAMTOOLS_VIEW).record_external_label("concurrent")
+        other.write()
+        _wait_for(lambda: _tested_tools(database) == [CAT1])
+        assert ToolsMetadata(database).get_entry_for(SAMTOOLS_VIEW).has_external_label("concurrent")
+    finally:
+        stop.set()
+        watching.join()
@@ -0,0 +1,114 @@
+import os
+import shutil
+
+import pytest
+
+from gx_tool_db import workflows
+from gx_tool_db.db import ToolsMetadata
+from gx_tool_db.main import main
+from gx_tool_db.workflow_index import workflow_index_path, WorkflowIndex
+from ._data import EXAMPLE_WORKFLOW_1, EXAMPLE_WORKFLOW_NESTED
+from ._db import SAMTOOLS_VIEW, write_example_database
+
+BWA_MEM = "toolshed.g2.bx.psu.edu/repos/devteam/bwa/bwa_mem"
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus = tmp_path / "workflows"
+    (corpus / "nested").mkdir(parents=True)
+    shutil.copy(EXAMPLE_WORKFLOW_1, corpus / "variation.ga")
+    shutil.copy(EXAMPLE_WORKFLOW_NESTED, corpus / "nested" / "subworkflow.ga")
+    (corpus / "notes.yml").write_text("not: a workflow\n")
+    return corpus
+
+
+def _fail_parsing(monkeypatch):
+    def parse_tools(path):
+        raise AssertionError(f"unexpectedly parsed {path}")
+
+    monkeypatch.setattr(workflows, "parse_tools", parse_tools)
+
+
+def test_update_only_parses_changed_files(tmp_path, corpus, monkeypatch):
+    index_path = str(tmp_path / "index.json")
+    index = WorkflowIndex.load(index_path)
+    update = index.update([str(corpus)])
+    assert (update.added, update.changed, update.removed, update.unchanged) == (3, 0, 0, 0)
+    index.save(index_path)
+    variation = str(corpus / "variation.ga")
+    assert index.workflows_using(SAMTOOLS_VIEW + "/1.9+galaxy2") == [variation]
+    assert index.workflows_using("__BUILD_LIST__") == [str(corpus / "nested" / "subworkflow.ga")]
+    assert index.workflows[str(corpus / "notes.yml")].parse_error
+
+    _fail_parsing(monkeypatch)
+    index = WorkflowIndex.load(index_path)
+    assert index.workflows_using(BWA_MEM) == [variation]
+    update = index.update([str(corpus)])
+    assert (update.added, update.changed, update.removed, update.unchanged) == (0, 0, 0, 3)
+
+    # touched or copied files are recognized by their content hash
+    os.utime(variation, ns=(0, 0))
+    shutil.copy(variation, corpus / "copy.ga")
+    update = index.update([str(corpus)])
+    assert (update.added, update.changed, update.removed, update.unchanged) == (1, 0, 0, 3)
+    assert index.workflows_using(BWA_MEM) == [str(corpus / "copy.ga"), variation]
+
+    monkeypatch.undo()
+    with open(variation) as f:
+        content = f.read()
+    with open(variation, "w") as f:
+        f.write(content.replace("bwa_mem", "bwa_mem2"))
+    (corpus / "nested" / "subworkflow.ga").unlink()
+    update = index.update([str(corpus)])
+    assert (update.added, update.changed, update.removed, update.unchanged) == (0, 1, 1, 2)
+    assert index.workflows_using(BWA_MEM) == [str(corpus / "copy.ga")]
+    assert index.workflows_using("__BUILD_LIST__") == []
+
+
+def test_missing_tools(tmp_path, corpus):
+    tools_metadata = write_example_database(str(tmp_path / "tools_metadata.yml"))
+    index = WorkflowIndex()
+    index.update([str(corpus)])
+    variation = str(corpus / "variation.ga")
+    missing = index.missing_tools(tools_metadata, "main")
+    assert set(missing) == {variation, str(corpus / "nested" / "subworkflow.ga")}
+    assert BWA_MEM in missing[variation]
+    assert SAMTOOLS_VIEW not in missing[variation]
+    assert SAMTOOLS_VIEW in index.missing_tools(tools_metadata, "main", [SAMTOOLS_VIEW])[variation]
+    assert SAMTOOLS_VIEW in index.missing_tools(tools_metadata, "au")[variation]
+
+
+def test_workflow_commands(tmp_path, corpus, monkeypatch):
+    database = str(tmp_path / "tools_metadata.yml")
+    write_example_database(database)
+    main(["--tools_metadata", database, "index-workflows", str(corpus)])
+    assert os.path.exists(workflow_index_path(database))
+
+    _fail_parsing(monkeypatch)
+    output = tmp_path / "tools.tsv"
+    main(["--tools_metadata", database, "export-workflow-tools", str(corpus / "nested"), "--output", str(output)])
+    rows = [line.split("\t") for line in output.read_text().splitlines()]
+    assert rows[0] == ["Workflow", "Tool ID", "Tool Version"]
+    assert {row[1] for row in rows[1:]} == {"__BUILD_LIST__", "__FILTER_FROM_FILE__", "multi_data_param"}
+
+    output = tmp_path / "breakage.tsv"
+    main(["--tools_metadata", database, "export-workflow-breakage", "eu", "--tool", SAMTOOLS_VIEW, "--output", str(output)])
+    rows = {line.split("\t")[0]: line.split("\t") for line in output.read_text().splitlines()}
+    assert rows["Workflow"] == ["Workflow", "Missing Tool Count", "Missing Tools"]
+    assert SAMTOOLS_VIEW in rows[str(corpus / "variation.ga")][2].split(",")
+
+    main([
+        "--tools_metadata", database, "label-workflow-tools", str(corpus / "variation.ga"),
+        "--label", "variation", "--workflow-index", workflow_index_path(database),
+    ])
+    assert ToolsMetadata(database).get_entry_for(SAMTOOLS_VIEW).has_external_label("variation")
+
+
+def test_removed_directory_dropped(corpus):
+    index = WorkflowIndex()
+    index.update([str(corpus)])
+    shutil.rmtree(corpus / "nested")
+    update = index.update([str(corpus / "nested")])
+    assert (update.added, update.removed) == (0, 1)
+    assert sorted(index.workflows) == [str(corpus / "notes.yml"), str(corpus / "variation.ga")]